@@ -15,3 +15,4 @@ if ADB_PATH is None:
 
 # Archivos de perfiles
 DEVICES = PROJECT_ROOT / "config" / "devices.json"
+PROFILES_DB = PROJECT_ROOT / "config" / "profiles.db"
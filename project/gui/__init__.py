@@ -9,6 +9,8 @@ from .batch_tab import create_batch_tab
 from .connected_tab import create_connected_tab
 from .network_tab import create_network_tab
 from .commands_tab import create_commands_tab
+from .screens_tab import create_screens_tab
+from .scheduler_tab import create_scheduler_tab
 from .theme import apply_theme
 
 __all__ = [
@@ -19,5 +21,7 @@ __all__ = [
     "create_connected_tab",
     "create_network_tab",
     "create_commands_tab",
+    "create_screens_tab",
+    "create_scheduler_tab",
     "apply_theme"
 ]
@@ -1,13 +1,21 @@
 import os
+import queue
 import subprocess
 import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
-from ..utils.adb_utils import run_in_thread
+from ..utils.adb_utils import list_device_serials, run_in_thread
+from ..utils.batch_runner import BATCH_EXTS, is_batch_file, run_batch_parallel
+from ..utils.script_engine import SCRIPT_EXT, is_script_file, parse_script
 from ..utils.gui_utils import gui_log
 from ..config.config import PROJECT_ROOT
 
 BATCH_DIR = PROJECT_ROOT / "utils" / "batch"
+BATCH_EXT = BATCH_EXTS[0]
+NEW_BATCH_TEMPLATE = ":: Nuevo archivo batch\n" if BATCH_EXT == ".bat" else "# Nuevo script\n"
+OUTPUT_POLL_MS = 100
+OUTPUT_MAX_LINES = 5000
 
 def create_batch_tab(notebook):
     tab_batch = ttk.Frame(notebook)
@@ -33,7 +41,7 @@ def create_batch_tab(notebook):
     # 🔹 Vincular selección al editor
     batch_combobox.bind("<<ComboboxSelected>>", lambda e: load_batch())
 
-    batch_note = ttk.Label(batch_frame, text="Añade .bat en 'project/utils/batch' si quieres añadirlos manualmente.", font=(None, 8))
+    batch_note = ttk.Label(batch_frame, text=f"Añade {BATCH_EXT} o {SCRIPT_EXT} en 'project/utils/batch' si quieres añadirlos manualmente.", font=(None, 8))
     batch_note.grid(row=1, column=0, columnspan=6, pady=(0, 2), sticky="w")
 
     status_frame = ttk.Frame(batch_frame)
@@ -61,8 +69,22 @@ def create_batch_tab(notebook):
     output.config(yscrollcommand=scroll_output.set)
     # scroll_output.grid(row=5, column=6, sticky="ns")
 
+    # --- Ejecución ---
+    run_frame = ttk.Frame(batch_frame)
+    run_frame.grid(row=8, column=0, columnspan=6, sticky="ew", padx=6, pady=(0, 4))
+    all_devices_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(run_frame, text="Todos los dispositivos", variable=all_devices_var).pack(side="left")
+    ttk.Label(run_frame, text="Timeout (s, 0 = sin límite):").pack(side="left", padx=(12, 4))
+    timeout_var = tk.IntVar(value=0)
+    ttk.Spinbox(run_frame, from_=0, to=86400, increment=10, width=7, textvariable=timeout_var).pack(side="left")
+    run_status_label = ttk.Label(run_frame, text="", font=(None, 9))
+    run_status_label.pack(side="right")
+
     dirty = {"value": False}
     current_file = {"value": ""}
+    job_state = {"job": None, "pending": 0, "starting": False}
+    pending_lock = threading.Lock()
+    output_queue = queue.Queue()
 
     # --- Funciones internas ---
     def set_dirty(value):
@@ -75,7 +97,7 @@ def create_batch_tab(notebook):
 
     def refresh_batch_files():
         try:
-            files = sorted([f for f in os.listdir(BATCH_DIR) if f.lower().endswith('.bat')])
+            files = sorted([f for f in os.listdir(BATCH_DIR) if is_batch_file(f)])
         except Exception:
             files = []
         batch_combobox['values'] = files
@@ -114,8 +136,14 @@ def create_batch_tab(notebook):
             gui_log("Selecciona un archivo o crea uno nuevo", level="error")
             return
         path = os.path.join(BATCH_DIR,file)
+        content = editor.get("1.0","end")
+        if is_script_file(file):
+            try:
+                parse_script(content)
+            except ValueError as e:
+                gui_log(f"Aviso: el script no es válido: {e}", level="error")
         with open(path,"w",encoding="utf-8") as f:
-            f.write(editor.get("1.0","end"))
+            f.write(content)
         editor.edit_modified(False)
         set_dirty(False)
         gui_log(f"Guardado: {file}", level="info")
@@ -128,17 +156,17 @@ def create_batch_tab(notebook):
         return True
 
     def create_batch():
-        name = simpledialog.askstring("Nuevo .bat","Nombre del archivo (sin .bat):")
+        name = simpledialog.askstring(f"Nuevo {BATCH_EXT}", f"Nombre del archivo (sin {BATCH_EXT}):")
         if not name: return
         if not validate_batch_name(name):
             return
-        if not name.lower().endswith(".bat"):
-            name += ".bat"
+        if not is_batch_file(name):
+            name += BATCH_EXT
         path = os.path.join(BATCH_DIR,name)
         if os.path.exists(path) and not messagebox.askyesno("Sobrescribir", f"{name} ya existe. ¿Sobrescribir?"):
             return
         with open(path,"w",encoding="utf-8") as f:
-            f.write(":: Nuevo archivo batch\n")
+            f.write(NEW_BATCH_TEMPLATE)
         refresh_batch_files()
         batch_var.set(name)
         load_batch()
@@ -149,12 +177,12 @@ def create_batch_tab(notebook):
         if not file:
             gui_log("No hay batch seleccionado", level="error")
             return
-        new_name = simpledialog.askstring("Duplicar batch", "Nombre del nuevo archivo (sin .bat):")
+        new_name = simpledialog.askstring("Duplicar batch", f"Nombre del nuevo archivo (sin {BATCH_EXT}):")
         if not new_name: return
         if not validate_batch_name(new_name):
             return
-        if not new_name.lower().endswith(".bat"):
-            new_name += ".bat"
+        if not is_batch_file(new_name):
+            new_name += BATCH_EXT
         src = os.path.join(BATCH_DIR, file)
         dest = os.path.join(BATCH_DIR, new_name)
         if os.path.exists(dest) and not messagebox.askyesno("Sobrescribir", f"{new_name} ya existe. ¿Sobrescribir?"):
@@ -175,12 +203,12 @@ def create_batch_tab(notebook):
             return
         if dirty["value"] and not confirm_save_changes():
             return
-        new_name = simpledialog.askstring("Renombrar batch", "Nuevo nombre (sin .bat):")
+        new_name = simpledialog.askstring("Renombrar batch", f"Nuevo nombre (sin {BATCH_EXT}):")
         if not new_name: return
         if not validate_batch_name(new_name):
             return
-        if not new_name.lower().endswith(".bat"):
-            new_name += ".bat"
+        if not is_batch_file(new_name):
+            new_name += BATCH_EXT
         src = os.path.join(BATCH_DIR, file)
         dest = os.path.join(BATCH_DIR, new_name)
         if os.path.exists(dest):
@@ -238,10 +266,28 @@ def create_batch_tab(notebook):
         output.config(state="disabled")
 
     def append_output(text, level="info"):
-        output.config(state="normal")
-        output.insert("end", f"[{level.upper()}] {text}\n")
-        output.see("end")
-        output.config(state="disabled")
+        # Se puede llamar desde cualquier hilo: las líneas se vuelcan en pump_output
+        output_queue.put((text, level))
+
+    def pump_output():
+        lines = []
+        try:
+            while len(lines) < 500:
+                lines.append(output_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if lines:
+            output.config(state="normal")
+            output.insert("end", "".join(f"[{level.upper()}] {text}\n" for text, level in lines))
+            excess = int(output.index("end-1c").split(".")[0]) - OUTPUT_MAX_LINES
+            if excess > 0:
+                output.delete("1.0", f"{excess + 1}.0")
+            output.see("end")
+            output.config(state="disabled")
+        output.after(OUTPUT_POLL_MS, pump_output)
+
+    def set_run_status(text):
+        run_status_label.after(0, lambda: run_status_label.config(text=text))
 
     def run_batch():
         file = batch_var.get()
@@ -254,23 +300,67 @@ def create_batch_tab(notebook):
         if not os.path.exists(path):
             gui_log("El batch seleccionado no existe", level="error")
             return
-        gui_log(f"▶️ Ejecutando batch: {file}", level="cmd")
+        if job_state["starting"] or (job_state["job"] is not None and job_state["job"].is_running()):
+            gui_log("Ya hay un batch en ejecución; detenlo antes de lanzar otro", level="error")
+            return
+        all_devices = all_devices_var.get()
+        try:
+            timeout = int(timeout_var.get()) or None
+        except (tk.TclError, ValueError):
+            timeout = None
         clear_output()
+        job_state["starting"] = True
+        # Listar dispositivos llama a adb: se hace fuera del hilo de Tk
+        run_in_thread(launch_batch, file, path, all_devices, timeout)
 
-        def worker():
-            try:
-                proc = subprocess.Popen(path, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                out, err = proc.communicate()
-                if out: gui_log(out.strip(), level="info")
-                if err: gui_log(err.strip(), level="error")
-                if out: append_output(out.strip(), level="info")
-                if err: append_output(err.strip(), level="error")
-                append_output(f"Código de salida: {proc.returncode}", level="info")
-            except Exception as e:
-                gui_log(f"Error ejecutando batch: {e}", level="error")
-                append_output(f"Error ejecutando batch: {e}", level="error")
-
-        run_in_thread(worker)
+    def launch_batch(file, path, all_devices, timeout):
+        try:
+            serials = [None]
+            if all_devices:
+                serials = list_device_serials()
+                if not serials:
+                    gui_log("No hay dispositivos conectados", level="error")
+                    return
+            start_batch_job(file, path, serials, timeout)
+        finally:
+            job_state["starting"] = False
+
+    def start_batch_job(file, path, serials, timeout):
+        gui_log(f"▶️ Ejecutando batch: {file} ({len(serials)} dispositivo(s))", level="cmd")
+        multi = len(serials) > 1
+        job_state["pending"] = len(serials)
+        set_run_status(f"En ejecución: {len(serials)}")
+
+        def on_line(serial, stream, line):
+            prefix = f"{serial}: " if multi else ""
+            append_output(prefix + line, level="error" if stream == "stderr" else "info")
+
+        def on_done(serial, code, elapsed, reason):
+            label = f"{serial}: " if multi else ""
+            if reason:
+                msg = f"{label}Batch {reason} tras {elapsed:.1f}s"
+            elif code is None:
+                msg = f"{label}No se pudo ejecutar el batch"
+            else:
+                msg = f"{label}Código de salida: {code} ({elapsed:.1f}s)"
+            ok = code == 0 and not reason
+            append_output(msg, level="info" if ok else "error")
+            gui_log(f"{file} - {msg}", level="info" if ok else "error")
+            # on_done llega desde los hilos del pool, varios a la vez
+            with pending_lock:
+                job_state["pending"] -= 1
+                pending = job_state["pending"]
+            set_run_status(f"En ejecución: {pending}" if pending > 0 else "")
+
+        job_state["job"] = run_batch_parallel(path, serials, timeout=timeout, on_line=on_line, on_done=on_done)
+
+    def stop_batch():
+        job = job_state["job"]
+        if job is None or not job.is_running():
+            gui_log("No hay ningún batch en ejecución", level="error")
+            return
+        job.cancel()
+        gui_log("Deteniendo batch...", level="cmd")
 
     def open_batch_folder():
         path = str(BATCH_DIR)
@@ -294,6 +384,7 @@ def create_batch_tab(notebook):
     # --- Botones ---
     btn_texts = [
         ("Ejecutar", run_batch),
+        ("Detener", stop_batch),
         ("Refrescar", refresh_batch_files),
         ("Guardar", save_batch),
         ("Crear", create_batch),
@@ -306,11 +397,12 @@ def create_batch_tab(notebook):
     action_buttons = []
     for i, (txt, cmd) in enumerate(btn_texts):
         button = ttk.Button(batch_frame, text=txt, command=cmd)
-        button.grid(row=6, column=i % 6, padx=4, pady=4, sticky="ew")
+        button.grid(row=6 + i // 6, column=i % 6, padx=4, pady=4, sticky="ew")
         if txt in {"Ejecutar", "Guardar", "Duplicar", "Renombrar", "Borrar"}:
             action_buttons.append(button)
-        batch_frame.columnconfigure(i, weight=1)
+        batch_frame.columnconfigure(i % 6, weight=1)
 
     # Inicializar
     refresh_batch_files()
+    pump_output()
     return tab_batch
@@ -1,48 +1,71 @@
-import os, subprocess, random, tkinter as tk
+import os, random, tkinter as tk
 from tkinter import ttk, filedialog, simpledialog
-from ..config.config import PROJECT_ROOT
-from ..config.config import TOOLS_DIR, ADB_PATH
-from ..utils.adb_utils import exec_adb, run_in_thread
+from ..config.config import TOOLS_DIR
+from ..utils.adb_utils import exec_adb, run_in_thread, list_device_serials, get_current_serial
 from ..utils.gui_utils import gui_log
-
-# procesos globales
-_scrcpy_proc = None
-_screenrec_proc = None
+from ..utils.screen_utils import take_screenshot, burst_screenshots
+from ..utils.record_utils import start_recording, stop_recording, active_recordings
+from ..utils.input_utils import send_key, send_events, random_taps
+from ..utils.macro_utils import MacroRecorder, save_macro, load_macro, replay_macro
+from ..utils.scrcpy_manager import start_session, stop_session, list_sessions, format_session_stats
 
 # =========================
 # Funciones de comandos
 # =========================
+def resolve_single_serial(all_label):
+    """
+    Serial del dispositivo actual (ANDROID_SERIAL, get-serialno o el único
+    conectado). Con varios y ninguno por defecto devuelve None y remite al
+    botón `all_label`. Llama a adb: solo desde un hilo trabajador.
+    """
+    serial = get_current_serial()
+    if serial is not None:
+        return serial
+    serials = list_device_serials()
+    if not serials:
+        gui_log("No hay dispositivos conectados", level="error")
+        return None
+    if len(serials) > 1:
+        gui_log(f"Hay {len(serials)} dispositivos conectados; usa '{all_label}' "
+                "o fija ANDROID_SERIAL", level="error")
+        return None
+    return serials[0]
+
 def start_scrcpy():
-    global _scrcpy_proc
-    if _scrcpy_proc and getattr(_scrcpy_proc, 'poll', lambda: None)() is None:
-        gui_log("scrcpy ya está en ejecución", level="error")
-        return
-    try:
-        _scrcpy_proc = subprocess.Popen(
-            ["scrcpy"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=str(TOOLS_DIR),
-        )
-        gui_log("scrcpy iniciado", level="info")
-    except Exception as e:
-        gui_log(f"No se pudo iniciar scrcpy: {e}", level="error")
+    """Una sesión para el dispositivo actual; siempre con su serial (-s)."""
+    def task():
+        serial = resolve_single_serial("Start scrcpy (todos)")
+        if serial is not None:
+            start_session(serial)
+    run_in_thread(task)
+
+def start_scrcpy_all():
+    """Una ventana de scrcpy por cada dispositivo conectado."""
+    def task():
+        serials = list_device_serials()
+        if not serials:
+            gui_log("No hay dispositivos conectados", level="error")
+            return
+        for serial in serials:
+            start_session(serial)
+    run_in_thread(task)
 
 def stop_scrcpy():
-    global _scrcpy_proc
-    if not _scrcpy_proc:
+    if not list_sessions():
         gui_log("scrcpy no está en ejecución", level="error")
         return
-    try:
-        _scrcpy_proc.terminate()
-        _scrcpy_proc.wait(timeout=5)
-    except Exception:
-        try:
-            _scrcpy_proc.kill()
-        except Exception:
-            pass
-    _scrcpy_proc = None
-    gui_log("scrcpy detenido", level="info")
+    def task():
+        count = stop_session()
+        gui_log(f"scrcpy detenido ({count} sesión/es)", level="info")
+    run_in_thread(task)
+
+def show_scrcpy_sessions():
+    sessions = list_sessions()
+    if not sessions:
+        gui_log("No hay sesiones de scrcpy", level="info")
+        return
+    for session in sessions:
+        gui_log(format_session_stats(session.stats()), level="info")
 
 def install_apk():
     apk = filedialog.askopenfilename(title="Selecciona APK", filetypes=[("APK files", "*.apk")])
@@ -69,42 +92,144 @@ def get_device_info():
     run_in_thread(lambda: exec_adb(["shell", "getprop"]))
 
 def start_screenrecord():
-    global _screenrec_proc
-    if _screenrec_proc and getattr(_screenrec_proc, 'poll', lambda: None)() is None:
-        gui_log("screenrecord ya en ejecución", level="error")
+    # Se graba directamente al PC (exec-out), sin /sdcard ni pull posterior
+    def task():
+        serial = resolve_single_serial("Start screenrecord (todos)")
+        if serial is not None:
+            start_recording(serial)
+    run_in_thread(task)
+
+def start_screenrecord_all():
+    def task():
+        serials = list_device_serials()
+        if not serials:
+            gui_log("No hay dispositivos conectados", level="error")
+            return
+        for serial in serials:
+            start_recording(serial)
+    run_in_thread(task)
+
+def stop_screenrecord():
+    """Detiene una sola grabación: la única en curso o la del dispositivo elegido."""
+    active = sorted(active_recordings())
+    if not active:
+        gui_log("No hay screenrecord en ejecución", level="error")
         return
-    try:
-        _screenrec_proc = subprocess.Popen(
-            [str(ADB_PATH), "shell", "screenrecord", "/sdcard/record.mp4"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=str(TOOLS_DIR),
-        )
-        gui_log("screenrecord iniciado en /sdcard/record.mp4", level="info")
-    except Exception as e:
-        gui_log(f"No se pudo iniciar screenrecord: {e}", level="error")
-
-def stop_screenrecord_and_pull():
-    global _screenrec_proc
-    if not _screenrec_proc:
+    serial = active[0]
+    if len(active) > 1:
+        serial = simpledialog.askstring(
+            "Stop screenrecord",
+            "Grabaciones en curso:\n" + "\n".join(active) + "\n\nSerial a detener:",
+            initialvalue=active[0])
+        if not serial:
+            return
+        serial = serial.strip()
+        if serial not in active:
+            gui_log(f"No hay grabación en curso para {serial}", level="error")
+            return
+    run_in_thread(stop_recording, serial)
+
+def stop_screenrecord_all():
+    if not active_recordings():
         gui_log("No hay screenrecord en ejecución", level="error")
         return
-    try:
-        _screenrec_proc.terminate()
-        _screenrec_proc.wait(timeout=5)
-    except Exception:
-        try:
-            _screenrec_proc.kill()
-        except Exception:
-            pass
-    _screenrec_proc = None
-    local = filedialog.asksaveasfilename(defaultextension=".mp4",
-                                         filetypes=[("MP4 files", "*.mp4")],
-                                         title="Guardar grabación como")
-    if not local:
-        gui_log("Cancelado pull de grabación", level="error")
+    run_in_thread(stop_recording)
+
+def screenshot():
+    def task():
+        path = take_screenshot()
+        if path:
+            gui_log(f"Captura guardada en {path}", level="info")
+        else:
+            gui_log("No se pudo capturar la pantalla", level="error")
+    run_in_thread(task)
+
+def screenshot_burst():
+    count = simpledialog.askinteger("Ráfaga", "Número de capturas:", initialvalue=10, minvalue=1, maxvalue=1000)
+    if not count:
         return
-    run_in_thread(lambda: exec_adb(["pull", "/sdcard/record.mp4", local]))
+    interval = simpledialog.askfloat("Ráfaga", "Intervalo entre capturas (s, 0 = lo más rápido posible):",
+                                     initialvalue=0.0, minvalue=0.0)
+    if interval is None:
+        return
+    def task():
+        gui_log(f"Ráfaga de {count} capturas...", level="cmd")
+        paths = burst_screenshots(count, interval=interval)
+        if paths:
+            gui_log(f"{len(paths)} captura(s) guardadas en {paths[0].parent}", level="info")
+        else:
+            gui_log("No se pudo capturar la pantalla", level="error")
+    run_in_thread(task)
+
+def crazy_taps(count=10):
+    """10 taps aleatorios en una sola invocación; la semilla se registra para poder repetirlos."""
+    seed = random.randrange(1 << 32)
+    gui_log(f"Crazy taps (semilla {seed})", level="cmd")
+    run_in_thread(send_events, random_taps(count, seed=seed))
+
+# =========================
+# Macros
+# =========================
+_macro_recorder = None
+
+def start_macro_recording():
+    global _macro_recorder
+    if _macro_recorder is not None:
+        gui_log("Ya se está grabando una macro", level="error")
+        return
+    recorder = MacroRecorder()
+    _macro_recorder = recorder
+    def task():
+        global _macro_recorder
+        if recorder.start():
+            gui_log("Grabando macro: usa el teléfono y pulsa 'Detener macro'", level="info")
+        else:
+            gui_log("No se pudo iniciar la grabación de macro", level="error")
+            _macro_recorder = None
+    run_in_thread(task)
+
+def stop_macro_recording(widget):
+    global _macro_recorder
+    recorder = _macro_recorder
+    if recorder is None:
+        gui_log("No hay grabación de macro en curso", level="error")
+        return
+    _macro_recorder = None
+    # stop() espera a que getevent termine (varios segundos si no responde):
+    # fuera del hilo de Tk; el diálogo de guardar vuelve a él con after()
+    def task():
+        events = recorder.stop()
+        widget.after(0, lambda: save_recorded_macro(events))
+    run_in_thread(task)
+
+def save_recorded_macro(events):
+    if not events:
+        gui_log("La macro no tiene eventos", level="error")
+        return
+    path = filedialog.asksaveasfilename(defaultextension=".macro", filetypes=[("Macros", "*.macro")],
+                                        title="Guardar macro como")
+    if not path:
+        return
+    save_macro(path, events)
+    gui_log(f"Macro guardada ({len(events)} eventos): {path}", level="info")
+
+def replay_macro_file(all_devices=False):
+    path = filedialog.askopenfilename(filetypes=[("Macros", "*.macro")], title="Selecciona macro")
+    if not path:
+        return
+    def task():
+        try:
+            timed = load_macro(path)
+        except (OSError, ValueError) as e:
+            gui_log(f"Error leyendo macro: {e}", level="error")
+            return
+        serials = list_device_serials() if all_devices else [None]
+        if not serials:
+            gui_log("No hay dispositivos conectados", level="error")
+            return
+        gui_log(f"Reproduciendo {os.path.basename(path)} en {len(serials)} dispositivo(s)", level="cmd")
+        replay_macro(timed, serials)
+    run_in_thread(task)
 
 def set_wallpaper_via_agent():
     img = filedialog.askopenfilename(title="Selecciona imagen", filetypes=[("Imágenes", "*.jpg;*.png")])
@@ -158,9 +283,11 @@ def create_commands_tab(notebook):
     apps_tab = ttk.Frame(sections)
     control_tab = ttk.Frame(sections)
     other_tab = ttk.Frame(sections)
+    macros_tab = ttk.Frame(sections)
     sections.add(apps_tab, text="Apps")
     sections.add(control_tab, text="Control")
     sections.add(other_tab, text="Otros")
+    sections.add(macros_tab, text="Macros")
 
     apps_commands = [
         ("Play Store", lambda: run_in_thread(lambda: exec_adb(["shell", "monkey", "-p", "com.android.vending", "-c", "android.intent.category.LAUNCHER", "1"]))),
@@ -171,16 +298,18 @@ def create_commands_tab(notebook):
         ("Ajustes", lambda: run_in_thread(lambda: exec_adb(["shell", "am", "start", "-a", "android.settings.SETTINGS"]))),
     ]
 
+    # Las teclas van por el shell persistente (input_utils): sin arrancar adb en cada pulsación
     control_commands = [
-        ("Home", lambda: run_in_thread(lambda: exec_adb(["shell", "input", "keyevent", "3"]))),
-        ("Back", lambda: run_in_thread(lambda: exec_adb(["shell", "input", "keyevent", "4"]))),
-        ("Recientes", lambda: run_in_thread(lambda: exec_adb(["shell", "input", "keyevent", "187"]))),
-        ("Power", lambda: run_in_thread(lambda: exec_adb(["shell", "input", "keyevent", "26"]))),
-        ("Vol +", lambda: run_in_thread(lambda: exec_adb(["shell", "input", "keyevent", "24"]))),
-        ("Vol -", lambda: run_in_thread(lambda: exec_adb(["shell", "input", "keyevent", "25"]))),
-        ("Mute", lambda: run_in_thread(lambda: exec_adb(["shell", "input", "keyevent", "164"]))),
-        ("Screenshot", lambda: run_in_thread(lambda: exec_adb(["shell", "screencap", "-p", "/sdcard/screen.png"]) or exec_adb(["pull", "/sdcard/screen.png", os.path.join(PROJECT_ROOT, "screenshot.png")]))),
-        ("Crazy taps", lambda: run_in_thread(lambda: [exec_adb(["shell", "input", "tap", str(random.randint(0, 1080)), str(random.randint(0, 1920))]) for _ in range(10)])),
+        ("Home", lambda: run_in_thread(send_key, 3)),
+        ("Back", lambda: run_in_thread(send_key, 4)),
+        ("Recientes", lambda: run_in_thread(send_key, 187)),
+        ("Power", lambda: run_in_thread(send_key, 26)),
+        ("Vol +", lambda: run_in_thread(send_key, 24)),
+        ("Vol -", lambda: run_in_thread(send_key, 25)),
+        ("Mute", lambda: run_in_thread(send_key, 164)),
+        ("Screenshot", screenshot),
+        ("Screenshot ráfaga", screenshot_burst),
+        ("Crazy taps", crazy_taps),
     ]
 
     other_commands = [
@@ -189,15 +318,27 @@ def create_commands_tab(notebook):
         ("Install APK", install_apk),
         ("Uninstall app", uninstall_app),
         ("Start scrcpy", start_scrcpy),
+        ("Start scrcpy (todos)", start_scrcpy_all),
         ("Stop scrcpy", stop_scrcpy),
+        ("Sesiones scrcpy", show_scrcpy_sessions),
         ("Start screenrecord", start_screenrecord),
-        ("Stop screenrecord & pull", stop_screenrecord_and_pull),
+        ("Start screenrecord (todos)", start_screenrecord_all),
+        ("Stop screenrecord", stop_screenrecord),
+        ("Stop screenrecord (todos)", stop_screenrecord_all),
         ("Elegir fondo", set_wallpaper_via_agent),
         ("Get device info", get_device_info),
         ("Dump logcat", dump_logcat),
     ]
 
+    macro_commands = [
+        ("Grabar macro", start_macro_recording),
+        ("Detener macro", lambda: stop_macro_recording(macros_tab)),
+        ("Reproducir macro", lambda: replay_macro_file(all_devices=False)),
+        ("Reproducir en todos", lambda: replay_macro_file(all_devices=True)),
+    ]
+
     build_section(apps_tab, apps_commands)
+    build_section(macros_tab, macro_commands, cols=2)
     build_section(control_tab, control_commands)
     build_section(other_tab, other_commands)
 
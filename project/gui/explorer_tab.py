@@ -1,12 +1,51 @@
-import os, tkinter as tk
-from tkinter import ttk
-from ..utils.adb_utils import exec_adb, run_in_thread
+import base64, os, posixpath, shlex, tkinter as tk
+from tkinter import ttk, messagebox
+from ..utils.adb_utils import exec_adb, run_in_thread, get_current_serial
+from ..utils.android_fs import (
+    list_dir_async, prefetch_children, invalidate_dir, join_android_path, normalize_android_path,
+    search_device, cancel_search, drop_index
+)
+from ..utils.local_fs import scan_local_dir
+from ..utils.thumbnails import THUMB_SIZE, is_image_name, load_thumbnail_async
 from ..utils.gui_utils import gui_log
+from .virtual_tree import VirtualTreeview
 
 # historiales de navegación
 local_history = []
 android_history = []
 
+EXPLORER_COLUMNS = ("name", "type", "size", "mtime")
+EXPLORER_HEADINGS = ("Nombre", "Tipo", "Tamaño", "Modificado")
+
+
+def _size_sort_key(value):
+    return value if isinstance(value, int) else -1
+
+
+def _make_file_view(parent):
+    """Lista virtual de archivos: directorios primero y tamaños ordenados como número."""
+    view = VirtualTreeview(
+        parent, EXPLORER_COLUMNS, EXPLORER_HEADINGS,
+        sort_keys={"size": _size_sort_key},
+        default_sort=lambda row: (row[1] != "Dir", str(row[0]).lower()),
+    )
+    view.tree.pack(fill="both", expand=True, side="left")
+    view.scrollbar.pack(side="right", fill="y")
+    return view
+
+def _photo_from_bytes(data):
+    """PhotoImage a partir de PNG/GIF; si viene grande se reduce con subsample."""
+    img = tk.PhotoImage(data=base64.b64encode(data))
+    factor = -(-max(img.width(), img.height()) // THUMB_SIZE[0])
+    return img.subsample(factor) if factor > 1 else img
+
+# dispositivo que muestra el panel Android (se resuelve en segundo plano)
+android_state = {"serial": None, "search": False}
+# ruta cuya miniatura se está mostrando en el panel Android
+preview_state = {"path": None}
+# cada listado local lleva una generación; los bloques de listados viejos se descartan
+local_state = {"gen": 0}
+
 def create_explorer_tab(notebook):
     tab_explorer = ttk.Frame(notebook)
     notebook.add(tab_explorer, text="Explorador")
@@ -41,17 +80,8 @@ def create_explorer_tab(notebook):
     btn_back_local.pack(side="left", padx=2)
     btn_up_local.pack(side="left", padx=2)
 
-    local_tree = ttk.Treeview(left_frame, columns=("name","type","size"), show="headings")
-    local_tree.heading("name", text="Nombre")
-    local_tree.heading("type", text="Tipo")
-    local_tree.heading("size", text="Tamaño")
-    local_tree.tag_configure('evenrow', background='#3a3a3a', foreground='#ffffff')
-    local_tree.tag_configure('oddrow', background='#2e2e2e', foreground='#ffffff')
-    local_tree.pack(fill="both", expand=True, side="left")
-
-    scroll_y_local = ttk.Scrollbar(left_frame, orient="vertical", command=local_tree.yview)
-    local_tree.configure(yscrollcommand=scroll_y_local.set)
-    scroll_y_local.pack(side="right", fill="y")
+    local_view = _make_file_view(left_frame)
+    local_tree = local_view.tree
 
     # =============================
     # PANEL DERECHO (ANDROID)
@@ -75,89 +105,227 @@ def create_explorer_tab(notebook):
     btn_up_android = ttk.Button(nav_frame_android, text="Arriba")
     btn_back_android.pack(side="left", padx=2)
     btn_up_android.pack(side="left", padx=2)
-
-    android_tree = ttk.Treeview(right_frame, columns=("name","type","size"), show="headings")
-    android_tree.heading("name", text="Nombre")
-    android_tree.heading("type", text="Tipo")
-    android_tree.heading("size", text="Tamaño")
-    android_tree.tag_configure('evenrow', background='#3a3a3a', foreground='#ffffff')
-    android_tree.tag_configure('oddrow', background='#2e2e2e', foreground='#ffffff')
-    android_tree.pack(fill="both", expand=True, side="left")
-
-    scroll_y_android = ttk.Scrollbar(right_frame, orient="vertical", command=android_tree.yview)
-    android_tree.configure(yscrollcommand=scroll_y_android.set)
-    scroll_y_android.pack(side="right", fill="y")
+    btn_search_android = ttk.Button(nav_frame_android, text="Buscar en dispositivo")
+    btn_search_android.pack(side="left", padx=2)
+    use_index_var = tk.BooleanVar(value=True)
+    ttk.Checkbutton(nav_frame_android, text="Usar índice", variable=use_index_var).pack(side="left", padx=2)
+    btn_reindex_android = ttk.Button(nav_frame_android, text="Reindexar")
+    btn_reindex_android.pack(side="left", padx=2)
+
+    # Vista previa (se empaqueta antes que la lista para reservarle el hueco inferior)
+    preview_frame = tk.Frame(right_frame, height=THUMB_SIZE[1] + 8, background="#313338")
+    preview_frame.pack(side="bottom", fill="x", pady=(4, 0))
+    preview_frame.pack_propagate(False)
+    preview_label = tk.Label(preview_frame, text="Sin vista previa", background="#313338", foreground="#a3a6aa")
+    preview_label.pack(fill="both", expand=True)
+
+    android_view = _make_file_view(right_frame)
+    android_tree = android_view.tree
 
     # =============================
     # FUNCIONES DE LISTADO
     # =============================
     def list_local(path):
+        """Lista `path` en un hilo con os.scandir y va pintando por bloques."""
+        local_state["gen"] += 1
+        gen = local_state["gen"]
+        local_view.clear()
+        local_path_label.config(text=f"{path} (cargando...)")
+
+        def is_stale():
+            return local_state["gen"] != gen
+
+        def on_chunk(rows):
+            local_tree.after(0, lambda: None if is_stale() else local_view.append_rows(rows))
+
+        def on_done(error):
+            def finish():
+                if is_stale():
+                    return
+                if error:
+                    gui_log(f"Error listando local: {error}", level="error")
+                local_path_label.config(text=f"{path} ({local_view.total_rows()} elementos)")
+            local_tree.after(0, finish)
+
+        run_in_thread(scan_local_dir, path, on_chunk, on_done, is_stale)
+
+    def render_android(path, entries):
+        # Solo se pinta si sigue siendo el directorio actual
+        if android_state["search"] or normalize_android_path(android_path_var.get()) != path:
+            return
         try:
-            local_tree.delete(*local_tree.get_children())
-            items = os.listdir(path)
-            for i, name in enumerate(items):
-                full = os.path.join(path, name)
-                t = "Dir" if os.path.isdir(full) else "File"
-                s = str(os.path.getsize(full)) if os.path.isfile(full) else ""
-                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-                local_tree.insert("", "end", values=(name, t, s), tags=(tag,))
-            local_path_label.config(text=path)
-        except Exception as e:
-            gui_log(f"Error listando local: {e}", level="error")
-
-    def adb_list(path):
-        try:
-            out = exec_adb(["shell", "ls", "-1", "-p", path])
-            android_tree.delete(*android_tree.get_children())
-            for i, line in enumerate(out.splitlines()):
-                t = "Dir" if line.endswith("/") else "File"
-                name = line.rstrip("/")
-                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-                android_tree.insert("", "end", values=(name, t, ""), tags=(tag,))
+            android_view.set_rows(entries)
             android_path_label.config(text=path)
         except Exception as e:
             gui_log(f"Error listando android: {e}", level="error")
 
+    def show_list_error(path):
+        # Quita el "(cargando...)" si el listado falló y sigue siendo el directorio actual
+        if not android_state["search"] and normalize_android_path(android_path_var.get()) == path:
+            android_path_label.config(text=f"{path} (error al listar)")
+
+    def adb_list(path, force=False):
+        """Lista `path` desde la caché y revalida en segundo plano; nunca bloquea la GUI."""
+        serial = android_state["serial"]
+        if android_state["search"]:
+            android_state["search"] = False
+            cancel_search()
+            android_view.set_filter(android_search_var.get())
+
+        def on_result(res_path, entries, error):
+            if error:
+                gui_log(f"Error listando android: {error}", level="error")
+                android_tree.after(0, lambda: show_list_error(res_path))
+                return
+            android_tree.after(0, lambda: render_android(res_path, entries))
+            prefetch_children(serial, res_path, entries)
+
+        android_path_label.config(text=f"{path} (cargando...)")
+        list_dir_async(serial, path, on_result, force=force)
+
+    def refresh_android_device():
+        """Resuelve el serial fuera del hilo de Tk y vuelve a listar."""
+        def worker():
+            serial = get_current_serial()
+            if serial != android_state["serial"]:
+                android_state["serial"] = serial
+            android_tree.after(0, lambda: adb_list(android_path_var.get()))
+        run_in_thread(worker)
+
+    def android_target(name):
+        # En modo búsqueda la columna nombre lleva la ruta absoluta
+        if str(name).startswith("/"):
+            return name
+        return join_android_path(android_path_var.get(), name)
+
+    def search_android(event=None):
+        """Búsqueda recursiva bajo el directorio actual: un `find` o el índice cacheado."""
+        query = android_search_var.get().strip()
+        if not query:
+            adb_list(android_path_var.get())
+            return
+        root = normalize_android_path(android_path_var.get())
+        serial = android_state["serial"]
+        android_state["search"] = True
+        android_view.set_filter("")
+        android_view.clear()
+        android_path_label.config(text=f"Buscando '{query}' en {root}...")
+
+        def on_chunk(entries):
+            if entries:
+                android_tree.after(0, lambda: android_state["search"] and android_view.append_rows(entries))
+
+        def on_done(error, from_index):
+            def finish():
+                if not android_state["search"]:
+                    return
+                if error:
+                    gui_log(f"Error buscando en android: {error}", level="error")
+                origin = "índice" if from_index else "find"
+                android_path_label.config(text=f"'{query}' en {root}: {android_view.total_rows()} resultado(s) ({origin})")
+            android_tree.after(0, finish)
+
+        run_in_thread(search_device, serial, root, query, on_chunk, on_done, use_index_var.get())
+
+    def show_preview(path, data):
+        if preview_state["path"] != path:
+            return
+        if not data:
+            preview_label.config(image="", text="Sin vista previa")
+            preview_label.image = None
+            return
+        try:
+            img = _photo_from_bytes(data)
+        except tk.TclError:
+            preview_label.config(image="", text="Formato no soportado")
+            return
+        preview_label.config(image=img, text="")
+        preview_label.image = img
+
+    def on_android_select(event=None):
+        """Miniatura bajo demanda de la fila seleccionada (sin bajar la foto completa)."""
+        sel = android_view.selected_values()
+        if not sel or sel[1] != "File" or not is_image_name(sel[0]):
+            preview_state["path"] = None
+            show_preview(None, None)
+            return
+        path = android_target(sel[0])
+        if preview_state["path"] == path:
+            return
+        preview_state["path"] = path
+        preview_label.config(image="", text="Cargando vista previa...")
+        load_thumbnail_async(
+            android_state["serial"], path,
+            lambda p, data: android_tree.after(0, lambda: show_preview(p, data)),
+            size=sel[2], mtime=sel[3],
+            is_wanted=lambda: preview_state["path"] == path,
+        )
+
+    def reindex_android():
+        drop_index(android_state["serial"])
+        if android_search_var.get().strip():
+            search_android()
+
     # =============================
     # TRANSFERENCIA
     # =============================
     def upload_to_device():
-        sel = local_tree.selection()
+        sel = local_view.selected_values()
         if not sel:
             gui_log("Selecciona un archivo local para subir", level="error")
             return
-        name = local_tree.item(sel[0])["values"][0]
+        name = sel[0]
         src = os.path.join(local_path_var.get(), name)
-        dst = android_path_var.get().rstrip("/") + "/" + name
+        remote_dir = normalize_android_path(android_path_var.get())
+        dst = join_android_path(remote_dir, name)
+        serial = android_state["serial"]
         def worker():
             gui_log(f"SUBIENDO {src} -> {dst}", level="cmd")
-            out = exec_adb(["push", src, dst])
+            out = exec_adb(["push", src, dst], serial=serial)
             gui_log(out)
-            adb_list(android_path_var.get())
+            invalidate_dir(serial, remote_dir)
+            android_tree.after(0, lambda: adb_list(remote_dir, force=True))
+        run_in_thread(worker)
+
+    def delete_on_device():
+        sel = android_view.selected_values()
+        if not sel:
+            gui_log("Selecciona un archivo del dispositivo para borrar", level="error")
+            return
+        target = android_target(sel[0])
+        remote_dir = posixpath.dirname(target) or "/"
+        if not messagebox.askyesno("Borrar", f"¿Borrar {target} del dispositivo?"):
+            return
+        serial = android_state["serial"]
+        def worker():
+            exec_adb(["shell", "rm", "-rf", shlex.quote(target)], serial=serial)
+            invalidate_dir(serial, target)
+            invalidate_dir(serial, remote_dir)
+            android_tree.after(0, lambda: adb_list(android_path_var.get(), force=True))
         run_in_thread(worker)
 
     def download_from_device():
-        sel = android_tree.selection()
+        sel = android_view.selected_values()
         if not sel:
             gui_log("Selecciona un archivo del dispositivo para descargar", level="error")
             return
-        name = android_tree.item(sel[0])["values"][0]
-        src = android_path_var.get().rstrip("/") + "/" + name
-        dst = os.path.join(local_path_var.get(), name)
+        src = android_target(sel[0])
+        dst = os.path.join(local_path_var.get(), posixpath.basename(src))
+        serial = android_state["serial"]
         def worker():
             gui_log(f"DESCARGANDO {src} -> {dst}", level="cmd")
-            out = exec_adb(["pull", src, dst])
+            out = exec_adb(["pull", src, dst], serial=serial)
             gui_log(out)
-            list_local(local_path_var.get())
+            local_tree.after(0, lambda: list_local(local_path_var.get()))
         run_in_thread(worker)
 
     # =============================
     # NAVEGACIÓN
     # =============================
     def open_local_dir(event):
-        sel = local_tree.selection()
+        sel = local_view.selected_values()
         if not sel: return
-        name, t, _ = local_tree.item(sel[0])["values"]
+        name, t = sel[0], sel[1]
         if t == "Dir":
             curr = local_path_var.get()
             local_history.append(curr)
@@ -166,16 +334,17 @@ def create_explorer_tab(notebook):
             list_local(new_path)
 
     def open_android_dir(event):
-        sel = android_tree.selection()
+        sel = android_view.selected_values()
         if not sel: return
-        name, t, _ = android_tree.item(sel[0])["values"]
+        name, t = sel[0], sel[1]
         if t == "Dir":
-            curr = android_path_var.get().rstrip("/")
+            curr = normalize_android_path(android_path_var.get())
             android_history.append(curr)
-            new_path = curr + "/" + name
+            new_path = android_target(name)
             android_path_var.set(new_path)
             adb_list(new_path)
 
+    android_tree.bind("<<TreeviewSelect>>", on_android_select, add="+")
     local_tree.bind("<Double-1>", open_local_dir)
     android_tree.bind("<Double-1>", open_android_dir)
 
@@ -200,9 +369,9 @@ def create_explorer_tab(notebook):
             adb_list(prev)
 
     def go_up_android():
-        curr = android_path_var.get().rstrip("/")
-        parent = "/".join(curr.split("/")[:-1])
-        if parent:
+        curr = normalize_android_path(android_path_var.get())
+        parent = "/".join(curr.split("/")[:-1]) or "/"
+        if parent != curr:
             android_history.append(curr)
             android_path_var.set(parent)
             adb_list(parent)
@@ -211,6 +380,8 @@ def create_explorer_tab(notebook):
     btn_up_local.config(command=go_up_local)
     btn_back_android.config(command=go_back_android)
     btn_up_android.config(command=go_up_android)
+    btn_search_android.config(command=search_android)
+    btn_reindex_android.config(command=reindex_android)
 
     # =============================
     # BOTONES DE TRANSFERENCIA
@@ -221,33 +392,23 @@ def create_explorer_tab(notebook):
     ttk.Button(btns_frame, text="Refrescar PC", command=lambda: list_local(local_path_var.get())).grid(row=0, column=0, padx=5, pady=2, sticky="ew")
     ttk.Button(btns_frame, text="Subir →", command=upload_to_device).grid(row=0, column=1, padx=5, pady=2, sticky="ew")
     ttk.Button(btns_frame, text="← Descargar", command=download_from_device).grid(row=0, column=2, padx=5, pady=2, sticky="ew")
-    ttk.Button(btns_frame, text="Refrescar Android", command=lambda: adb_list(android_path_var.get())).grid(row=0, column=3, padx=5, pady=2, sticky="ew")
+    ttk.Button(btns_frame, text="Refrescar Android", command=lambda: adb_list(android_path_var.get(), force=True)).grid(row=0, column=3, padx=5, pady=2, sticky="ew")
+    ttk.Button(btns_frame, text="Borrar en Android", command=delete_on_device).grid(row=0, column=4, padx=5, pady=2, sticky="ew")
 
-    for i in range(4):
+    for i in range(5):
         btns_frame.columnconfigure(i, weight=1)
 
     # =============================
     # BÚSQUEDA
     # =============================
-    def filter_local(*args):
-        search = local_search_var.get().lower()
-        for item in local_tree.get_children():
-            name = local_tree.item(item)["values"][0].lower()
-            if search in name:
-                local_tree.reattach(item, '', 'end')
-            else:
-                local_tree.detach(item)
-    local_search_var.trace_add("write", filter_local)
-
-    def filter_android(*args):
-        search = android_search_var.get().lower()
-        for item in android_tree.get_children():
-            name = android_tree.item(item)["values"][0].lower()
-            if search in name:
-                android_tree.reattach(item, '', 'end')
-            else:
-                android_tree.detach(item)
-    android_search_var.trace_add("write", filter_android)
+    # El filtro se aplica sobre la lista en Python; no toca los items de Tk
+    local_search_var.trace_add("write", lambda *args: local_view.set_filter(local_search_var.get()))
+    # Mientras se muestran resultados de búsqueda el texto no filtra (Enter vuelve a buscar)
+    android_search_var.trace_add(
+        "write",
+        lambda *args: None if android_state["search"] else android_view.set_filter(android_search_var.get()),
+    )
+    android_search_entry.bind("<Return>", search_android)
 
     # =============================
     # ESTILOS
@@ -270,8 +431,8 @@ def create_explorer_tab(notebook):
         tab_id = event.widget.select()
         if event.widget.tab(tab_id, "text") == "Explorador":
             list_local(local_path_var.get())
-            adb_list(android_path_var.get())
+            refresh_android_device()
 
-    notebook.bind("<<NotebookTabChanged>>", on_tab_change)
+    notebook.bind("<<NotebookTabChanged>>", on_tab_change, add="+")
 
     return tab_explorer
\ No newline at end of file
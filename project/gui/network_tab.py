@@ -1,15 +1,20 @@
 # network_tab.py
 import ipaddress
-import platform
 import re
 import socket
-import subprocess
+import threading
+import time
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, simpledialog
 
 from ..utils.adb_utils import exec_adb, run_in_thread
 from ..utils.gui_utils import gui_log
-from ..utils.net_utils import find_ip_from_mac, _get_local_ipv4_and_prefix, _ping_sweep_cold
+from ..utils.net_interfaces import default_interface, list_interfaces
+from ..utils.net_scan import sweep_interfaces
+from ..utils.net_utils import read_arp_table
+from ..utils.mdns import MdnsBrowser
+from ..utils.profile_store import get_profile_store
 from .profiles_tab import add_profile
 
 
@@ -25,137 +30,49 @@ _interface_details_var = None
 _interface_entries = []  # [(label, ip)]
 
 _available_list = None
+_mdns_browser = None
+_hosts = {}  # mac normalizada -> {"ip", "mac", "adb_open", "last_seen"}; fila "arp:<mac>"
+_continuous_var = None
+_scan_lock = threading.Lock()  # un único barrido a la vez (botón, pestaña o continuo)
 
 AUTO_INTERFACE_LABEL = "Red local"
+MDNS_ORIGIN = {"connect": "mDNS conexión", "pairing": "mDNS emparejamiento"}
+ADB_PORT = 5555
+ADB_CHECK_TIMEOUT = 0.3      # s por comprobación del puerto adb
+MAX_PARALLEL_ADB_CHECKS = 32
+STALE_AFTER = 600            # s sin aparecer en la tabla de vecinos antes de quitar un host
+AGE_TICK_MS = 5000           # refresco de la columna «Visto»
+CONTINUOUS_INTERVAL_MS = 60000
 
 
 # =========================
-# Interfaces (tu versión, funcionando)
+# Interfaces (caché de utils.net_interfaces: sin procesos al cambiar de pestaña)
 # =========================
-def _list_windows_interfaces():
-    try:
-        output = subprocess.check_output(
-            ["ipconfig"],
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
-    except Exception as exc:
-        gui_log(f"No se pudo ejecutar ipconfig: {exc}", level="error")
-        return []
-
-    interfaces = []
-    current_name = None
-    current_ip = None
-
-    for raw_line in output.splitlines():
-        line = raw_line.rstrip()
-        if line and not line.startswith(" "):
-            if current_name and current_ip:
-                interfaces.append((current_name, current_ip))
-            current_name = line.strip().rstrip(":")
-            current_ip = None
-            continue
-
-        if current_name:
-            match = re.search(r"(IPv4 Address|Direcci[oó]n IPv4).+?:\s*(.+)$", line)
-            if match:
-                ip = match.group(2).strip()
-                ip = ip.replace("(Preferred)", "").strip()
-                current_ip = ip
-
-    if current_name and current_ip:
-        interfaces.append((current_name, current_ip))
-
-    return interfaces
-
-
-def _list_unix_interfaces():
-    interfaces = []
-    # Preferir 'ip' si existe
-    try:
-        output = subprocess.check_output(
-            ["ip", "-o", "-4", "addr", "show"],
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
-        for line in output.splitlines():
-            parts = line.split()
-            if len(parts) >= 4:
-                name = parts[1]
-                address = parts[3].split("/")[0]
-                if address != "127.0.0.1":
-                    interfaces.append((name, address))
-        if interfaces:
-            return interfaces
-    except Exception:
-        pass
-
-    # Fallback a ifconfig
-    try:
-        output = subprocess.check_output(
-            ["ifconfig"],
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
-    except Exception as exc:
-        gui_log(f"No se pudo detectar interfaces: {exc}", level="error")
-        return []
-
-    current_name = None
-    for line in output.splitlines():
-        if line and not line.startswith(" "):
-            current_name = line.split(":", 1)[0]
-            continue
-        if current_name:
-            match = re.search(r"inet (\d+\.\d+\.\d+\.\d+)", line)
-            if match:
-                address = match.group(1)
-                if address != "127.0.0.1":
-                    interfaces.append((current_name, address))
-
-    return interfaces
-
-
-def _list_network_interfaces():
-    system = platform.system().lower()
-    if system == "windows":
-        return _list_windows_interfaces()
-    return _list_unix_interfaces()
-
-
 def _update_interface_details():
     if not _interface_var or not _interface_details_var:
         return
     selected = _interface_var.get()
     if selected == AUTO_INTERFACE_LABEL:
-        local_ip, _ = _get_local_ipv4_and_prefix()
-        if local_ip:
-            _interface_details_var.set(f"IP local (auto): {local_ip}")
+        iface = default_interface()
+        if iface:
+            _interface_details_var.set(f"IP local (auto): {iface.cidr} en {iface.name}")
         else:
             _interface_details_var.set("No se pudo detectar IP local.")
         return
 
-    selected_ip = ""
-    for label, ip in _interface_entries:
+    for label, iface in _interface_entries:
         if label == selected:
-            selected_ip = ip
-            break
-
-    if selected_ip:
-        _interface_details_var.set(f"IP local: {selected_ip}")
-    else:
-        _interface_details_var.set("Selecciona una interfaz de red")
+            _interface_details_var.set(f"IP local: {iface.cidr} (red {iface.network})")
+            return
+    _interface_details_var.set("Selecciona una interfaz de red")
 
 
-def refresh_interfaces():
+def refresh_interfaces(force=False):
     global _interface_entries
     if _interface_combo is None or _interface_var is None or _interface_details_var is None:
         return
 
-    interfaces = _list_network_interfaces()
+    interfaces = list_interfaces(force=force)
     if not interfaces:
         _interface_entries = []
         _interface_combo["values"] = [AUTO_INTERFACE_LABEL]
@@ -163,7 +80,7 @@ def refresh_interfaces():
         _interface_details_var.set("No se detectaron interfaces con IPv4.")
         return
 
-    _interface_entries = [(f"{name} ({ip})", ip) for name, ip in interfaces]
+    _interface_entries = [(f"{iface.name} ({iface.cidr})", iface) for iface in interfaces]
     values = [AUTO_INTERFACE_LABEL] + [entry[0] for entry in _interface_entries]
     _interface_combo["values"] = values
 
@@ -173,160 +90,165 @@ def refresh_interfaces():
     _update_interface_details()
 
 
-def _resolve_interface_ip():
-    """Devuelve IP seleccionada o IP auto si aplica."""
+def _resolve_interface():
+    """Interfaz seleccionada (o la automática) como NetInterface."""
     if _interface_var is None:
         return None
     selected = _interface_var.get()
     if not selected or selected == AUTO_INTERFACE_LABEL:
-        local_ip, _ = _get_local_ipv4_and_prefix()
-        return local_ip
+        return default_interface()
 
-    for label, ip in _interface_entries:
+    for label, iface in _interface_entries:
         if label == selected:
-            return ip
+            return iface
     return None
 
 
+def _resolve_interface_ip():
+    """Devuelve IP seleccionada o IP auto si aplica."""
+    iface = _resolve_interface()
+    return iface.ip if iface else None
+
+
+def _selected_interfaces():
+    """Interfaces a barrer: la elegida o, en modo automático, todas las activas."""
+    if _interface_var is None or _interface_var.get() in ("", AUTO_INTERFACE_LABEL):
+        return list_interfaces()
+    iface = _resolve_interface()
+    return [iface] if iface else []
+
+
 # =========================
-# ARP / Escaneo (lo "bueno" del tab de red)
+# ARP / Escaneo (modelo por MAC: las filas se actualizan en su sitio)
 # =========================
-def _parse_arp_tables(output: str):
-    """
-    Windows suele incluir líneas tipo:
-      Interface: 192.168.1.10 --- 0x9
-      192.168.1.1           00-11-22-33-44-55   dynamic
-    Linux/mac puede variar; aquí capturamos lo típico: IP + MAC.
-    """
-    tables = {}
-    current_interface = None
-
-    for raw_line in output.splitlines():
-        line = raw_line.strip()
-        if not line:
-            continue
-
-        # Windows: "Interface: 192.168.1.10 --- 0x..."
-        if line.lower().startswith("interface:"):
-            parts = line.split()
-            # parts[1] suele ser la IP
-            if len(parts) >= 2:
-                current_interface = parts[1]
-                tables.setdefault(current_interface, [])
-            continue
-
-        parts = line.split()
-        if len(parts) >= 2 and re.match(r"^\d{1,3}(\.\d{1,3}){3}$", parts[0]):
-            ip = parts[0]
-            mac = parts[1]
-            if current_interface:
-                tables.setdefault(current_interface, []).append((ip, mac))
-            else:
-                tables.setdefault("unknown", []).append((ip, mac))
-
-    return tables
-
-
-def _entries_for_interface(tables, interface_ip, prefix=24):
-    if not interface_ip:
-        return []
-    if interface_ip in tables:
-        return tables.get(interface_ip, [])
-    try:
-        net = ipaddress.ip_network(f"{interface_ip}/{prefix}", strict=False)
-    except ValueError:
-        return []
+def _is_unicast_mac(mac):
+    first_octet = int(mac[:2], 16) if re.match(r"^[0-9a-f]{2}-", mac) else 1
+    return not first_octet & 1  # bit de multicast/broadcast (ff-ff-..., 01-00-5e-...)
 
-    entries = []
-    for values in tables.values():
-        for ip, mac in values:
-            try:
-                if ipaddress.ip_address(ip) in net:
-                    entries.append((ip, mac))
-            except ValueError:
-                continue
-    return entries
+
+def _check_adb_port(ip):
+    try:
+        with socket.create_connection((ip, ADB_PORT), timeout=ADB_CHECK_TIMEOUT):
+            return True
+    except OSError:
+        return False
 
 
 def scan_network_with_adb_status_callback(callback=None):
     """
-    Lee `arp -a` y por cada (ip, mac) llama callback(ip, mac, adb_open).
+    Lee la tabla de vecinos, se queda con los hosts de las redes de las
+    interfaces seleccionadas y llama callback(ip, mac, adb_open) por cada uno.
+    Los puertos adb se comprueban en paralelo.
     """
     try:
-        out = subprocess.getoutput("arp -a")
-        tables = _parse_arp_tables(out)
-
-        local_ip, prefix = _get_local_ipv4_and_prefix()
-        prefix = prefix or 24
-
-        target_ip = _resolve_interface_ip() or local_ip
-        entries = _entries_for_interface(tables, target_ip, prefix=prefix)
+        networks = [iface.network for iface in _selected_interfaces()]
+        entries = []
+        for mac, ip in read_arp_table().items():
+            try:
+                in_networks = any(ipaddress.ip_address(ip) in net for net in networks)
+            except ValueError:
+                continue
+            if in_networks and _is_unicast_mac(mac):
+                entries.append((ip, mac))
 
         if not entries:
             gui_log("No se encontraron dispositivos en la red seleccionada.", level="error")
             return
 
-        for ip, mac in entries:
-            adb_open = False
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(0.2)
-                if s.connect_ex((ip, 5555)) == 0:
-                    adb_open = True
-                s.close()
-            except Exception:
-                pass
-
-            if callback:
-                callback(ip, mac, adb_open)
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_ADB_CHECKS, len(entries))) as pool:
+            for (ip, mac), adb_open in zip(entries, pool.map(lambda entry: _check_adb_port(entry[0]), entries)):
+                if callback:
+                    callback(ip, mac, adb_open)
 
     except Exception as exc:
         gui_log(f"Error escaneando red (arp): {exc}", level="error")
 
 
+def _format_age(seconds):
+    if seconds < 60:
+        return f"hace {int(seconds)}s"
+    if seconds < 3600:
+        return f"hace {int(seconds // 60)} min"
+    return f"hace {int(seconds // 3600)} h"
+
+
+def _host_values(host, now):
+    return (host["ip"], host["mac"], ADB_PORT if host["adb_open"] else "", "ARP",
+            _format_age(now - host["last_seen"]))
+
+
+def _merge_hosts(results):
+    """
+    Integra [(ip, mac, adb_open)] en el modelo: actualiza la fila existente
+    de cada MAC (IP, estado adb, visto) o la añade al final. No se borra ni
+    reordena nada, así que la selección y el scroll se conservan.
+    """
+    if _available_list is None:
+        return
+    now = time.time()
+    for ip, mac, adb_open in results:
+        host = _hosts.setdefault(mac, {"mac": mac})
+        host.update(ip=ip, adb_open=adb_open, last_seen=now)
+        iid = f"arp:{mac}"
+        values, tags = _host_values(host, now), ("adb_on",) if adb_open else ("darkrow",)
+        if _available_list.exists(iid):
+            _available_list.item(iid, values=values, tags=tags)
+        else:
+            _available_list.insert("", "end", iid=iid, values=values, tags=tags)
+
+
+def _age_hosts():
+    """Refresca la columna «Visto» y retira los hosts que llevan STALE_AFTER sin aparecer."""
+    if _available_list is None:
+        return
+    now = time.time()
+    for mac, host in list(_hosts.items()):
+        iid = f"arp:{mac}"
+        if now - host["last_seen"] > STALE_AFTER:
+            del _hosts[mac]
+            if _available_list.exists(iid):
+                _available_list.delete(iid)
+        elif _available_list.exists(iid):
+            _available_list.set(iid, "Visto", _format_age(now - host["last_seen"]))
+    _available_list.after(AGE_TICK_MS, _age_hosts)
+
+
+def _drop_hosts_outside_selection():
+    """Al cambiar de interfaz se quitan los hosts que no pertenecen a sus redes."""
+    networks = [iface.network for iface in _selected_interfaces()]
+    for mac, host in list(_hosts.items()):
+        if not any(ipaddress.ip_address(host["ip"]) in net for net in networks):
+            del _hosts[mac]
+            if _available_list.exists(f"arp:{mac}"):
+                _available_list.delete(f"arp:{mac}")
+
+
 def refresh_available_list_incremental():
-    """Escaneo rápido: lee ARP y mete filas una a una (no bloquea GUI)."""
+    """Escaneo rápido: lee ARP y fusiona filas una a una (no bloquea GUI)."""
     if _available_list is None:
         return
 
-    _available_list.delete(*_available_list.get_children())
     refresh_interfaces()
 
-    def insert_item(ip, mac, adb_open):
-        _available_list.after(0, lambda: _insert(ip, mac, adb_open))
-
-    def _insert(ip, mac, adb_open):
-        item = _available_list.insert("", "end", values=(ip, mac), tags=("darkrow",))
-        if adb_open:
-            _available_list.item(item, tags=("adb_on",))
+    def merge_item(ip, mac, adb_open):
+        _available_list.after(0, lambda: _merge_hosts([(ip, mac, adb_open)]))
 
-    run_in_thread(lambda: scan_network_with_adb_status_callback(callback=insert_item))
+    run_in_thread(lambda: scan_network_with_adb_status_callback(callback=merge_item))
 
 
 def refresh_available_list_full():
-    """Se usa tras ping sweep: rellena toda la tabla de golpe (rápido)."""
+    """Se usa tras un barrido: fusiona todos los resultados de una vez."""
     if _available_list is None:
         return
 
     refresh_interfaces()
-    items = []
-
-    def collect(ip, mac, adb_open):
-        items.append((ip, mac, adb_open))
 
-    scan_network_with_adb_status_callback(callback=collect)
+    def collect_and_merge():
+        items = []
+        scan_network_with_adb_status_callback(callback=lambda ip, mac, adb_open: items.append((ip, mac, adb_open)))
+        _available_list.after(0, lambda: _merge_hosts(items))
 
-    def do_insert_batch():
-        try:
-            _available_list.delete(*_available_list.get_children())
-            for ip, mac, adb_open in items:
-                item = _available_list.insert("", "end", values=(ip, mac), tags=("darkrow",))
-                if adb_open:
-                    _available_list.item(item, tags=("adb_on",))
-        except Exception as exc:
-            gui_log(f"Error insertando batch en GUI: {exc}", level="error")
-
-    _available_list.after(0, do_insert_batch)
+    run_in_thread(collect_and_merge)
 
 
 def connect_selected_available():
@@ -336,9 +258,17 @@ def connect_selected_available():
     if not sel:
         gui_log("No hay IP seleccionada", level="error")
         return
-    ip = _available_list.item(sel[0], "values")[0]
-    run_in_thread(lambda: exec_adb(["connect", f"{ip}:5555"]))
-    gui_log(f"Intentando conectar a {ip}:5555", level="info")
+    ip, _mac, port, origin = _available_list.item(sel[0], "values")[:4]
+    target = f"{ip}:{port or 5555}"
+    if origin == MDNS_ORIGIN["pairing"]:
+        code = simpledialog.askstring("Emparejar", f"Código de emparejamiento de {target}:")
+        if not code:
+            return
+        run_in_thread(lambda: exec_adb(["pair", target, code.strip()]))
+        gui_log(f"Emparejando con {target}", level="info")
+        return
+    run_in_thread(lambda: exec_adb(["connect", target]))
+    gui_log(f"Intentando conectar a {target}", level="info")
 
 
 def add_selected_as_profile():
@@ -348,7 +278,14 @@ def add_selected_as_profile():
     if not sel:
         gui_log("No hay dispositivo seleccionado", level="error")
         return
-    ip, mac = _available_list.item(sel[0], "values")
+    ip, mac = _available_list.item(sel[0], "values")[:2]
+    if not mac:
+        gui_log(f"Se desconoce la MAC de {ip}; escanea la red para obtenerla", level="error")
+        return
+    existing = get_profile_store().find_by_mac(mac)
+    if existing:
+        gui_log(f"La MAC {mac} ya pertenece al perfil '{existing}'", level="error")
+        return
     name = simpledialog.askstring("Nuevo perfil", f"Nombre para el perfil {ip}?")
     if not name:
         return
@@ -356,40 +293,85 @@ def add_selected_as_profile():
     gui_log(f"Perfil '{name}' creado desde red", level="info")
 
 
-def _full_scan_then_populate():
+# =========================
+# mDNS (depuración inalámbrica de Android 11+)
+# =========================
+def _on_mdns_change(services):
+    # Hilo del navegador: la MAC se busca aquí (tabla ARP) y la tabla se toca en el hilo de Tk
+    ip_to_mac = {ip: mac for mac, ip in read_arp_table().items()}
+    rows = [(service, ip_to_mac.get(service.ip, "")) for service in services]
+    if _available_list is not None:
+        _available_list.after(0, lambda: _show_mdns_services(rows))
+
+
+def _show_mdns_services(rows):
+    """Actualiza en su sitio las filas mDNS (una por instancia de servicio): [(servicio, mac)]."""
+    if _available_list is None:
+        return
+    wanted = {}
+    for service, mac in rows:
+        wanted[f"mdns:{service.kind}:{service.instance}"] = (
+            (service.ip, mac, service.port, MDNS_ORIGIN[service.kind], "anunciado"),
+            ("adb_on",) if service.kind == "connect" else ("pairing",))
+    for iid in _available_list.get_children():
+        if iid.startswith("mdns:") and iid not in wanted:
+            _available_list.delete(iid)
+    for iid, (values, tags) in wanted.items():
+        if _available_list.exists(iid):
+            _available_list.item(iid, values=values, tags=tags)
+        else:
+            _available_list.insert("", 0, iid=iid, values=values, tags=tags)
+
+
+def _start_mdns():
+    global _mdns_browser
+    if _mdns_browser is None:
+        _mdns_browser = MdnsBrowser(on_change=_on_mdns_change)
+        if not _mdns_browser.start():
+            _mdns_browser = None
+
+
+def _full_scan_then_populate(quiet=False):
     """
-    Ping sweep (bloqueante) en background para poblar ARP.
-    Luego: refresh_available_list_full()
+    Barrido (bloqueante) en background para poblar ARP con el CIDR real de
+    cada interfaz. Luego: refresh_available_list_full()
     """
+    if not _scan_lock.acquire(blocking=False):
+        return  # ya hay un barrido en curso
     try:
-        gui_log("Iniciando escaneo completo de red (ping sweep)...", level="info")
-
-        # Esto ayuda a poblar ARP en algunos flujos previos
-        try:
-            find_ip_from_mac()
-        except Exception:
-            pass
-
-        local_ip, _ = _get_local_ipv4_and_prefix()
-        target_ip = _resolve_interface_ip() or local_ip
-        if not target_ip:
+        interfaces = _selected_interfaces()
+        if not interfaces:
             gui_log("No se pudo detectar la IP local para escanear la red.", level="error")
             return
 
-        base_parts = target_ip.split(".")
-        if len(base_parts) >= 3:
-            base = ".".join(base_parts[0:3])
-            _ping_sweep_cold(base)
-        else:
-            gui_log("IP local inválida para ping sweep.", level="error")
-            return
+        if not quiet:
+            gui_log("Iniciando escaneo completo de red: "
+                    + ", ".join(f"{iface.name} {iface.network}" for iface in interfaces), level="info")
+        sweep_interfaces(interfaces)
 
-        gui_log("Ping sweep completado, actualizando tabla.", level="info")
+        if not quiet:
+            gui_log("Barrido completado, actualizando tabla.", level="info")
         if _network_tab is not None:
             _network_tab.after(0, refresh_available_list_full)
 
     except Exception as exc:
         gui_log(f"Error durante escaneo completo de red: {exc}", level="error")
+    finally:
+        _scan_lock.release()
+
+
+def _continuous_scan_tick():
+    """Con «Escaneo continuo» activo, barre y fusiona cada CONTINUOUS_INTERVAL_MS."""
+    if _continuous_var is not None and _continuous_var.get():
+        run_in_thread(_full_scan_then_populate, quiet=True)
+    if _network_tab is not None:
+        _network_tab.after(CONTINUOUS_INTERVAL_MS, _continuous_scan_tick)
+
+
+def _on_interface_selected():
+    _update_interface_details()
+    _drop_hosts_outside_selection()
+    refresh_available_list_incremental()
 
 
 def on_tab_change(event):
@@ -410,7 +392,7 @@ def on_tab_change(event):
 # UI
 # =========================
 def create_network_tab(notebook):
-    global _network_tab, _interface_combo, _interface_var, _interface_details_var, _available_list
+    global _network_tab, _interface_combo, _interface_var, _interface_details_var, _available_list, _continuous_var
 
     tab = ttk.Frame(notebook, padding=10)
     notebook.add(tab, text="Red")
@@ -425,19 +407,18 @@ def create_network_tab(notebook):
     _interface_var = tk.StringVar(value=AUTO_INTERFACE_LABEL)
     _interface_combo = ttk.Combobox(selector, textvariable=_interface_var, state="readonly", width=40)
     _interface_combo.grid(row=0, column=1, sticky="ew", padx=(6, 6))
-    _interface_combo.bind("<<ComboboxSelected>>", lambda _e: _update_interface_details())
+    _interface_combo.bind("<<ComboboxSelected>>", lambda _e: _on_interface_selected())
 
-    ttk.Button(selector, text="Refrescar interfaces", command=refresh_interfaces).grid(row=0, column=2, sticky="e")
+    ttk.Button(selector, text="Refrescar interfaces", command=lambda: refresh_interfaces(force=True)).grid(row=0, column=2, sticky="e")
 
     _interface_details_var = tk.StringVar(value="Selecciona una interfaz de red")
     ttk.Label(tab, textvariable=_interface_details_var).pack(anchor="w", pady=(0, 8))
 
-    # Tabla IP/MAC
-    _available_list = ttk.Treeview(tab, columns=("IP", "MAC"), show="headings", height=10)
-    _available_list.heading("IP", text="IP")
-    _available_list.heading("MAC", text="MAC")
-    _available_list.column("IP", width=200)
-    _available_list.column("MAC", width=320)
+    # Tabla IP/MAC/puerto adb/origen (ARP o mDNS)/última vez visto
+    _available_list = ttk.Treeview(tab, columns=("IP", "MAC", "Puerto", "Origen", "Visto"), show="headings", height=10)
+    for column, width in (("IP", 180), ("MAC", 220), ("Puerto", 70), ("Origen", 150), ("Visto", 100)):
+        _available_list.heading(column, text=column)
+        _available_list.column(column, width=width)
     _available_list.pack(fill=tk.BOTH, expand=True)
 
     scroll = ttk.Scrollbar(tab, orient=tk.VERTICAL, command=_available_list.yview)
@@ -446,19 +427,25 @@ def create_network_tab(notebook):
 
     _available_list.tag_configure("darkrow")
     _available_list.tag_configure("adb_on", background="#003300", foreground="#00ff00")
+    _available_list.tag_configure("pairing", background="#332b00", foreground="#ffd700")
 
     # Botones
     btns = ttk.Frame(tab)
     btns.pack(fill=tk.X, pady=(8, 0))
     ttk.Button(btns, text="Escanear red", command=refresh_available_list_incremental).pack(side=tk.LEFT, padx=4)
-    ttk.Button(btns, text="Conectar", command=connect_selected_available).pack(side=tk.LEFT, padx=4)
+    ttk.Button(btns, text="Conectar / Emparejar", command=connect_selected_available).pack(side=tk.LEFT, padx=4)
     ttk.Button(btns, text="Añadir como perfil", command=add_selected_as_profile).pack(side=tk.LEFT, padx=4)
+    _continuous_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(btns, text="Escaneo continuo", variable=_continuous_var).pack(side=tk.LEFT, padx=4)
 
     # Inicialización
     refresh_interfaces()
     refresh_available_list_incremental()
+    _start_mdns()
+    _available_list.after(AGE_TICK_MS, _age_hosts)
+    tab.after(CONTINUOUS_INTERVAL_MS, _continuous_scan_tick)
 
-    # Importante: bind una sola vez en tu app general si puedes.
-    notebook.bind("<<NotebookTabChanged>>", on_tab_change)
+    # add="+": otras pestañas también escuchan este evento
+    notebook.bind("<<NotebookTabChanged>>", on_tab_change, add="+")
 
     return tab
@@ -1,17 +1,30 @@
-import os, json, tkinter as tk
+import json, tkinter as tk
 from tkinter import ttk, simpledialog, messagebox, filedialog
-from ..config.config import DEVICES
+from ..config.config import PROJECT_ROOT
 from ..utils.adb_utils import exec_adb, run_in_thread
+from ..utils.batch_runner import run_batch_parallel
 from ..utils.gui_utils import gui_log
 from ..utils.net_utils import find_ip_from_mac
+from ..utils.scrcpy_manager import start_session
+from ..utils.link_probe import probe_link
+from ..utils.profile_connect import bulk_profiles_action, resolve_profile_serials, run_shell_on_profiles
+from ..utils.watchdog import ConnectionWatchdog, format_watchdog_stats
+from ..utils.profile_store import get_profile_store
+from ..utils.profile_import import MAX_REPORTED_ISSUES, format_import_summary, import_profiles_stream
 from ..gui.theme import force_dark
 
-perfiles = {}
+store = None
 profile_listbox = None
 detail_text = None
+watchdog = None
+tag_combo = None
+tag_var = None
+search_var = None
+
+ALL_TAGS_LABEL = "Todos"
 
 def create_profiles_tab(notebook):
-    global profile_listbox, detail_text
+    global profile_listbox, detail_text, watchdog, tag_combo, tag_var, search_var
 
     tab = ttk.Frame(notebook)
     notebook.add(tab, text="Perfiles")
@@ -26,11 +39,26 @@ def create_profiles_tab(notebook):
     tab.columnconfigure(0, weight=3)
     tab.columnconfigure(1, weight=1)
 
+    # --- Filtro por grupo (etiqueta) y nombre ---
+    filter_frame = ttk.Frame(per_left)
+    filter_frame.grid(row=0, column=0, sticky="ew", pady=(0, 6))
+    filter_frame.columnconfigure(3, weight=1)
+    ttk.Label(filter_frame, text="Grupo:").grid(row=0, column=0, sticky="w")
+    tag_var = tk.StringVar(value=ALL_TAGS_LABEL)
+    tag_combo = ttk.Combobox(filter_frame, textvariable=tag_var, state="readonly", width=24)
+    tag_combo.grid(row=0, column=1, padx=(4, 12))
+    tag_combo.bind("<<ComboboxSelected>>", lambda e: refresh_profiles_list())
+    ttk.Label(filter_frame, text="Buscar:").grid(row=0, column=2, sticky="w")
+    search_var = tk.StringVar()
+    search_entry = ttk.Entry(filter_frame, textvariable=search_var)
+    search_entry.grid(row=0, column=3, sticky="ew", padx=4)
+    search_entry.bind("<KeyRelease>", lambda e: refresh_profiles_list())
+
     # --- Lista de perfiles ---
     list_frame = ttk.Frame(per_left)
-    list_frame.grid(row=0, column=0, sticky="nsew")
+    list_frame.grid(row=1, column=0, sticky="nsew")
     
-    profile_listbox = tk.Listbox(list_frame, activestyle="dotbox")
+    profile_listbox = tk.Listbox(list_frame, activestyle="dotbox", selectmode=tk.EXTENDED, exportselection=False)
     profile_listbox.grid(row=0, column=0, sticky="nsew")
     force_dark(profile_listbox)
 
@@ -40,7 +68,7 @@ def create_profiles_tab(notebook):
 
     list_frame.rowconfigure(0, weight=1)
     list_frame.columnconfigure(0, weight=1)
-    per_left.rowconfigure(0, weight=1)
+    per_left.rowconfigure(1, weight=1)
     per_left.columnconfigure(0, weight=1)
 
     # --- Detalle del perfil ---
@@ -60,8 +88,17 @@ def create_profiles_tab(notebook):
         ("Añadir", lambda: prompt_add_profile()),
         ("Editar", lambda: edit_profile(get_selected_profile())),
         ("Borrar", lambda: delete_profile(get_selected_profile())),
-        ("Conectar", lambda: connect_profile(get_selected_profile())),
-        ("Desconectar", lambda: disconnect_profile(get_selected_profile())),
+        ("Conectar", lambda: connect_profiles(get_selected_profiles())),
+        ("Desconectar", lambda: disconnect_profiles(get_selected_profiles())),
+        ("Etiquetas", lambda: edit_tags(get_selected_profiles())),
+        ("Conectar grupo", lambda: connect_profiles(visible_profiles())),
+        ("Desconectar grupo", lambda: disconnect_profiles(visible_profiles())),
+        ("Comando en grupo", lambda: run_command_on_group(visible_profiles())),
+        ("Batch en grupo", lambda: run_batch_on_group(visible_profiles())),
+        ("Espejar (scrcpy)", lambda: mirror_profile(get_selected_profile())),
+        ("Medir enlace", lambda: probe_profile_link(get_selected_profile())),
+        ("Vigilar conexión", lambda: toggle_watch(get_selected_profiles())),
+        ("Estado vigilancia", show_watchdog_stats),
         ("Exportar", export_profiles),
         ("Importar", import_profiles),
     ]
@@ -75,96 +112,267 @@ def create_profiles_tab(notebook):
     profile_listbox.bind("<<ListboxSelect>>", lambda e: show_profile_details())
 
     load_profiles()
+    refresh_tag_filter()
     refresh_profiles_list()
+
+    watchdog = ConnectionWatchdog(on_ip_change=lambda name, ip: profile_listbox.after(0, lambda: update_profile_ip(name, ip)))
+    for name in store.names_with_flag("watch"):
+        watchdog.watch(name, store.get(name))
     return tab
 
 # --- Lógica perfiles ---
 def load_profiles():
-    global perfiles
-    if os.path.exists(DEVICES):
-        try:
-            with open(DEVICES, "r", encoding="utf-8") as f:
-                perfiles = json.load(f)
-        except Exception:
-            perfiles = {}
-    else:
-        perfiles = {}
-
-def save_profiles():
-    try:
-        with open(DEVICES, "w", encoding="utf-8") as f:
-            json.dump(perfiles, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        gui_log(f"Error guardando perfiles: {e}", level="error")
+    # La primera vez se migra devices.json a la base de datos de perfiles
+    global store
+    store = get_profile_store()
 
 def add_profile(name, mac, port=5555, ip=None, notes=None, color=None):
-    perfiles[name] = {"mac": mac, "port": port, "ip": ip, "notes": notes, "color": color}
-    save_profiles()
-    refresh_profiles_list()
+    is_new = name not in store
+    store.upsert(name, {"mac": mac, "port": port, "ip": ip, "notes": notes, "color": color})
+    if is_new and profile_listbox is not None:
+        if current_tag() is None and not search_var.get().strip():
+            profile_listbox.insert(tk.END, name)
+        else:
+            refresh_profiles_list()
     gui_log(f"Perfil guardado: {name}")
 
 def edit_profile(name):
-    if not name or name not in perfiles:
+    perfil = store.get(name) if name else None
+    if not perfil:
         return
-    perfil = perfiles[name]
     new_mac = simpledialog.askstring("Editar perfil", "MAC address:", initialvalue=perfil.get("mac", ""))
     if not new_mac: return
     new_port = simpledialog.askinteger("Editar perfil", "Puerto:", initialvalue=perfil.get("port", 5555))
     new_ip = simpledialog.askstring("Editar perfil", "IP fija:", initialvalue=perfil.get("ip", ""))
     new_notes = simpledialog.askstring("Editar perfil", "Notas:", initialvalue=perfil.get("notes", ""))
-    perfiles[name].update({"mac": new_mac, "port": new_port, "ip": new_ip, "notes": new_notes})
-    save_profiles()
-    refresh_profiles_list()
+    store.update(name, mac=new_mac, port=new_port, ip=new_ip, notes=new_notes)
+    show_profile_details()
     gui_log(f"Perfil '{name}' editado")
 
 def delete_profile(name):
-    if not name or name not in perfiles: return
+    if not name or name not in store: return
     if messagebox.askyesno("Borrar perfil", f"¿Seguro que quieres borrar '{name}'?"):
-        perfiles.pop(name)
-        save_profiles()
-        refresh_profiles_list()
+        store.delete(name)
+        if watchdog is not None:
+            watchdog.unwatch(name)
+        names = profile_listbox.get(0, tk.END)
+        if name in names:
+            profile_listbox.delete(names.index(name))
+        refresh_tag_filter()
+        show_profile_details()
         gui_log(f"Perfil '{name}' borrado")
 
-def connect_profile(name):
-    if not name or name not in perfiles: return
-    perfil = perfiles[name]
-    ip = perfil.get("ip") or find_ip_from_mac(perfil.get("mac"))
-    if not ip:
-        gui_log(f"No se encontró IP para {perfil.get('mac')}", level="error")
+def edit_tags(names):
+    """Asigna etiquetas (separadas por comas) a los perfiles seleccionados; sustituyen a las anteriores."""
+    names = [name for name in names if name in store]
+    if not names:
+        gui_log("Selecciona al menos un perfil", level="error")
+        return
+    current = ", ".join(store.get_tags(names[0]))
+    text = simpledialog.askstring("Etiquetas", f"Etiquetas para {len(names)} perfil(es), separadas por comas:",
+                                  initialvalue=current)
+    if text is None:
+        return
+    tags = [t.strip() for t in text.split(",") if t.strip()]
+    for name in names:
+        store.update(name, tags=tags)
+    refresh_tag_filter()
+    refresh_profiles_list()
+    gui_log(f"Etiquetas de {', '.join(names)}: {', '.join(tags) or '(ninguna)'}", level="info")
+
+def run_command_on_group(names):
+    group = {name: perfil for name, perfil in ((n, store.get(n)) for n in names) if perfil}
+    if not group:
+        gui_log("No hay perfiles en el grupo", level="error")
+        return
+    command = simpledialog.askstring("Comando en grupo", f"Comando adb shell para {len(group)} perfil(es):")
+    if not command:
+        return
+    gui_log(f"adb shell {command} en {len(group)} perfil(es)...", level="cmd")
+
+    def on_result(name, serial, ok, output):
+        gui_log(f"[{name}{f' {serial}' if serial else ''}] {output or ('OK' if ok else 'ERROR')}",
+                level="info" if ok else "error")
+    run_in_thread(run_shell_on_profiles, group, command, on_result)
+
+def run_batch_on_group(names):
+    group = {name: perfil for name, perfil in ((n, store.get(n)) for n in names) if perfil}
+    if not group:
+        gui_log("No hay perfiles en el grupo", level="error")
+        return
+    path = filedialog.askopenfilename(title="Script para el grupo", initialdir=str(PROJECT_ROOT / "utils" / "batch"))
+    if not path:
+        return
+
+    def task():
+        serials = resolve_profile_serials(group, connect=True)
+        by_serial = {serial: name for name, serial in serials.items() if serial}
+        for name in (n for n, serial in serials.items() if not serial):
+            gui_log(f"{name}: no se encontró IP, se omite", level="error")
+        if not by_serial:
+            return
+        gui_log(f"▶️ {path} en {len(by_serial)} perfil(es)", level="cmd")
+
+        def on_line(serial, stream, line):
+            gui_log(f"[{by_serial.get(serial, serial)}] {line}", level="error" if stream == "stderr" else "info")
+
+        def on_done(serial, code, elapsed, reason):
+            ok = code == 0 and not reason
+            gui_log(f"[{by_serial.get(serial, serial)}] {'OK' if ok else reason or f'código {code}'} ({elapsed:.1f}s)",
+                    level="info" if ok else "error")
+        run_batch_parallel(path, list(by_serial), on_line=on_line, on_done=on_done)
+    run_in_thread(task)
+
+def _log_profile_result(name, ok, serial, elapsed, attempts, detail):
+    if ok:
+        retry = f", {attempts} intentos" if attempts > 1 else ""
+        gui_log(f"{name} ({serial}): {detail} [{elapsed * 1000:.0f} ms{retry}]", level="info")
+    else:
+        gui_log(f"{name}{f' ({serial})' if serial else ''}: {detail}", level="error")
+
+def _run_profiles_action(names, action):
+    # Resolver IPs (ARP / barrido) y conectar es lento: todo fuera del hilo de Tk
+    selected = {name: perfil for name, perfil in ((n, store.get(n)) for n in names) if perfil}
+    if not selected:
+        gui_log("Selecciona al menos un perfil", level="error")
         return
-    port = perfil.get("port", 5555)
-    run_in_thread(lambda: exec_adb(["connect", f"{ip}:{port}"]))
+    verb = "Conectando" if action == "connect" else "Desconectando"
+    gui_log(f"{verb} {len(selected)} perfil(es)...", level="cmd")
+    run_in_thread(bulk_profiles_action, selected, action, _log_profile_result)
+
+def connect_profiles(names):
+    _run_profiles_action(names, "connect")
+
+def disconnect_profiles(names):
+    _run_profiles_action(names, "disconnect")
+
+def connect_profile(name):
+    if name:
+        connect_profiles([name])
 
 def disconnect_profile(name):
-    if not name or name not in perfiles: return
-    perfil = perfiles[name]
-    ip = perfil.get("ip") or find_ip_from_mac(perfil.get("mac"))
-    if not ip:
-        gui_log(f"No se encontró IP para {perfil.get('mac')}", level="error")
+    if name:
+        disconnect_profiles([name])
+
+def mirror_profile(name):
+    """Conecta el perfil y abre scrcpy con sus opciones (clave "scrcpy" del perfil)."""
+    perfil = store.get(name) if name else None
+    if not perfil: return
+    def task():
+        ip = perfil.get("ip") or find_ip_from_mac(perfil.get("mac"))
+        if not ip:
+            gui_log(f"No se encontró IP para {perfil.get('mac')}", level="error")
+            return
+        serial = f"{ip}:{perfil.get('port', 5555)}"
+        exec_adb(["connect", serial])
+        start_session(serial, perfil.get("scrcpy"))
+    run_in_thread(task)
+
+def probe_profile_link(name):
+    """Mide RTT/throughput del perfil y guarda el preset de scrcpy en el perfil."""
+    perfil = store.get(name) if name else None
+    if not perfil: return
+    def task():
+        ip = perfil.get("ip") or find_ip_from_mac(perfil.get("mac"))
+        if not ip:
+            gui_log(f"No se encontró IP para {perfil.get('mac')}", level="error")
+            return
+        serial = f"{ip}:{perfil.get('port', 5555)}"
+        exec_adb(["connect", serial])
+        gui_log(f"Midiendo enlace con {name} ({serial})...", level="cmd")
+        options, link = probe_link(serial)
+        if options is None:
+            gui_log(f"No se pudo medir el enlace con {name}", level="error")
+            return
+        def apply():
+            if store.update(name, scrcpy=options, link=link):
+                show_profile_details()
+        profile_listbox.after(0, apply)
+        gui_log(f"{name}: {link['mbps']} Mbps, RTT {link['rtt_ms']} ms -> "
+                f"{options['bitrate']}, {options['max_size']}px, {options['max_fps']} fps", level="info")
+    run_in_thread(task)
+
+def toggle_watch(names):
+    """Activa o desactiva la reconexión automática de los perfiles (se guarda en el perfil)."""
+    names = [name for name in names if name in store]
+    if not names:
+        gui_log("Selecciona al menos un perfil", level="error")
+        return
+    enable = not all(watchdog.is_watched(name) for name in names)
+    for name in names:
+        store.update(name, watch=enable)
+        if enable:
+            watchdog.watch(name, store.get(name))
+        else:
+            watchdog.unwatch(name)
+    show_profile_details()
+    gui_log(f"Vigilancia {'activada' if enable else 'desactivada'} para {', '.join(names)}", level="info")
+
+def show_watchdog_stats():
+    stats = watchdog.stats()
+    if not stats:
+        gui_log("No hay perfiles vigilados", level="error")
         return
-    port = perfil.get("port", 5555)
-    run_in_thread(lambda: exec_adb(["disconnect", f"{ip}:{port}"]))
-    gui_log(f"Desconectando {name} ({ip}:{port})")
+    for row in stats:
+        gui_log(format_watchdog_stats(row), level="info" if row["connected"] else "error")
+
+def update_profile_ip(name, ip):
+    if store.update(name, ip=ip):
+        show_profile_details()
 
 def export_profiles():
-    if not perfiles: return
+    if not len(store): return
     path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json")])
     if not path: return
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(perfiles, f, indent=4, ensure_ascii=False)
+        json.dump(store.all(), f, indent=4, ensure_ascii=False)
     gui_log(f"Perfiles exportados a {path}")
 
 def import_profiles():
-    path = filedialog.askopenfilename(filetypes=[("JSON","*.json")])
+    path = filedialog.askopenfilename(filetypes=[("Inventario", "*.csv *.jsonl *.ndjson *.json"),
+                                                 ("CSV", "*.csv"), ("JSON-lines", "*.jsonl *.ndjson"),
+                                                 ("JSON", "*.json")])
     if not path: return
+    update_existing = messagebox.askyesno(
+        "Importar perfiles",
+        "Si una MAC ya tiene perfil con otro nombre, ¿actualizar ese perfil?\n"
+        "(No: se informa como conflicto y se omite)")
+    gui_log(f"Importando perfiles de {path}...", level="info")
+    run_in_thread(_import_profiles_worker, path, update_existing)
+
+def _import_profiles_worker(path, update_existing):
+    # Cada lote se guarda en una transacción y sus nombres se añaden a la
+    # lista desde el hilo de Tk, sin reconstruirla
+    def on_batch(names):
+        profile_listbox.after(0, lambda: _append_imported(names))
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            perfiles.update(json.load(f))
-        save_profiles()
-        refresh_profiles_list()
-        gui_log("Perfiles importados.")
+        result = import_profiles_stream(path, store, on_batch=on_batch, update_existing=update_existing)
     except Exception as e:
         gui_log(f"Error importando: {e}", level="error")
+        return
+    for line_no, message in result["issues"][:MAX_REPORTED_ISSUES]:
+        gui_log(f"  línea {line_no}: {message}", level="error")
+    hidden = len(result["issues"]) - MAX_REPORTED_ISSUES
+    if hidden > 0:
+        gui_log(f"  ... y {hidden} incidencia(s) más", level="error")
+    gui_log(format_import_summary(path, result), level="error" if result["issues"] else "info")
+    profile_listbox.after(0, _finish_import)
+
+def _append_imported(names):
+    # Con un grupo activo no se sabe aquí qué nombres le pertenecen: se
+    # recarga la lista al terminar
+    if current_tag() is not None:
+        return
+    query = search_var.get().strip().lower() if search_var is not None else ""
+    if query:
+        names = [name for name in names if query in name.lower()]
+    if names:
+        profile_listbox.insert(tk.END, *names)
+
+def _finish_import():
+    refresh_tag_filter()
+    if current_tag() is not None:
+        refresh_profiles_list()
 
 # --- UI helpers ---
 def prompt_add_profile():
@@ -181,17 +389,52 @@ def get_selected_profile():
     sel = profile_listbox.curselection()
     return profile_listbox.get(sel[0]) if sel else None
 
+def get_selected_profiles():
+    return [profile_listbox.get(i) for i in profile_listbox.curselection()]
+
+def current_tag():
+    value = tag_var.get() if tag_var is not None else ALL_TAGS_LABEL
+    return None if value == ALL_TAGS_LABEL else value.rsplit(" (", 1)[0]
+
+def visible_profiles():
+    """Perfiles del grupo y búsqueda actuales (lo que muestra la lista)."""
+    return list(profile_listbox.get(0, tk.END))
+
+def refresh_tag_filter():
+    tags = store.all_tags()
+    values = [ALL_TAGS_LABEL] + [f"{tag} ({count})" for tag, count in tags.items()]
+    tag_combo["values"] = values
+    if current_tag() is not None and current_tag() not in tags:
+        tag_var.set(ALL_TAGS_LABEL)
+    elif current_tag() is not None:
+        tag_var.set(f"{current_tag()} ({tags[current_tag()]})")
+
 def refresh_profiles_list():
     profile_listbox.delete(0, tk.END)
-    for name in perfiles:
-        profile_listbox.insert(tk.END, name)
+    names = store.names(current_tag())
+    query = search_var.get().strip().lower() if search_var is not None else ""
+    if query:
+        names = [name for name in names if query in name.lower()]
+    if names:
+        profile_listbox.insert(tk.END, *names)
 
 def show_profile_details():
     name = get_selected_profile()
     detail_text.config(state=tk.NORMAL)
     detail_text.delete(1.0, tk.END)
-    if name and name in perfiles:
-        p = perfiles[name]
+    p = store.get(name) if name else None
+    if p:
         txt = f"Nombre: {name}\nMAC: {p.get('mac')}\nIP: {p.get('ip')}\nPuerto: {p.get('port')}\nNotas: {p.get('notes','')}\n"
+        scrcpy_opts = p.get("scrcpy")
+        if scrcpy_opts:
+            txt += (f"Scrcpy: {scrcpy_opts.get('bitrate')}, {scrcpy_opts.get('max_size')}px, "
+                    f"{scrcpy_opts.get('max_fps')} fps\n")
+        if p.get("tags"):
+            txt += f"Etiquetas: {', '.join(p['tags'])}\n"
+        if p.get("watch"):
+            txt += "Vigilancia: activa\n"
+        link = p.get("link")
+        if link:
+            txt += f"Enlace: {link.get('mbps')} Mbps, RTT {link.get('rtt_ms')} ms ({link.get('measured')})\n"
         detail_text.insert(tk.END, txt)
     detail_text.config(state=tk.DISABLED)
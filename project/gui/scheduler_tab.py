@@ -0,0 +1,245 @@
+# scheduler_tab.py
+import os
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, messagebox
+
+from ..utils.adb_utils import run_in_thread
+from ..utils.batch_runner import is_batch_file
+from ..utils.gui_utils import gui_log
+from ..utils.scheduler import (
+    TARGET_ALL, TARGET_DEFAULT, scheduler, list_jobs, add_job, remove_job,
+    set_job_enabled, duration_stats, recent_runs, parse_schedule,
+)
+from .batch_tab import BATCH_DIR
+
+REFRESH_MS = 5000
+TARGET_LABELS = {"Dispositivo por defecto": TARGET_DEFAULT, "Todos los conectados": TARGET_ALL}
+
+
+def _fmt_ts(ts):
+    return datetime.fromtimestamp(ts).strftime("%d/%m %H:%M:%S") if ts else "-"
+
+
+def _fmt_secs(value):
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def create_scheduler_tab(notebook):
+    tab = ttk.Frame(notebook, padding=8)
+    notebook.add(tab, text="Programador")
+    tab.columnconfigure(0, weight=1)
+    tab.rowconfigure(1, weight=1)
+    tab.rowconfigure(3, weight=1)
+
+    # =============================
+    # NUEVO TRABAJO
+    # =============================
+    form = ttk.LabelFrame(tab, text="Nuevo trabajo", padding=6)
+    form.grid(row=0, column=0, sticky="ew", pady=(0, 6))
+    for col in (1, 3):
+        form.columnconfigure(col, weight=1)
+
+    ttk.Label(form, text="Nombre:").grid(row=0, column=0, sticky="w")
+    name_var = tk.StringVar()
+    ttk.Entry(form, textvariable=name_var).grid(row=0, column=1, sticky="ew", padx=4, pady=2)
+
+    ttk.Label(form, text="Script:").grid(row=0, column=2, sticky="w")
+    script_var = tk.StringVar()
+    script_combo = ttk.Combobox(form, textvariable=script_var, state="readonly")
+    script_combo.grid(row=0, column=3, sticky="ew", padx=4, pady=2)
+
+    ttk.Label(form, text="Programación:").grid(row=1, column=0, sticky="w")
+    schedule_var = tk.StringVar(value="every 5m")
+    ttk.Entry(form, textvariable=schedule_var).grid(row=1, column=1, sticky="ew", padx=4, pady=2)
+
+    ttk.Label(form, text="Destino:").grid(row=1, column=2, sticky="w")
+    target_var = tk.StringVar(value="Dispositivo por defecto")
+    ttk.Combobox(form, textvariable=target_var, values=list(TARGET_LABELS)).grid(
+        row=1, column=3, sticky="ew", padx=4, pady=2)
+
+    ttk.Label(form, text="Timeout (s, 0 = sin límite):").grid(row=2, column=0, sticky="w")
+    timeout_var = tk.IntVar(value=0)
+    ttk.Spinbox(form, from_=0, to=86400, increment=10, width=8, textvariable=timeout_var).grid(
+        row=2, column=1, sticky="w", padx=4, pady=2)
+    ttk.Label(form, text="'every 30s' / 'every 5m' / 'every 2h' o cron '*/15 * * * *'. "
+                         "Destino: también 'tag:<etiqueta>' o seriales separados por comas.",
+              font=(None, 8)).grid(row=3, column=0, columnspan=4, sticky="w")
+
+    # =============================
+    # TRABAJOS
+    # =============================
+    jobs_frame = ttk.Frame(tab)
+    jobs_frame.grid(row=1, column=0, sticky="nsew")
+    jobs_frame.columnconfigure(0, weight=1)
+    jobs_frame.rowconfigure(0, weight=1)
+    job_cols = ("name", "script", "schedule", "target", "state", "next")
+    jobs_tree = ttk.Treeview(jobs_frame, columns=job_cols, show="headings", height=6, selectmode="browse")
+    for col, text, width in zip(job_cols, ("Nombre", "Script", "Programación", "Destino", "Estado", "Próxima"),
+                                (140, 180, 120, 160, 90, 120)):
+        jobs_tree.heading(col, text=text)
+        jobs_tree.column(col, width=width, anchor="w")
+    jobs_tree.grid(row=0, column=0, sticky="nsew")
+    jobs_scroll = ttk.Scrollbar(jobs_frame, orient="vertical", command=jobs_tree.yview)
+    jobs_tree.configure(yscrollcommand=jobs_scroll.set)
+    jobs_scroll.grid(row=0, column=1, sticky="ns")
+
+    buttons = ttk.Frame(tab)
+    buttons.grid(row=2, column=0, sticky="ew", pady=6)
+
+    # =============================
+    # ESTADÍSTICAS
+    # =============================
+    stats_frame = ttk.LabelFrame(tab, text="Duraciones por script y dispositivo", padding=4)
+    stats_frame.grid(row=3, column=0, sticky="nsew")
+    stats_frame.columnconfigure(0, weight=1)
+    stats_frame.rowconfigure(0, weight=1)
+    stat_cols = ("script", "serial", "runs", "ok", "p50", "p95", "last")
+    stats_tree = ttk.Treeview(stats_frame, columns=stat_cols, show="headings", height=8)
+    for col, text, width in zip(stat_cols, ("Script", "Dispositivo", "Ejecuciones", "OK", "p50", "p95", "Última"),
+                                (180, 160, 80, 60, 80, 80, 120)):
+        stats_tree.heading(col, text=text)
+        stats_tree.column(col, width=width, anchor="w")
+    stats_tree.grid(row=0, column=0, sticky="nsew")
+    stats_scroll = ttk.Scrollbar(stats_frame, orient="vertical", command=stats_tree.yview)
+    stats_tree.configure(yscrollcommand=stats_scroll.set)
+    stats_scroll.grid(row=0, column=1, sticky="ns")
+
+    jobs_by_iid = {}
+
+    def refresh_scripts():
+        try:
+            files = sorted(f for f in os.listdir(BATCH_DIR) if is_batch_file(f))
+        except OSError:
+            files = []
+        script_combo["values"] = files
+        if files and not script_var.get():
+            script_combo.current(0)
+
+    def selected_job():
+        selection = jobs_tree.selection()
+        if not selection:
+            gui_log("Selecciona un trabajo", level="error")
+            return None
+        return jobs_by_iid.get(selection[0])
+
+    def target_label(target):
+        for label, value in TARGET_LABELS.items():
+            if value == target:
+                return label
+        return target
+
+    # El historial se lee en un hilo: SQLite puede tardar con muchos registros
+    def refresh():
+        def worker():
+            try:
+                jobs = list_jobs()
+                stats = duration_stats()
+            except Exception as e:
+                gui_log(f"Error leyendo el historial: {e}", level="error")
+                return
+            tab.after(0, lambda: apply(jobs, stats))
+        run_in_thread(worker)
+
+    def apply(jobs, stats):
+        selection = jobs_tree.selection()
+        jobs_tree.delete(*jobs_tree.get_children())
+        jobs_by_iid.clear()
+        for job in jobs:
+            iid = str(job["id"])
+            jobs_by_iid[iid] = job
+            if not job["enabled"]:
+                state = "Pausado"
+            elif scheduler.is_running(job["id"]):
+                state = "En ejecución"
+            else:
+                state = "Activo"
+            next_run = scheduler.next_run(job["id"]) if job["enabled"] else None
+            jobs_tree.insert("", "end", iid=iid, values=(
+                job["name"], os.path.basename(job["script"]), job["schedule"],
+                target_label(job["target"]), state, _fmt_ts(next_run)))
+        keep = [iid for iid in selection if jobs_tree.exists(iid)]
+        if keep:
+            jobs_tree.selection_set(keep)
+        stats_tree.delete(*stats_tree.get_children())
+        for row in stats:
+            stats_tree.insert("", "end", values=(
+                row["script"], row["serial"] or "por defecto", row["runs"],
+                f"{row['ok'] * 100 // max(1, row['runs'])}%",
+                _fmt_secs(row["p50"]), _fmt_secs(row["p95"]), _fmt_ts(row["last"])))
+
+    def periodic():
+        refresh()
+        tab.after(REFRESH_MS, periodic)
+
+    # =============================
+    # ACCIONES
+    # =============================
+    def create_job():
+        script = script_var.get()
+        if not script:
+            gui_log("Selecciona un script", level="error")
+            return
+        schedule = schedule_var.get().strip()
+        try:
+            parse_schedule(schedule)
+        except ValueError as e:
+            gui_log(str(e), level="error")
+            return
+        target = TARGET_LABELS.get(target_var.get(), target_var.get().strip()) or TARGET_DEFAULT
+        try:
+            timeout = int(timeout_var.get()) or None
+        except (tk.TclError, ValueError):
+            timeout = None
+        name = name_var.get().strip() or script
+        add_job(name, str(BATCH_DIR / script), schedule, target, timeout)
+        gui_log(f"Trabajo '{name}' programado ({schedule})", level="info")
+        name_var.set("")
+        refresh()
+
+    def delete_job():
+        job = selected_job()
+        if job and messagebox.askyesno("Borrar", f"¿Borrar el trabajo '{job['name']}'? El historial se conserva."):
+            remove_job(job["id"])
+            refresh()
+
+    def toggle_job():
+        job = selected_job()
+        if job:
+            set_job_enabled(job["id"], not job["enabled"])
+            refresh()
+
+    def run_job_now():
+        job = selected_job()
+        if job:
+            run_in_thread(scheduler.run_now, job)
+            tab.after(500, refresh)
+
+    def show_last_output():
+        job = selected_job()
+        if not job:
+            return
+        runs = recent_runs(os.path.basename(job["script"]), limit=1)
+        if not runs:
+            gui_log("Ese script no tiene ejecuciones registradas", level="error")
+            return
+        script, serial, started, duration, code, reason, output = runs[0]
+        gui_log(f"--- {script} ({serial or 'dispositivo'}) {_fmt_ts(started)}, código {code}, "
+                f"{_fmt_secs(duration)}{f', {reason}' if reason else ''} ---", level="cmd")
+        gui_log(output or "(sin salida)", level="info")
+
+    for text, cmd in (
+        ("Borrar", delete_job),
+        ("Pausar/Reanudar", toggle_job),
+        ("Ejecutar ahora", run_job_now),
+        ("Última salida", show_last_output),
+        ("Refrescar scripts", refresh_scripts),
+    ):
+        ttk.Button(buttons, text=text, command=cmd).pack(side="left", padx=4)
+
+    ttk.Button(form, text="Añadir", command=create_job).grid(row=2, column=3, sticky="e", padx=4)
+
+    refresh_scripts()
+    scheduler.start()
+    periodic()
+    return tab
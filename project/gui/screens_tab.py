@@ -0,0 +1,162 @@
+# screens_tab.py
+import math
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+from ..utils.adb_utils import list_device_serials, run_in_thread
+from ..utils.gui_utils import gui_log
+from ..utils.screen_utils import capture_preview
+
+# =========================
+# Configuración
+# =========================
+MAX_PARALLEL_CAPTURES = 64     # un hilo por dispositivo, hasta este máximo
+PREVIEW_WIDTH = 240
+DEFAULT_INTERVAL_MS = 1000
+DEVICE_REFRESH_S = 10.0
+
+# =========================
+# Estado
+# =========================
+_pool = {"executor": None, "size": 0}
+_in_flight = set()     # seriales con una captura todavía en curso (como mucho una por dispositivo)
+_cells = {}            # serial -> {"frame", "image", "caption", "photo", "ms"}
+_state = {"running": False, "job": None, "serials": [], "devices_ts": 0.0, "skipped": 0}
+
+
+def _executor_for(count):
+    """Pool con un hilo por dispositivo: una captura lenta no retrasa a las demás."""
+    size = max(1, min(MAX_PARALLEL_CAPTURES, count))
+    if _pool["executor"] is None or _pool["size"] < size:
+        old = _pool["executor"]
+        _pool.update(executor=ThreadPoolExecutor(max_workers=size, thread_name_prefix="screens"), size=size)
+        if old is not None:
+            old.shutdown(wait=False)
+    return _pool["executor"]
+
+
+def create_screens_tab(notebook):
+    tab = ttk.Frame(notebook, padding=8)
+    notebook.add(tab, text="Pantallas")
+
+    controls = ttk.Frame(tab)
+    controls.pack(fill="x", pady=(0, 8))
+
+    ttk.Label(controls, text="Intervalo (ms):").pack(side="left")
+    interval_var = tk.IntVar(value=DEFAULT_INTERVAL_MS)
+    ttk.Spinbox(controls, from_=200, to=10000, increment=100, textvariable=interval_var, width=7).pack(side="left", padx=4)
+
+    status_var = tk.StringVar(value="Detenido")
+
+    grid = ttk.Frame(tab)
+    grid.pack(fill="both", expand=True)
+
+    # =============================
+    # REJILLA
+    # =============================
+    def rebuild_grid(serials):
+        for serial in [s for s in _cells if s not in serials]:
+            _cells.pop(serial)["frame"].destroy()
+        cols = max(1, math.ceil(math.sqrt(len(serials))))
+        for i, serial in enumerate(serials):
+            cell = _cells.get(serial)
+            if cell is None:
+                frame = ttk.Frame(grid, padding=4)
+                image = tk.Label(frame, text="...", background="#1e1f22", foreground="#a3a6aa")
+                image.pack(fill="both", expand=True)
+                caption = ttk.Label(frame, text=serial, font=(None, 8))
+                caption.pack(fill="x")
+                cell = {"frame": frame, "image": image, "caption": caption, "photo": None, "ms": 0}
+                _cells[serial] = cell
+            cell["frame"].grid(row=i // cols, column=i % cols, sticky="nsew")
+        for c in range(cols):
+            grid.columnconfigure(c, weight=1)
+
+    def show_frame(serial, data, elapsed_ms):
+        cell = _cells.get(serial)
+        if cell is None:
+            return
+        cell["ms"] = elapsed_ms
+        if not data:
+            cell["caption"].config(text=f"{serial} - sin imagen")
+            return
+        try:
+            photo = tk.PhotoImage(data=data)
+        except tk.TclError:
+            cell["caption"].config(text=f"{serial} - formato no soportado")
+            return
+        cell["image"].config(image=photo, text="")
+        cell["photo"] = photo
+        cell["caption"].config(text=f"{serial} - {elapsed_ms} ms")
+
+    # =============================
+    # CAPTURA CON CONTRAPRESIÓN
+    # =============================
+    def capture(serial):
+        start = time.monotonic()
+        try:
+            data = capture_preview(serial, PREVIEW_WIDTH)
+        except Exception as e:
+            gui_log(f"Error capturando {serial}: {e}", level="error")
+            data = None
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        tab.after(0, lambda: finish(serial, data, elapsed_ms))
+
+    def finish(serial, data, elapsed_ms):
+        _in_flight.discard(serial)
+        show_frame(serial, data, elapsed_ms)
+
+    def refresh_devices():
+        def worker():
+            serials = list_device_serials()
+            tab.after(0, lambda: apply_devices(serials))
+        _state["devices_ts"] = time.monotonic()
+        run_in_thread(worker)
+
+    def apply_devices(serials):
+        _state["serials"] = serials
+        rebuild_grid(serials)
+
+    def tick():
+        if not _state["running"]:
+            return
+        if time.monotonic() - _state["devices_ts"] > DEVICE_REFRESH_S:
+            refresh_devices()
+        for serial in _state["serials"]:
+            # Si el frame anterior aún no ha llegado se salta este ciclo
+            if serial in _in_flight:
+                _state["skipped"] += 1
+                continue
+            _in_flight.add(serial)
+            _executor_for(len(_state["serials"])).submit(capture, serial)
+        status_var.set(f"{len(_state['serials'])} dispositivo(s), {len(_in_flight)} en curso, "
+                       f"{_state['skipped']} ciclo(s) saltado(s)")
+        try:
+            interval = max(200, int(interval_var.get()))
+        except (tk.TclError, ValueError):
+            interval = DEFAULT_INTERVAL_MS
+        _state["job"] = tab.after(interval, tick)
+
+    def start():
+        if _state["running"]:
+            return
+        _state["running"] = True
+        _state["skipped"] = 0
+        _state["devices_ts"] = 0.0
+        tick()
+
+    def stop():
+        _state["running"] = False
+        if _state["job"] is not None:
+            tab.after_cancel(_state["job"])
+            _state["job"] = None
+        status_var.set("Detenido")
+
+    ttk.Button(controls, text="Iniciar", command=start).pack(side="left", padx=4)
+    ttk.Button(controls, text="Detener", command=stop).pack(side="left", padx=4)
+    ttk.Button(controls, text="Actualizar dispositivos", command=refresh_devices).pack(side="left", padx=4)
+    ttk.Label(controls, textvariable=status_var).pack(side="left", padx=12)
+
+    return tab
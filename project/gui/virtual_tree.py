@@ -0,0 +1,272 @@
+# virtual_tree.py
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_ROW_HEIGHT = 22
+
+
+class VirtualTreeview:
+    """
+    Treeview "virtual": las filas viven en una lista de Python y solo se
+    materializan las visibles (slots reutilizados). Ordenar y filtrar se hace
+    sobre la lista, así que abrir un directorio de 50k entradas cuesta lo
+    mismo en Tk que uno de 10.
+    """
+
+    def __init__(self, parent, columns, headings, sort_keys=None, filter_column=0, default_sort=None):
+        self.columns = tuple(columns)
+        self.tree = ttk.Treeview(parent, columns=self.columns, show="headings", selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self._on_scrollbar)
+        self._headings = dict(zip(self.columns, headings))
+        self._sort_keys = sort_keys or {}
+        self._filter_column = filter_column
+        self._default_sort = default_sort  # clave sobre la fila cuando no se ordena por columna
+
+        self._rows = []        # todas las filas (tuplas de valores)
+        self._view = []        # índices de _rows tras filtrar y ordenar
+        self._keyed = []       # (clave, índice) de _view ya ordenado, si hay orden
+        self._offset = 0       # primera fila visible dentro de _view
+        self._slots = []       # iids reutilizados del Treeview
+        self._selected = None  # índice en _rows de la fila seleccionada
+        self._sort = (None, False)
+        self._filter = ""
+        self._rendering = False
+
+        for col in self.columns:
+            self.tree.heading(col, text=self._headings[col], command=lambda c=col: self.sort_by(c))
+        self.tree.tag_configure('evenrow', background='#3a3a3a', foreground='#ffffff')
+        self.tree.tag_configure('oddrow', background='#2e2e2e', foreground='#ffffff')
+
+        self.tree.bind("<Configure>", lambda e: self._resize())
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self._on_page(-1))
+        self.tree.bind("<Next>", lambda e: self._on_page(1))
+
+    # =============================
+    # DATOS
+    # =============================
+    def set_rows(self, rows):
+        self._rows = list(rows)
+        self._selected = None
+        self._offset = 0
+        self._rebuild_view()
+
+    def append_rows(self, rows):
+        """
+        Añade filas (p. ej. un bloque de un listado en streaming) sin perder el
+        scroll. Solo se filtra el bloque nuevo y se fusiona con la vista ya
+        ordenada: sort() de Python detecta los dos tramos ordenados y los une
+        en tiempo lineal, sin volver a calcular las claves de las filas previas.
+        """
+        start = len(self._rows)
+        self._rows.extend(rows)
+        new = self._filtered(range(start, len(self._rows)))
+        sort_key, reverse = self._sort_key()
+        if sort_key is None:
+            self._view.extend(new)
+        else:
+            self._keyed.extend((sort_key(i), i) for i in new)
+            self._keyed.sort(reverse=reverse)
+            self._view = [i for _key, i in self._keyed]
+        self._clamp_offset()
+        self._render()
+
+    def clear(self):
+        self.set_rows([])
+
+    def __len__(self):
+        return len(self._view)
+
+    def total_rows(self):
+        return len(self._rows)
+
+    def set_filter(self, text):
+        self._filter = (text or "").lower()
+        self._offset = 0
+        self._rebuild_view()
+
+    def sort_by(self, column, reverse=None):
+        current, current_rev = self._sort
+        if reverse is None:
+            reverse = not current_rev if current == column else False
+        self._sort = (column, reverse)
+        for col in self.columns:
+            arrow = ""
+            if col == column:
+                arrow = " ▼" if reverse else " ▲"
+            self.tree.heading(col, text=self._headings[col] + arrow)
+        self._rebuild_view(keep_offset=True)
+
+    def selected_values(self):
+        if self._selected is None or self._selected >= len(self._rows):
+            return None
+        return self._rows[self._selected]
+
+    def _filtered(self, indices):
+        needle = self._filter
+        if not needle:
+            return list(indices)
+        col = self._filter_column
+        rows = self._rows
+        return [i for i in indices if needle in str(rows[i][col]).lower()]
+
+    def _sort_key(self):
+        """(clave sobre el índice de fila, descendente) o (None, False) sin orden."""
+        column, reverse = self._sort
+        rows = self._rows
+        if column is not None:
+            idx = self.columns.index(column)
+            key = self._sort_keys.get(column, lambda v: str(v).lower())
+            return (lambda i: key(rows[i][idx])), reverse
+        if self._default_sort is not None:
+            return (lambda i: self._default_sort(rows[i])), False
+        return None, False
+
+    def _rebuild_view(self, keep_offset=False):
+        view = self._filtered(range(len(self._rows)))
+        sort_key, reverse = self._sort_key()
+        if sort_key is None:
+            self._keyed = []
+        else:
+            # El índice desempata: así la fusión de append_rows da el mismo orden
+            self._keyed = sorted(((sort_key(i), i) for i in view), reverse=reverse)
+            view = [i for _key, i in self._keyed]
+
+        self._view = view
+        if not keep_offset:
+            self._offset = 0
+        self._clamp_offset()
+        self._render()
+
+    # =============================
+    # RENDER
+    # =============================
+    def _visible_count(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget("height") or 10)
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT)
+        except (tk.TclError, ValueError):
+            row_height = DEFAULT_ROW_HEIGHT
+        # Se descuenta la cabecera (aprox. una fila)
+        return max(1, height // row_height - 1)
+
+    def _resize(self):
+        wanted = self._visible_count()
+        if wanted == len(self._slots):
+            return
+        while len(self._slots) < wanted:
+            self._slots.append(self.tree.insert("", "end", values=()))
+        while len(self._slots) > wanted:
+            self.tree.delete(self._slots.pop())
+        self._clamp_offset()
+        self._render()
+
+    def _clamp_offset(self):
+        max_offset = max(0, len(self._view) - max(1, len(self._slots)))
+        self._offset = max(0, min(self._offset, max_offset))
+
+    def _render(self):
+        self._rendering = True
+        try:
+            selected_slot = None
+            for pos, iid in enumerate(self._slots):
+                view_pos = self._offset + pos
+                if view_pos < len(self._view):
+                    row_idx = self._view[view_pos]
+                    tag = 'evenrow' if view_pos % 2 == 0 else 'oddrow'
+                    self.tree.item(iid, values=self._rows[row_idx], tags=(tag,))
+                    if row_idx == self._selected:
+                        selected_slot = iid
+                else:
+                    self.tree.item(iid, values=(), tags=())
+            if selected_slot:
+                self.tree.selection_set(selected_slot)
+            else:
+                self.tree.selection_set(())
+        finally:
+            self._rendering = False
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self._view)
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self._offset / total
+        last = min(1.0, (self._offset + len(self._slots)) / total)
+        self.scrollbar.set(first, last)
+
+    # =============================
+    # EVENTOS
+    # =============================
+    def scroll(self, delta):
+        old = self._offset
+        self._offset += delta
+        self._clamp_offset()
+        if self._offset != old:
+            self._render()
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * len(self._view))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            step = len(self._slots) if args[2] == "pages" else 1
+            self._offset += amount * step
+        self._clamp_offset()
+        self._render()
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_select(self, _event=None):
+        if self._rendering:
+            return
+        sel = self.tree.selection()
+        # Una selección vacía suele venir de que la fila salió de la ventana
+        if not sel or sel[0] not in self._slots:
+            return
+        view_pos = self._offset + self._slots.index(sel[0])
+        self._selected = self._view[view_pos] if view_pos < len(self._view) else None
+
+    def _select_view_pos(self, view_pos):
+        if not self._view:
+            return
+        view_pos = max(0, min(view_pos, len(self._view) - 1))
+        self._selected = self._view[view_pos]
+        if view_pos < self._offset:
+            self._offset = view_pos
+        elif view_pos >= self._offset + len(self._slots):
+            self._offset = view_pos - len(self._slots) + 1
+        self._clamp_offset()
+        self._render()
+        self.tree.event_generate("<<TreeviewSelect>>")
+
+    def _current_view_pos(self):
+        if self._selected is None:
+            return None
+        try:
+            return self._view.index(self._selected)
+        except ValueError:
+            return None
+
+    def _on_arrow(self, direction):
+        pos = self._current_view_pos()
+        self._select_view_pos(self._offset if pos is None else pos + direction)
+        return "break"
+
+    def _on_page(self, direction):
+        pos = self._current_view_pos()
+        base = self._offset if pos is None else pos
+        self._select_view_pos(base + direction * max(1, len(self._slots) - 1))
+        return "break"
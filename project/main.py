@@ -8,7 +8,10 @@ from .gui.commands_tab import create_commands_tab
 from .gui.explorer_tab import create_explorer_tab
 from .gui.apps_tab import create_apps_tab
 from .gui.batch_tab import create_batch_tab
+from .gui.screens_tab import create_screens_tab
+from .gui.scheduler_tab import create_scheduler_tab
 from .utils import gui_utils as logs
+from .utils.input_utils import close_input_channels
 
 def main():
     root = tk.Tk()
@@ -31,6 +34,8 @@ def main():
     create_explorer_tab(notebook)
     create_apps_tab(notebook)
     create_batch_tab(notebook)
+    create_screens_tab(notebook)
+    create_scheduler_tab(notebook)
 
     paned.add(notebook, stretch="always")  # Notebook se expande
 
@@ -51,6 +56,8 @@ def main():
     force_dark(root)
 
     root.mainloop()
+    # Al cerrar la ventana se cierran los `adb shell` persistentes de entrada
+    close_input_channels()
 
 if __name__ == "__main__":
     main()
@@ -2,9 +2,9 @@
 
 from .adb_utils import exec_adb, run_adb, run_in_thread
 from .gui_utils import gui_log, _append_log
-from .net_utils import _get_local_ipv4_and_prefix, _run_angryip_scan, _ping_sweep_cold, find_ip_from_mac
+from .net_utils import _get_local_ipv4_and_prefix, _ping_sweep_cold, find_ip_from_mac, find_ips_from_macs
 
 __all__ = ["exec_adb", "run_adb", "run_in_thread", 
            "gui_log", "_append_log", 
-           "_get_local_ipv4_and_prefix", "_run_angryip_scan", "_ping_sweep_cold", "find_ip_from_mac"
+           "_get_local_ipv4_and_prefix", "_ping_sweep_cold", "find_ip_from_mac", "find_ips_from_macs"
           ]
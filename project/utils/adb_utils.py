@@ -1,16 +1,27 @@
+import os
 import subprocess
 import threading
+import time
 from ..config.config import ADB_PATH, TOOLS_DIR
 from .gui_utils import gui_log
 
 DEFAULT_TIMEOUT = 15
+SERIAL_CACHE_TTL = 5.0
 
-def _run_adb_command(args, timeout=DEFAULT_TIMEOUT, log_command=True):
+_serial_cache = {"value": None, "ts": 0.0}
+
+def _adb_base(serial=None):
+    cmd = [str(ADB_PATH)]
+    if serial:
+        cmd += ["-s", serial]
+    return cmd
+
+def _run_adb_command(args, timeout=DEFAULT_TIMEOUT, log_command=True, serial=None):
     if isinstance(args, str):
         args = args.split()
-    cmd = [str(ADB_PATH)] + args
+    cmd = _adb_base(serial) + args
     if log_command:
-        log_cmd = ["adb"] + args
+        log_cmd = ["adb"] + (["-s", serial] if serial else []) + args
         gui_log(f">> {' '.join(log_cmd)}", level="cmd")
     try:
         return subprocess.run(
@@ -32,16 +43,16 @@ def _run_adb_command(args, timeout=DEFAULT_TIMEOUT, log_command=True):
         gui_log(f"Error ejecutando adb: {e}", level="error")
         return None
 
-def run_adb(cmd):
-    result = _run_adb_command(cmd, log_command=False)
+def run_adb(cmd, serial=None):
+    result = _run_adb_command(cmd, log_command=False, serial=serial)
     if result is None:
         return "Error ejecutando adb."
     if result.stderr:
         return result.stderr.strip()
     return result.stdout.strip()
 
-def exec_adb(args):
-    proc = _run_adb_command(args)
+def exec_adb(args, serial=None):
+    proc = _run_adb_command(args, serial=serial)
     if proc is None:
         return ""
     if proc.stdout:
@@ -50,6 +61,87 @@ def exec_adb(args):
         gui_log(proc.stderr.strip(), level="error")
     return proc.stdout
 
+def run_adb_binary(args, serial=None, timeout=DEFAULT_TIMEOUT):
+    """Ejecuta adb y devuelve stdout en bytes (p. ej. `exec-out screencap`), o None si falla."""
+    cmd = _adb_base(serial) + list(args)
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=timeout, cwd=str(TOOLS_DIR))
+    except FileNotFoundError:
+        gui_log(f"No se encontró adb en: {ADB_PATH}", level="error")
+        return None
+    except subprocess.TimeoutExpired:
+        gui_log(f"Tiempo de espera agotado ejecutando: {' '.join(cmd)}", level="error")
+        return None
+    except Exception as e:
+        gui_log(f"Error ejecutando adb: {e}", level="error")
+        return None
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", errors="replace").strip()
+        gui_log(err or f"adb devolvió {proc.returncode}", level="error")
+        return None
+    return proc.stdout
+
+def popen_adb(args, serial=None, binary=False, stdin=None, stderr=subprocess.DEVNULL):
+    """
+    Lanza adb sin esperar (para leer su salida en streaming). Por defecto
+    stderr se descarta para que una tubería sin leer no bloquee al hijo.
+    Devuelve None si no se pudo lanzar.
+    """
+    cmd = _adb_base(serial) + list(args)
+    text_kwargs = {} if binary else {"text": True, "encoding": "utf-8", "errors": "replace"}
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            stdin=stdin,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            cwd=str(TOOLS_DIR),
+            **text_kwargs,
+        )
+        if proc.stdin is not None and not binary:
+            # En modo texto "\n" se escribe como os.linesep: en Windows el shell
+            # del dispositivo (sin PTY) recibiría "\r" al final de cada comando
+            proc.stdin.reconfigure(newline="\n")
+        return proc
+    except FileNotFoundError:
+        gui_log(f"No se encontró adb en: {ADB_PATH}", level="error")
+    except Exception as e:
+        gui_log(f"Error ejecutando adb: {e}", level="error")
+    return None
+
+def list_device_serials():
+    """Seriales en estado `device` según `adb devices` (sin offline/unauthorized)."""
+    proc = _run_adb_command(["devices"], log_command=False)
+    if proc is None:
+        return []
+    serials = []
+    for line in proc.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == "device":
+            serials.append(parts[0])
+    return serials
+
+def get_current_serial(force=False):
+    """
+    Serial del dispositivo por defecto (ANDROID_SERIAL o `adb get-serialno`).
+    Se cachea unos segundos; devuelve None si no hay uno único.
+    """
+    env_serial = os.environ.get("ANDROID_SERIAL")
+    if env_serial:
+        return env_serial
+    now = time.monotonic()
+    if not force and now - _serial_cache["ts"] < SERIAL_CACHE_TTL:
+        return _serial_cache["value"]
+    proc = _run_adb_command(["get-serialno"], timeout=5, log_command=False)
+    serial = None
+    if proc is not None and proc.returncode == 0:
+        out = proc.stdout.strip()
+        if out and out != "unknown":
+            serial = out
+    _serial_cache["value"] = serial
+    _serial_cache["ts"] = now
+    return serial
+
 def run_in_thread(fn, *args, **kwargs):
     t = threading.Thread(target=fn, args=args, kwargs=kwargs, daemon=True)
     t.start()
@@ -0,0 +1,327 @@
+import fnmatch
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .adb_utils import _run_adb_command, popen_adb
+from .local_fs import format_mtime
+
+# =========================
+# Caché de directorios Android
+# =========================
+# Las entradas se guardan por (serial, ruta). Una entrada caducada se sigue
+# devolviendo al instante pero se revalida en segundo plano.
+DIR_CACHE_TTL = 10.0
+DIR_CACHE_MAX = 512
+PREFETCH_LIMIT = 16
+PREFETCH_WORKERS = 3
+
+_dir_cache = {}      # (serial, path) -> (timestamp, entries)
+_pending = {}        # (serial, path) -> [callbacks]
+_forced = {}         # (serial, path) -> [callbacks] que piden una carga posterior a la actual
+_lock = threading.Lock()
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="adb-prefetch")
+
+
+def normalize_android_path(path):
+    path = (path or "/").strip()
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return path or "/"
+
+
+def join_android_path(base, name):
+    base = normalize_android_path(base)
+    return f"{base}/{name}" if base != "/" else f"/{name}"
+
+
+def parse_ls_output(output):
+    """Convierte la salida de `ls -1 -p` en [(nombre, tipo, tamaño, modificado)]."""
+    entries = []
+    for line in output.splitlines():
+        line = line.rstrip("\r")
+        if not line:
+            continue
+        if line.endswith("/"):
+            entries.append((line.rstrip("/"), "Dir", "", ""))
+        else:
+            entries.append((line, "File", "", ""))
+    return entries
+
+
+def _fetch_dir(serial, path):
+    proc = _run_adb_command(["shell", "ls", "-1", "-p", shlex.quote(path)], log_command=False, serial=serial)
+    if proc is None:
+        return None, "Error ejecutando adb."
+    if proc.returncode != 0 and not proc.stdout:
+        return None, (proc.stderr or "").strip() or f"ls devolvió {proc.returncode}"
+    return parse_ls_output(proc.stdout), None
+
+
+def _store_locked(key, entries):
+    """Guarda en caché; quien llama ya tiene _lock."""
+    _dir_cache[key] = (time.monotonic(), entries)
+    if len(_dir_cache) > DIR_CACHE_MAX:
+        oldest = sorted(_dir_cache.items(), key=lambda kv: kv[1][0])
+        for old_key, _ in oldest[:len(_dir_cache) - DIR_CACHE_MAX]:
+            _dir_cache.pop(old_key, None)
+
+
+def _load(key, executor=None):
+    """
+    Lanza la carga de `key`. Los callbacks reciben (path, entries, error).
+    Si mientras tanto llegó una petición forzada (p. ej. tras un push), este
+    resultado puede ser anterior al cambio: no se guarda y se vuelve a cargar.
+    """
+    def worker():
+        serial, path = key
+        entries, error = _fetch_dir(serial, path)
+        with _lock:
+            callbacks = _pending.pop(key, [])
+            rerun = _forced.pop(key, None)
+            if rerun:
+                _pending[key] = rerun
+            elif entries is not None:
+                _store_locked(key, entries)
+        for cb in callbacks:
+            try:
+                cb(path, entries, error)
+            except Exception:
+                pass
+        if rerun:
+            _load(key)
+
+    if executor is not None:
+        executor.submit(worker)
+    else:
+        threading.Thread(target=worker, daemon=True).start()
+
+
+def list_dir_async(serial, path, callback, force=False):
+    """
+    Pide el listado de `path` sin bloquear. Si hay caché se llama a
+    `callback` en el hilo actual; si falta o caducó se recarga en segundo
+    plano y `callback` se vuelve a llamar desde el hilo trabajador. Con
+    `force` no se une a una carga ya en curso (podría haber empezado antes
+    del cambio): espera a que termine y recibe el resultado de una nueva.
+    Devuelve True si se sirvió desde caché.
+    """
+    key = (serial, normalize_android_path(path))
+    now = time.monotonic()
+    with _lock:
+        hit = _dir_cache.get(key)
+        fresh = hit is not None and not force and now - hit[0] < DIR_CACHE_TTL
+        if fresh:
+            entries = hit[1]
+        else:
+            already_loading = key in _pending
+            if force and already_loading:
+                _forced.setdefault(key, []).append(callback)
+            else:
+                _pending.setdefault(key, []).append(callback)
+
+    if fresh:
+        callback(key[1], entries, None)
+        return True
+
+    if hit is not None and not force:
+        callback(key[1], hit[1], None)
+    if not already_loading:
+        _load(key)
+    return hit is not None and not force
+
+
+def prefetch_children(serial, path, entries, limit=PREFETCH_LIMIT):
+    """Precarga en segundo plano los subdirectorios visibles de `path`."""
+    now = time.monotonic()
+    count = 0
+    for entry in entries:
+        name, kind = entry[0], entry[1]
+        if kind != "Dir":
+            continue
+        if count >= limit:
+            break
+        key = (serial, join_android_path(path, name))
+        with _lock:
+            hit = _dir_cache.get(key)
+            if (hit is not None and now - hit[0] < DIR_CACHE_TTL) or key in _pending:
+                continue
+            _pending[key] = []
+        _load(key, executor=_prefetch_pool)
+        count += 1
+
+
+def invalidate_dir(serial=None, path=None):
+    """
+    Invalida la caché tras push/borrado. Sin `path` se vacía todo lo del
+    serial; con `path` se invalida ese directorio, sus descendientes y los
+    índices de búsqueda que lo contienen.
+    """
+    with _lock:
+        if path is None:
+            for key in [k for k in _dir_cache if serial is None or k[0] == serial]:
+                _dir_cache.pop(key, None)
+            return
+        target = normalize_android_path(path)
+        prefix = target if target.endswith("/") else target + "/"
+        for key in list(_dir_cache):
+            if serial is not None and key[0] != serial:
+                continue
+            if key[1] == target or key[1].startswith(prefix):
+                _dir_cache.pop(key, None)
+        # Los índices de búsqueda que cubren la ruta dejan de ser fiables
+        for idx_serial, roots in _indexes.items():
+            if serial is not None and idx_serial != serial:
+                continue
+            for root in [r for r in roots if r == "/" or target == r or target.startswith(r + "/")]:
+                roots.pop(root, None)
+
+
+# =========================
+# Búsqueda recursiva e índice por dispositivo
+# =========================
+# Un único `find` en el dispositivo recorre el árbol; el resultado se guarda
+# como índice (ruta, tipo, tamaño, mtime) y las búsquedas siguientes bajo esa
+# raíz se resuelven en local.
+INDEX_TTL = 300.0
+SEARCH_CHUNK_SIZE = 500
+GLOB_CHARS = set("*?[")
+
+# -printf es más rápido; los toybox antiguos no lo tienen y se usa stat
+_FIND_SCRIPT = (
+    "if find {root} -maxdepth 0 -printf '' >/dev/null 2>&1; then "
+    "find {root} -mindepth 1 -printf '%y|%s|%T@|%p\\n'; "
+    "else find {root} -mindepth 1 -exec stat -c '%F|%s|%Y|%n' {{}} +; fi 2>/dev/null"
+)
+
+_indexes = {}   # serial -> {root: (timestamp, entries)}
+_search = {"gen": 0, "proc": None}
+
+
+def parse_find_line(line):
+    """'tipo|tamaño|mtime|ruta' -> (ruta, tipo, tamaño, modificado) o None."""
+    parts = line.rstrip("\r\n").split("|", 3)
+    if len(parts) != 4 or not parts[3]:
+        return None
+    kind, size, mtime, path = parts
+    is_dir = kind.startswith("d")
+    try:
+        size = "" if is_dir else int(size)
+    except ValueError:
+        size = ""
+    try:
+        mtime = format_mtime(float(mtime))
+    except ValueError:
+        mtime = ""
+    return (path, "Dir" if is_dir else "File", size, mtime)
+
+
+def match_entries(entries, query, root=None):
+    """
+    Filtra entradas del índice. Con comodines (*?[) se usa glob sobre el
+    nombre (o sobre la ruta si el patrón lleva '/'); si no, subcadena.
+    """
+    query = (query or "").strip().lower()
+    prefix = None
+    if root is not None:
+        root = normalize_android_path(root)
+        prefix = root if root == "/" else root + "/"
+    is_glob = any(ch in GLOB_CHARS for ch in query)
+    result = []
+    for entry in entries:
+        path = entry[0]
+        if prefix is not None and not path.startswith(prefix):
+            continue
+        low = path.lower()
+        if not query:
+            result.append(entry)
+        elif is_glob:
+            target = low if "/" in query else low.rsplit("/", 1)[-1]
+            if fnmatch.fnmatchcase(target, query):
+                result.append(entry)
+        elif query in low:
+            result.append(entry)
+    return result
+
+
+def get_index(serial, root):
+    """Índice vigente que cubra `root` (el propio o el de un ancestro) o None."""
+    root = normalize_android_path(root)
+    now = time.monotonic()
+    with _lock:
+        for idx_root, (ts, entries) in _indexes.get(serial, {}).items():
+            if now - ts >= INDEX_TTL:
+                continue
+            if idx_root == root or idx_root == "/" or root.startswith(idx_root + "/"):
+                return entries
+    return None
+
+
+def drop_index(serial=None):
+    with _lock:
+        if serial is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(serial, None)
+
+
+def cancel_search():
+    _search["gen"] += 1
+    proc = _search["proc"]
+    _search["proc"] = None
+    if proc and proc.poll() is None:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+def search_device(serial, root, query, on_chunk, on_done=None, use_index=True):
+    """
+    Busca `query` bajo `root`. Si hay índice se responde al instante; si no,
+    lanza un `find` y va entregando coincidencias por bloques con
+    on_chunk(entries). Bloqueante: ejecutar en un hilo. on_done(error, from_index).
+    """
+    cancel_search()
+    gen = _search["gen"]
+    root = normalize_android_path(root)
+
+    if use_index:
+        entries = get_index(serial, root)
+        if entries is not None:
+            on_chunk(match_entries(entries, query, root))
+            if on_done:
+                on_done(None, True)
+            return
+
+    proc = popen_adb(["shell", _FIND_SCRIPT.format(root=shlex.quote(root))], serial=serial)
+    if proc is None:
+        if on_done:
+            on_done("Error ejecutando adb.", False)
+        return
+    _search["proc"] = proc
+
+    collected = []
+    chunk = []
+    for line in proc.stdout:
+        if _search["gen"] != gen:
+            break
+        entry = parse_find_line(line)
+        if entry is None:
+            continue
+        collected.append(entry)
+        chunk.append(entry)
+        if len(chunk) >= SEARCH_CHUNK_SIZE:
+            on_chunk(match_entries(chunk, query))
+            chunk = []
+    proc.wait()
+
+    if _search["gen"] != gen:
+        return
+    _search["proc"] = None
+    if chunk:
+        on_chunk(match_entries(chunk, query))
+    with _lock:
+        _indexes.setdefault(serial, {})[root] = (time.monotonic(), collected)
+    if on_done:
+        on_done(None, False)
@@ -0,0 +1,2 @@
+# Nuevo script
+adb tcpip 5555
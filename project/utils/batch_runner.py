@@ -0,0 +1,209 @@
+import locale
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config.config import ADB_PATH
+from .gui_utils import gui_log
+from .script_engine import SCRIPT_EXT, ScriptRun, is_script_file
+
+MAX_PARALLEL_BATCHES = 8
+KILL_GRACE = 3.0             # s entre terminate y kill al cancelar
+
+if os.name == "nt":
+    BATCH_EXTS = (".bat", ".cmd")
+else:
+    BATCH_EXTS = (".sh",)
+
+
+def is_batch_file(name):
+    return name.lower().endswith(BATCH_EXTS + (SCRIPT_EXT,))
+
+
+def batch_command(path):
+    """Argumentos para ejecutar el script sin shell=True (rutas con espacios incluidas)."""
+    path = str(path)
+    lower = path.lower()
+    if lower.endswith((".bat", ".cmd")):
+        if os.name != "nt":
+            raise ValueError("Los .bat solo se pueden ejecutar en Windows")
+        return ["cmd", "/c", path]
+    if lower.endswith(".sh"):
+        return ["sh", path]
+    raise ValueError(f"Tipo de script no soportado: {os.path.basename(path)}")
+
+
+def batch_output_encoding():
+    """
+    Codificación de la salida de los scripts. cmd.exe escribe en la página de
+    códigos OEM de la consola (cp850 en español), no en UTF-8 ni en la ANSI.
+    """
+    if os.name == "nt":
+        try:
+            import ctypes
+            return f"cp{ctypes.windll.kernel32.GetOEMCP()}"
+        except (ImportError, AttributeError, OSError):
+            pass
+    return locale.getpreferredencoding(False)
+
+
+def batch_env(serial=None):
+    """Entorno del script: ANDROID_SERIAL fija el dispositivo y adb va primero en el PATH."""
+    env = dict(os.environ)
+    env["PATH"] = str(ADB_PATH.parent) + os.pathsep + env.get("PATH", "")
+    if serial:
+        env["ANDROID_SERIAL"] = serial
+    else:
+        env.pop("ANDROID_SERIAL", None)
+    return env
+
+
+def _kill_tree(proc, force=False):
+    """Termina el script y sus hijos (adb, bucles...) y no solo el intérprete."""
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            args = ["taskkill", "/T", "/PID", str(proc.pid)] + (["/F"] if force else [])
+            subprocess.run(args, capture_output=True, creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        else:
+            os.killpg(proc.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except (OSError, ProcessLookupError):
+        pass
+
+
+class BatchRun:
+    """
+    Una ejecución de un script contra un serial. stdout y stderr se leen en
+    hilos propios y cada línea se entrega en cuanto llega por
+    on_line(serial, stream, line); al acabar se llama a
+    on_done(serial, código, segundos, motivo) con motivo None, "timeout" o
+    "cancelado".
+    """
+
+    def __init__(self, path, serial=None, timeout=None, on_line=None, on_done=None):
+        self.path = path
+        self.serial = serial
+        self.timeout = timeout
+        self.on_line = on_line or (lambda serial, stream, line: None)
+        self.on_done = on_done or (lambda serial, code, elapsed, reason: None)
+        self.proc = None
+        self.reason = None
+        self._cancel = threading.Event()
+
+    def run(self):
+        start = time.monotonic()
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        else:
+            kwargs["start_new_session"] = True
+        try:
+            if self._cancel.is_set():
+                raise InterruptedError
+            self.proc = subprocess.Popen(
+                batch_command(self.path),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                encoding=batch_output_encoding(),
+                errors="replace",
+                cwd=os.path.dirname(str(self.path)) or None,
+                env=batch_env(self.serial),
+                **kwargs,
+            )
+        except InterruptedError:
+            self.on_done(self.serial, None, 0.0, "cancelado")
+            return None
+        except (OSError, ValueError) as e:
+            self.on_line(self.serial, "stderr", str(e))
+            self.on_done(self.serial, None, 0.0, None)
+            return None
+
+        readers = [threading.Thread(target=self._pump, args=(stream, name), daemon=True)
+                   for stream, name in ((self.proc.stdout, "stdout"), (self.proc.stderr, "stderr"))]
+        for reader in readers:
+            reader.start()
+
+        deadline = start + self.timeout if self.timeout else None
+        while self.proc.poll() is None:
+            remaining = deadline - time.monotonic() if deadline else 0.5
+            if remaining <= 0:
+                self.reason = "timeout"
+                self._terminate()
+                break
+            if self._cancel.wait(min(remaining, 0.5)):
+                self.reason = "cancelado"
+                self._terminate()
+                break
+        code = self.proc.wait()
+        for reader in readers:
+            reader.join(timeout=2)
+        elapsed = time.monotonic() - start
+        self.on_done(self.serial, code, elapsed, self.reason)
+        return code
+
+    def _pump(self, stream, name):
+        for line in stream:
+            self.on_line(self.serial, name, line.rstrip("\r\n"))
+
+    def _terminate(self):
+        _kill_tree(self.proc)
+        try:
+            self.proc.wait(timeout=KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            _kill_tree(self.proc, force=True)
+
+    def cancel(self):
+        self._cancel.set()
+
+
+class BatchJob:
+    """Un script lanzado contra varios seriales en paralelo; se cancela entero."""
+
+    def __init__(self, runs):
+        self.runs = runs
+        self._pool = None
+        self._done = threading.Event()
+
+    def start(self, max_workers=MAX_PARALLEL_BATCHES):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(self.runs))))
+        futures = [self._pool.submit(run.run) for run in self.runs]
+
+        def wait_all():
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    gui_log(f"Error ejecutando batch: {e}", level="error")
+            self._pool.shutdown(wait=False)
+            self._done.set()
+
+        threading.Thread(target=wait_all, daemon=True).start()
+        return self
+
+    def cancel(self):
+        for run in self.runs:
+            run.cancel()
+
+    def is_running(self):
+        return self._pool is not None and not self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+def run_batch_parallel(path, serials, timeout=None, on_line=None, on_done=None,
+                       max_workers=MAX_PARALLEL_BATCHES):
+    """
+    Lanza `path` una vez por serial (None = sin ANDROID_SERIAL) y devuelve el
+    BatchJob en marcha. Los scripts .adb.json los ejecuta el motor propio.
+    """
+    serials = list(serials) or [None]
+    run_cls = ScriptRun if is_script_file(path) else BatchRun
+    runs = [run_cls(path, serial, timeout=timeout, on_line=on_line, on_done=on_done) for serial in serials]
+    return BatchJob(runs).start(max_workers=max_workers)
@@ -0,0 +1,209 @@
+import random
+import re
+import shlex
+import subprocess
+import threading
+
+from .adb_utils import _run_adb_command, popen_adb
+from .gui_utils import gui_log
+
+# =========================
+# Eventos de entrada
+# =========================
+# Un evento es una tupla:
+#   ("key", código)                   -> input keyevent
+#   ("tap", x, y)                     -> input tap
+#   ("swipe", x1, y1, x2, y2, ms)     -> input swipe
+#   ("text", texto)                   -> input text
+#   ("sleep", segundos)               -> pausa ejecutada en el propio dispositivo
+# Todos los eventos de una tanda se envían en una sola línea de shell, así que
+# 10 taps cuestan un viaje de ida y vuelta en lugar de 10 procesos adb.
+
+STREAM_CHUNK_EVENTS = 50     # eventos por línea al transmitir secuencias largas
+DEFAULT_INPUT_OVERHEAD = 0.3  # s que tarda `input` en arrancar si no se puede medir
+
+
+def _format_seconds(value):
+    return f"{float(value):.3f}".rstrip("0").rstrip(".") or "0"
+
+
+def build_input_script(events):
+    """
+    Convierte eventos en un script de shell. Las teclas consecutivas se
+    agrupan en un único `input keyevent a b c` (una sola JVM en el dispositivo).
+    """
+    commands = []
+    pending_keys = []
+
+    def flush_keys():
+        if pending_keys:
+            commands.append("input keyevent " + " ".join(pending_keys))
+            pending_keys.clear()
+
+    for event in events:
+        kind = event[0]
+        if kind == "key":
+            pending_keys.append(str(event[1]))
+            continue
+        flush_keys()
+        if kind == "tap":
+            commands.append(f"input tap {int(event[1])} {int(event[2])}")
+        elif kind == "swipe":
+            x1, y1, x2, y2 = (int(v) for v in event[1:5])
+            duration = int(event[5]) if len(event) > 5 else 300
+            commands.append(f"input swipe {x1} {y1} {x2} {y2} {duration}")
+        elif kind == "text":
+            commands.append("input text " + shlex.quote(str(event[1]).replace(" ", "%s")))
+        elif kind == "sleep":
+            if float(event[1]) > 0:
+                commands.append(f"sleep {_format_seconds(event[1])}")
+        else:
+            raise ValueError(f"Evento de entrada desconocido: {event!r}")
+    flush_keys()
+    return "; ".join(commands)
+
+
+def random_taps(count, width=1080, height=1920, seed=None):
+    """Taps aleatorios reproducibles: con la misma semilla sale la misma secuencia."""
+    rng = random.Random(seed)
+    return [("tap", rng.randint(0, width), rng.randint(0, height)) for _ in range(count)]
+
+
+# =========================
+# Canal persistente
+# =========================
+class InputChannel:
+    """
+    `adb shell` abierto por dispositivo al que se escriben los scripts por
+    stdin: se ahorra el arranque de adb y de la sesión en cada pulsación.
+    """
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _ensure_open(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        self._proc = popen_adb(["shell"], serial=self.serial, stdin=subprocess.PIPE)
+        if self._proc is not None:
+            # La salida de `input` no interesa; se descarta para no llenar la tubería
+            threading.Thread(target=self._drain, args=(self._proc,), daemon=True).start()
+        return self._proc is not None
+
+    @staticmethod
+    def _drain(proc):
+        for _ in proc.stdout:
+            pass
+
+    def send(self, script):
+        with self._lock:
+            if not self._ensure_open():
+                return False
+            try:
+                self._proc.stdin.write(script + "\n")
+                self._proc.stdin.flush()
+                return True
+            except (BrokenPipeError, OSError, ValueError):
+                self._proc = None
+                return False
+
+    def close(self):
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc and proc.poll() is None:
+            try:
+                proc.stdin.write("exit\n")
+                proc.stdin.close()
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+
+
+_channels = {}
+_channels_lock = threading.Lock()
+
+
+def get_input_channel(serial=None):
+    with _channels_lock:
+        channel = _channels.get(serial or "")
+        if channel is None:
+            channel = InputChannel(serial)
+            _channels[serial or ""] = channel
+        return channel
+
+
+def close_input_channels():
+    with _channels_lock:
+        channels = list(_channels.values())
+        _channels.clear()
+    for channel in channels:
+        channel.close()
+
+
+def send_events(events, serial=None, persistent=True, wait=False):
+    """
+    Envía una tanda de eventos. Con `persistent` usa el shell abierto (no
+    espera a que terminen); con `wait=True` lanza un `adb shell` y espera,
+    útil cuando hay que saber cuándo acabó la secuencia.
+    """
+    script = build_input_script(events)
+    if not script:
+        return True
+    if persistent and not wait:
+        if get_input_channel(serial).send(script):
+            return True
+        gui_log("Canal de entrada no disponible; se usa adb shell directo", level="error")
+    proc = _run_adb_command(["shell", script], timeout=None, log_command=False, serial=serial)
+    return proc is not None and proc.returncode == 0
+
+
+def stream_events(events, serial=None, chunk_size=STREAM_CHUNK_EVENTS):
+    """
+    Envía una secuencia larga (p. ej. una macro) por el stdin de un `adb shell`
+    propio, en líneas de `chunk_size` eventos: no hay límite de longitud de
+    línea de comandos y el dispositivo empieza a ejecutar mientras llega el
+    resto. Espera a que el shell termine y devuelve True si acabó bien.
+    """
+    proc = popen_adb(["shell"], serial=serial, stdin=subprocess.PIPE)
+    if proc is None:
+        return False
+    threading.Thread(target=InputChannel._drain, args=(proc,), daemon=True).start()
+    try:
+        for i in range(0, len(events), chunk_size):
+            script = build_input_script(events[i:i + chunk_size])
+            if script:
+                proc.stdin.write(script + "\n")
+                proc.stdin.flush()
+        proc.stdin.write("exit\n")
+        proc.stdin.close()
+    except (BrokenPipeError, OSError, ValueError):
+        proc.kill()
+    return proc.wait() == 0
+
+
+_overheads = {}
+_overheads_lock = threading.Lock()
+
+
+def measure_input_overhead(serial=None):
+    """
+    Segundos que tarda un `input` en el dispositivo (arranque de la JVM),
+    medidos allí mismo con un keyevent inocuo y cacheados por dispositivo.
+    """
+    with _overheads_lock:
+        if (serial or "") in _overheads:
+            return _overheads[serial or ""]
+    script = ("for i in 1 2; do a=$(date +%s%N); input keyevent 0; b=$(date +%s%N); "
+              "echo $((b - a)); done")
+    proc = _run_adb_command(["shell", script], log_command=False, serial=serial)
+    samples = [int(v) for v in re.findall(r"^(\d+)\r?$", proc.stdout if proc else "", re.M)]
+    overhead = min(samples) / 1e9 if samples else DEFAULT_INPUT_OVERHEAD
+    with _overheads_lock:
+        _overheads[serial or ""] = overhead
+    return overhead
+
+
+def send_key(code, serial=None):
+    return send_events([("key", code)], serial=serial)
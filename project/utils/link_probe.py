@@ -0,0 +1,142 @@
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+from .adb_utils import popen_adb
+
+PROBE_BYTES = 4 * 1024 * 1024
+RTT_SAMPLES = 3
+READ_CHUNK = 256 * 1024
+HIGH_RTT_MS = 80
+RTT_TIMEOUT = 10.0           # s para todos los ecos; un enlace colgado no bloquea la sonda
+THROUGHPUT_TIMEOUT = 30.0    # s para la transferencia completa
+
+# (Mbps mínimos medidos, opciones de scrcpy). El bitrate se deja por debajo
+# de la mitad del enlace para que sobre margen para ráfagas y el control.
+QUALITY_PRESETS = [
+    (200, {"bitrate": "16M", "max_size": 1920, "max_fps": 60, "codec": "h264"}),
+    (60, {"bitrate": "8M", "max_size": 1600, "max_fps": 60, "codec": "h264"}),
+    (25, {"bitrate": "4M", "max_size": 1280, "max_fps": 45, "codec": "h264"}),
+    (10, {"bitrate": "2M", "max_size": 1024, "max_fps": 30, "codec": "h264"}),
+    (0, {"bitrate": "1M", "max_size": 800, "max_fps": 24, "codec": "h264"}),
+]
+
+
+def _kill_after(proc, seconds):
+    """Mata `proc` si sigue vivo pasados `seconds`; devuelve (timer, evento_disparado)."""
+    fired = threading.Event()
+
+    def fire():
+        fired.set()
+        proc.kill()
+
+    timer = threading.Timer(seconds, fire)
+    timer.daemon = True
+    timer.start()
+    return timer, fired
+
+
+def _reap(proc):
+    try:
+        proc.wait(timeout=2)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def measure_rtt(serial=None, samples=RTT_SAMPLES, timeout=RTT_TIMEOUT):
+    """
+    Mínimo de varios `echo` sobre un único `adb shell` ya abierto, en ms. El
+    primer eco solo sirve para levantar la sesión: así no se mide el arranque
+    del proceso adb en el host, que en Windows supera por sí solo HIGH_RTT_MS.
+    """
+    proc = popen_adb(["shell"], serial=serial, stdin=subprocess.PIPE)
+    if proc is None:
+        return None
+    timer, fired = _kill_after(proc, timeout)
+    best = None
+    try:
+        for i in range(samples + 1):
+            start = time.monotonic()
+            proc.stdin.write("echo ok\n")
+            proc.stdin.flush()
+            if proc.stdout.readline().strip() != "ok":
+                return None
+            elapsed = (time.monotonic() - start) * 1000
+            if i > 0:
+                best = elapsed if best is None else min(best, elapsed)
+    except (BrokenPipeError, OSError, ValueError):
+        return None
+    finally:
+        timer.cancel()
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        _reap(proc)
+    return None if fired.is_set() else best
+
+
+def measure_throughput(serial=None, nbytes=PROBE_BYTES, timeout=THROUGHPUT_TIMEOUT):
+    """
+    Transfiere `nbytes` aleatorios por exec-out (no comprimibles) y devuelve
+    (Mbps, bytes_recibidos, segundos). El cronómetro arranca con el primer
+    bloque recibido, así el arranque de adb y del transporte no cuenta. Si
+    no termina en `timeout` segundos se aborta y no hay medida.
+    """
+    proc = popen_adb(["exec-out", "head", "-c", str(nbytes), "/dev/urandom"], serial=serial, binary=True)
+    if proc is None:
+        return None, 0, 0.0
+    timer, fired = _kill_after(proc, timeout)
+    received = 0
+    timed = 0          # bytes llegados después de arrancar el cronómetro
+    start = None
+    try:
+        while True:
+            chunk = proc.stdout.read1(READ_CHUNK)
+            if not chunk:
+                break
+            received += len(chunk)
+            if start is None:
+                start = time.monotonic()
+            else:
+                timed += len(chunk)
+    finally:
+        timer.cancel()
+        _reap(proc)
+    elapsed = time.monotonic() - start if start is not None else 0.0
+    if fired.is_set() or timed == 0 or elapsed <= 0:
+        return None, received, elapsed
+    return timed * 8 / elapsed / 1_000_000, received, elapsed
+
+
+def pick_preset(mbps, rtt_ms=None):
+    """Elige el preset para el ancho de banda medido; con RTT alto se baja un escalón."""
+    idx = len(QUALITY_PRESETS) - 1
+    for i, (min_mbps, _opts) in enumerate(QUALITY_PRESETS):
+        if mbps >= min_mbps:
+            idx = i
+            break
+    if rtt_ms is not None and rtt_ms > HIGH_RTT_MS:
+        idx = min(idx + 1, len(QUALITY_PRESETS) - 1)
+    return dict(QUALITY_PRESETS[idx][1])
+
+
+def probe_link(serial=None, nbytes=PROBE_BYTES):
+    """
+    Mide RTT y throughput y devuelve (opciones_scrcpy, medida) o (None, medida)
+    si el dispositivo no respondió.
+    """
+    rtt = measure_rtt(serial)
+    mbps, received, elapsed = measure_throughput(serial, nbytes) if rtt is not None else (None, 0, 0.0)
+    link = {
+        "rtt_ms": round(rtt, 1) if rtt is not None else None,
+        "mbps": round(mbps, 1) if mbps is not None else None,
+        "bytes": received,
+        "seconds": round(elapsed, 3),
+        "measured": datetime.now().isoformat(timespec="seconds"),
+    }
+    if mbps is None:
+        return None, link
+    return pick_preset(mbps, rtt), link
@@ -0,0 +1,56 @@
+import os
+import time
+
+SCAN_CHUNK_SIZE = 1000
+
+
+def format_mtime(ts):
+    if not ts:
+        return ""
+    try:
+        return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts))
+    except (OverflowError, OSError, ValueError):
+        return ""
+
+
+def _entry_row(entry):
+    """
+    (nombre, tipo, tamaño, modificado) a partir de un DirEntry. En Windows
+    stat() viene gratis del propio listado; en Linux es una única llamada.
+    """
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False
+    try:
+        st = entry.stat()
+        size = "" if is_dir else st.st_size
+        mtime = format_mtime(st.st_mtime)
+    except OSError:
+        size, mtime = "", ""
+    return (entry.name, "Dir" if is_dir else "File", size, mtime)
+
+
+def scan_local_dir(path, on_chunk, on_done=None, should_stop=None, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Lista `path` con os.scandir y entrega las filas en bloques de `chunk_size`
+    mediante on_chunk(rows). Pensado para ejecutarse en un hilo: on_done(error)
+    se llama al terminar (error es None si todo fue bien).
+    """
+    chunk = []
+    error = None
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if should_stop and should_stop():
+                    return
+                chunk.append(_entry_row(entry))
+                if len(chunk) >= chunk_size:
+                    on_chunk(chunk)
+                    chunk = []
+    except OSError as e:
+        error = e
+    if chunk and not (should_stop and should_stop()):
+        on_chunk(chunk)
+    if on_done and not (should_stop and should_stop()):
+        on_done(error)
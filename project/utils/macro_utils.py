@@ -0,0 +1,261 @@
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .adb_utils import _run_adb_command, popen_adb
+from .gui_utils import gui_log
+from .input_utils import measure_input_overhead, stream_events
+
+# =========================
+# Formato de macro
+# =========================
+# Un archivo .macro tiene una línea por evento: "<segundos> <tipo> <args...>"
+#   0.000 key 3
+#   0.840 tap 540 1200
+#   1.900 swipe 100 1500 100 400 250
+#   3.100 text hola mundo
+# Las líneas vacías y las que empiezan por '#' se ignoran.
+MACRO_HEADER = "# macro ADB v1: <segundos> <tipo> <args>"
+
+TAP_MAX_DISTANCE = 20        # px: por debajo es un tap, por encima un swipe
+TAP_MAX_DURATION = 0.3       # s
+MAX_PARALLEL_REPLAYS = 16
+
+# KEY_* de getevent -> keycode de Android
+GETEVENT_KEYCODES = {
+    "KEY_HOME": 3, "KEY_HOMEPAGE": 3, "KEY_BACK": 4, "KEY_VOLUMEUP": 24,
+    "KEY_VOLUMEDOWN": 25, "KEY_POWER": 26, "KEY_CAMERA": 27, "KEY_MENU": 82,
+    "KEY_MUTE": 164, "KEY_APPSELECT": 187,
+}
+
+
+def format_macro_line(t, event):
+    kind = event[0]
+    args = " ".join(str(v) for v in event[1:])
+    return f"{t:.3f} {kind} {args}".rstrip()
+
+
+def parse_macro_line(line):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    parts = line.split(None, 2)
+    if len(parts) < 2:
+        raise ValueError(f"Línea de macro inválida: {line!r}")
+    t = float(parts[0])
+    kind = parts[1]
+    rest = parts[2] if len(parts) > 2 else ""
+    if kind == "text":
+        return t, ("text", rest)
+    if kind in ("key", "tap", "swipe"):
+        values = [int(v) for v in rest.split()]
+        return t, (kind, *values)
+    raise ValueError(f"Tipo de evento desconocido en macro: {kind!r}")
+
+
+def save_macro(path, timed_events):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(MACRO_HEADER + "\n")
+        for t, event in timed_events:
+            f.write(format_macro_line(t, event) + "\n")
+
+
+def load_macro(path):
+    timed = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parsed = parse_macro_line(line)
+            if parsed is not None:
+                timed.append(parsed)
+    timed.sort(key=lambda item: item[0])
+    return timed
+
+
+def _event_cost(event, overhead):
+    """Segundos que el dispositivo pasa ejecutando un evento (arranque + gesto)."""
+    if event[0] == "swipe":
+        return overhead + (int(event[5]) if len(event) > 5 else 300) / 1000.0
+    return overhead
+
+
+def macro_to_events(timed_events, speed=1.0, overhead=0.0):
+    """
+    Eventos con sus pausas intercaladas; las pausas se ejecutan en el
+    dispositivo. A cada pausa se le descuenta lo que tardó el evento anterior
+    (`overhead` por cada `input` más la duración de los swipes); si no llega,
+    el resto se descuenta de las siguientes para no acumular retraso.
+    """
+    events = []
+    last_t = None
+    debt = 0.0
+    for t, event in timed_events:
+        if last_t is not None:
+            gap = max(0.0, t - last_t) / speed - debt
+            debt = max(0.0, -gap)
+            if gap > 0:
+                events.append(("sleep", gap))
+        events.append(event)
+        debt += _event_cost(event, overhead)
+        last_t = t
+    return events
+
+
+# =========================
+# Grabación desde el dispositivo (getevent)
+# =========================
+_GETEVENT_RE = re.compile(r"\[\s*([\d.]+)\]\s+(\S+):\s+(\S+)\s+(\S+)\s+(\S+)")
+_ABS_RE = re.compile(r"(ABS_MT_POSITION_[XY])\s*:.*?max\s+(\d+)")
+_WM_SIZE_RE = re.compile(r"(\d+)x(\d+)")
+
+
+def _read_touch_ranges(serial):
+    """{dispositivo_input: (max_x, max_y)} a partir de `getevent -lp`."""
+    proc = _run_adb_command(["shell", "getevent", "-lp"], log_command=False, serial=serial)
+    ranges = {}
+    current = None
+    for line in (proc.stdout if proc else "").splitlines():
+        if line.startswith("add device"):
+            current = line.split(":", 1)[1].strip()
+            continue
+        match = _ABS_RE.search(line)
+        if match and current:
+            maxes = ranges.setdefault(current, [None, None])
+            maxes[0 if match.group(1).endswith("X") else 1] = int(match.group(2))
+    return {dev: tuple(m) for dev, m in ranges.items() if None not in m}
+
+
+def _read_screen_size(serial):
+    proc = _run_adb_command(["shell", "wm", "size"], log_command=False, serial=serial)
+    sizes = _WM_SIZE_RE.findall(proc.stdout if proc else "")
+    # Si hay "Override size" va después de "Physical size" y es la que se usa
+    return tuple(int(v) for v in sizes[-1]) if sizes else None
+
+
+class MacroRecorder:
+    """
+    Graba toques y teclas físicas leyendo `getevent -lt`. Cada gesto de un
+    dedo se convierte en tap o swipe (en píxeles de pantalla) y las teclas
+    conocidas en keyevents; los tiempos son relativos al primer evento.
+    """
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self.events = []
+        self._proc = None
+        self._thread = None
+        self._ranges = {}
+        self._screen = None
+        self._t0 = None
+        self._touch = None   # {"dev", "start_t", "x", "y", "x0", "y0"}
+
+    def start(self):
+        self._ranges = _read_touch_ranges(self.serial)
+        self._screen = _read_screen_size(self.serial)
+        self._proc = popen_adb(["shell", "getevent", "-lt"], serial=self.serial)
+        if self._proc is None:
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        proc = self._proc
+        if proc and proc.poll() is None:
+            try:
+                proc.terminate()
+                proc.wait(timeout=3)
+            except Exception:
+                proc.kill()
+        if self._thread:
+            self._thread.join(timeout=3)
+        return list(self.events)
+
+    def _rel(self, t):
+        if self._t0 is None:
+            self._t0 = t
+        return round(t - self._t0, 3)
+
+    def _scale(self, dev, x, y):
+        maxes = self._ranges.get(dev)
+        if not maxes or not self._screen:
+            return x, y
+        return (int(x * self._screen[0] / (maxes[0] + 1)),
+                int(y * self._screen[1] / (maxes[1] + 1)))
+
+    def _run(self):
+        for line in self._proc.stdout:
+            match = _GETEVENT_RE.match(line)
+            if not match:
+                continue
+            t, dev, ev_type, code, value = match.groups()
+            self._handle(float(t), dev, ev_type, code, value)
+
+    def _handle(self, t, dev, ev_type, code, value):
+        if ev_type == "EV_KEY" and code in GETEVENT_KEYCODES and value == "DOWN":
+            self.events.append((self._rel(t), ("key", GETEVENT_KEYCODES[code])))
+        elif ev_type == "EV_ABS" and code == "ABS_MT_TRACKING_ID":
+            if value == "ffffffff":
+                self._touch_up(t)
+            elif self._touch is None:
+                self._touch = {"dev": dev, "start_t": t, "x": None, "y": None, "x0": None, "y0": None}
+        elif ev_type == "EV_KEY" and code == "BTN_TOUCH":
+            if value == "UP":
+                self._touch_up(t)
+            elif self._touch is None:
+                self._touch = {"dev": dev, "start_t": t, "x": None, "y": None, "x0": None, "y0": None}
+        elif ev_type == "EV_ABS" and code in ("ABS_MT_POSITION_X", "ABS_MT_POSITION_Y") and self._touch:
+            axis = "x" if code.endswith("X") else "y"
+            self._touch[axis] = int(value, 16)
+            if self._touch[axis + "0"] is None:
+                self._touch[axis + "0"] = self._touch[axis]
+
+    def _touch_up(self, t):
+        touch, self._touch = self._touch, None
+        if not touch or None in (touch["x0"], touch["y0"], touch["x"], touch["y"]):
+            return
+        x0, y0 = self._scale(touch["dev"], touch["x0"], touch["y0"])
+        x1, y1 = self._scale(touch["dev"], touch["x"], touch["y"])
+        duration = t - touch["start_t"]
+        start = self._rel(touch["start_t"])
+        if math.hypot(x1 - x0, y1 - y0) < TAP_MAX_DISTANCE and duration < TAP_MAX_DURATION:
+            self.events.append((start, ("tap", x0, y0)))
+        else:
+            self.events.append((start, ("swipe", x0, y0, x1, y1, max(1, int(duration * 1000)))))
+
+
+# =========================
+# Reproducción
+# =========================
+def replay_macro(timed_events, serials, speed=1.0):
+    """
+    Reproduce la macro en varios dispositivos a la vez. Cada dispositivo
+    recibe la macro por el stdin de un shell (pausas incluidas), así que el
+    ritmo lo marca el propio teléfono; las pausas se corrigen con el coste de
+    `input` medido en ese dispositivo. Devuelve {serial: (ok, segundos)}.
+    """
+    timed_events = list(timed_events)
+    serials = list(serials) or [None]
+    # Con pocos dispositivos todos arrancan a la vez; con más se van escalonando por el pool
+    barrier = threading.Barrier(len(serials)) if len(serials) <= MAX_PARALLEL_REPLAYS else None
+
+    def run(serial):
+        events = macro_to_events(timed_events, speed=speed, overhead=measure_input_overhead(serial))
+        if barrier is not None:
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+        start = time.monotonic()
+        ok = stream_events(events, serial=serial)
+        return serial, ok, time.monotonic() - start
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_REPLAYS, len(serials))) as pool:
+        for serial, ok, elapsed in pool.map(run, serials):
+            results[serial] = (ok, elapsed)
+            label = serial or "dispositivo"
+            gui_log(f"Macro en {label}: {'OK' if ok else 'ERROR'} ({elapsed:.2f}s)",
+                    level="info" if ok else "error")
+    return results
@@ -0,0 +1,266 @@
+import socket
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from .gui_utils import gui_log
+from .net_interfaces import list_interfaces
+
+MDNS_GROUP = "224.0.0.251"
+MDNS_PORT = 5353
+SERVICE_CONNECT = "_adb-tls-connect._tcp.local"
+SERVICE_PAIRING = "_adb-tls-pairing._tcp.local"
+ADB_SERVICES = {SERVICE_CONNECT: "connect", SERVICE_PAIRING: "pairing"}
+
+QUERY_FIRST = 1.0            # s hasta la segunda consulta; luego se dobla...
+QUERY_INTERVAL = 60.0        # ...hasta este máximo (RFC 6762, 5.2)
+RESOLVE_RETRY = 5.0          # s mínimos entre consultas A para el mismo host
+
+TYPE_A = 1
+TYPE_PTR = 12
+TYPE_TXT = 16
+TYPE_SRV = 33
+CLASS_IN = 1
+
+MdnsService = namedtuple("MdnsService", "instance kind host ip port expires")
+
+
+# =========================
+# Formato DNS (solo lo necesario para DNS-SD)
+# =========================
+def encode_name(name):
+    out = b""
+    for label in name.rstrip(".").split("."):
+        raw = label.encode("utf-8")
+        out += bytes([len(raw)]) + raw
+    return out + b"\0"
+
+
+def build_query(questions):
+    """Paquete de consulta mDNS para [(nombre, tipo)]."""
+    packet = struct.pack("!HHHHHH", 0, 0, len(questions), 0, 0, 0)
+    for name, rtype in questions:
+        packet += encode_name(name) + struct.pack("!HH", rtype, CLASS_IN)
+    return packet
+
+
+def _read_name(data, offset):
+    labels = []
+    end = None
+    for _hop in range(64):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:           # puntero de compresión
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return ".".join(labels), end if end is not None else offset
+        labels.append(data[offset:offset + length].decode("utf-8", errors="replace"))
+        offset += length
+    raise ValueError("nombre DNS con demasiados saltos")
+
+
+def parse_records(data):
+    """
+    Registros de respuesta de un paquete DNS como [(nombre, tipo, ttl, valor)].
+    valor: PTR -> nombre, SRV -> (puerto, host), A -> ip. El resto se ignora.
+    Lanza ValueError (o IndexError/struct.error) si el paquete está mal formado.
+    """
+    _id, flags, qdcount, ancount, nscount, arcount = struct.unpack("!HHHHHH", data[:12])
+    if not flags & 0x8000:
+        return []                           # es una consulta, no una respuesta
+    offset = 12
+    for _ in range(qdcount):
+        _name, offset = _read_name(data, offset)
+        offset += 4
+    records = []
+    for _ in range(ancount + nscount + arcount):
+        name, offset = _read_name(data, offset)
+        rtype, _rclass, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata_at = offset
+        offset += rdlength
+        if rtype == TYPE_PTR:
+            value = _read_name(data, rdata_at)[0]
+        elif rtype == TYPE_SRV:
+            _priority, _weight, port = struct.unpack("!HHH", data[rdata_at:rdata_at + 6])
+            value = (port, _read_name(data, rdata_at + 6)[0].lower())
+        elif rtype == TYPE_A and rdlength == 4:
+            value = socket.inet_ntoa(data[rdata_at:offset])
+        else:
+            continue
+        records.append((name.lower(), rtype, ttl, value))
+    return records
+
+
+# =========================
+# Navegador DNS-SD
+# =========================
+class MdnsBrowser:
+    """
+    Descubre servicios de depuración inalámbrica (Android 11+) por mDNS.
+    Escucha de forma pasiva todo lo que se anuncia en el grupo multicast y
+    además pregunta por los tipos de servicio con intervalos crecientes.
+    Los registros se guardan con su TTL (un TTL 0 es una baja) y, cada vez
+    que cambia el conjunto de servicios resueltos, se llama on_change(lista).
+    """
+
+    def __init__(self, on_change=None, service_types=ADB_SERVICES, interfaces=None,
+                 group=MDNS_GROUP, port=MDNS_PORT):
+        self.on_change = on_change
+        self.service_types = dict(service_types)
+        self.interfaces = interfaces        # IPs locales donde unirse; None = todas
+        self.group = group
+        self.port = port
+        self._cache = {}                    # (nombre, tipo) -> {valor: caducidad}
+        self._asked = {}                    # host -> última consulta A
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sock = None
+        self._joined = []
+        self._thread = None
+        self._snapshot = ()
+
+    # --- API ---
+    def start(self):
+        if self._thread is not None:
+            return True
+        try:
+            self._sock = self._open_socket()
+        except OSError as e:
+            gui_log(f"mDNS no disponible: {e}", level="error")
+            return False
+        # Evento y socket propios de esta ejecución: un bucle anterior que aún
+        # no haya salido no puede seguir con el socket nuevo ni cerrarlo
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, args=(self._sock, self._stop),
+                                        daemon=True, name="mdns")
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=2.0):
+        """Para el bucle y espera a que cierre su socket (sale en <= 0,5 s)."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def query_now(self):
+        self._send_query([(service, TYPE_PTR) for service in self.service_types])
+
+    def services(self):
+        """Servicios vigentes con IP y puerto resueltos."""
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            for service, kind in self.service_types.items():
+                for instance, ptr_exp in self._valid((service.lower(), TYPE_PTR), now):
+                    label = instance[:-len(service) - 1] if instance.lower().endswith("." + service.lower()) else instance
+                    for (port, host), srv_exp in self._valid((instance.lower(), TYPE_SRV), now):
+                        for ip, a_exp in self._valid((host, TYPE_A), now):
+                            found.append(MdnsService(label, kind, host, ip, port, min(ptr_exp, srv_exp, a_exp)))
+        return sorted(found)
+
+    # --- Red ---
+    def _open_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError:
+                pass
+        sock.bind(("", self.port))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 255)
+        self._joined = []
+        local_ips = self.interfaces if self.interfaces is not None else [i.ip for i in list_interfaces()]
+        for ip in local_ips or ["0.0.0.0"]:
+            try:
+                mreq = struct.pack("4s4s", socket.inet_aton(self.group), socket.inet_aton(ip))
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+                self._joined.append(ip)
+            except OSError:
+                continue
+        if not self._joined:
+            sock.close()
+            raise OSError("no se pudo unir al grupo multicast en ninguna interfaz")
+        sock.settimeout(0.5)
+        return sock
+
+    def _send_query(self, questions):
+        if self._sock is None:
+            return
+        packet = build_query(questions)
+        for ip in self._joined:
+            try:
+                if ip != "0.0.0.0":
+                    self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(ip))
+                self._sock.sendto(packet, (self.group, self.port))
+            except OSError:
+                continue
+
+    def _loop(self, sock, stop):
+        next_query, interval = time.monotonic(), QUERY_FIRST
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                if now >= next_query:
+                    self.query_now()
+                    next_query, interval = now + interval, min(QUERY_INTERVAL, interval * 2)
+                try:
+                    data, _addr = sock.recvfrom(9000)
+                except socket.timeout:
+                    data = None
+                except OSError:
+                    if stop.is_set():
+                        break
+                    raise
+                if data:
+                    self._handle(data)
+                self._notify_if_changed()
+        finally:
+            sock.close()
+            if self._sock is sock:
+                self._sock = None
+
+    # --- Caché ---
+    def _valid(self, key, now):
+        values = self._cache.get(key, {})
+        for value, expires in list(values.items()):
+            if expires <= now:
+                del values[value]
+        return list(values.items())
+
+    def _handle(self, data):
+        try:
+            records = parse_records(data)
+        except (ValueError, IndexError, struct.error):
+            return
+        now = time.monotonic()
+        with self._lock:
+            for name, rtype, ttl, value in records:
+                values = self._cache.setdefault((name, rtype), {})
+                if ttl == 0:
+                    values.pop(value, None)
+                else:
+                    values[value] = now + ttl
+            # Hosts anunciados por SRV sin registro A: se pregunta por ellos
+            missing = []
+            for _name, rtype, ttl, value in records:
+                host = value[1] if rtype == TYPE_SRV and ttl else None
+                if host and not self._valid((host, TYPE_A), now) and now - self._asked.get(host, 0) >= RESOLVE_RETRY:
+                    self._asked[host] = now
+                    missing.append(host)
+        if missing:
+            self._send_query([(host, TYPE_A) for host in missing])
+
+    def _notify_if_changed(self):
+        services = self.services()
+        current = tuple((s.instance, s.kind, s.ip, s.port) for s in services)
+        if current != self._snapshot:
+            self._snapshot = current
+            if self.on_change:
+                self.on_change(services)
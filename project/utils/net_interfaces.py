@@ -0,0 +1,198 @@
+import ipaddress
+import platform
+import re
+import socket
+import struct
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from .gui_utils import gui_log
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CACHE_MAX_AGE = 30.0         # s; aunque no cambien los nombres, la IP puede cambiar por DHCP
+
+# ioctl de Linux (linux/sockios.h, linux/if.h)
+SIOCGIFFLAGS = 0x8913
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+
+
+class NetInterface(namedtuple("NetInterface", "name ip prefix")):
+    """Interfaz IPv4: nombre, dirección y longitud de prefijo real."""
+
+    @property
+    def network(self):
+        return ipaddress.ip_network(f"{self.ip}/{self.prefix}", strict=False)
+
+    @property
+    def cidr(self):
+        return f"{self.ip}/{self.prefix}"
+
+
+_cache = {"signature": None, "at": 0.0, "interfaces": []}
+_cache_lock = threading.Lock()
+
+
+def _mask_to_prefix(mask):
+    if mask.lower().startswith("0x"):
+        mask = socket.inet_ntoa(struct.pack("!I", int(mask, 16)))
+    try:
+        return ipaddress.IPv4Network(f"0.0.0.0/{mask}").prefixlen
+    except ValueError:
+        return 24
+
+
+# =========================
+# Enumeración por plataforma
+# =========================
+def _linux_interfaces():
+    """if_nameindex + ioctl por interfaz: sin lanzar procesos."""
+    interfaces = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for _index, name in socket.if_nameindex():
+            request = struct.pack("256s", name.encode()[:15])
+            try:
+                flags = struct.unpack("H", fcntl.ioctl(sock.fileno(), SIOCGIFFLAGS, request)[16:18])[0]
+                if not flags & IFF_UP or flags & IFF_LOOPBACK:
+                    continue
+                ip = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)[20:24])
+                mask = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, request)[20:24])
+            except OSError:
+                continue  # sin IPv4 asignada
+            interfaces.append(NetInterface(name, ip, _mask_to_prefix(mask)))
+    finally:
+        sock.close()
+    return interfaces
+
+
+def _windows_interfaces():
+    try:
+        output = subprocess.check_output(["ipconfig"], text=True, encoding="utf-8", errors="replace")
+    except Exception as exc:
+        gui_log(f"No se pudo ejecutar ipconfig: {exc}", level="error")
+        return []
+
+    interfaces = []
+    name = ip = None
+    for raw_line in output.splitlines():
+        line = raw_line.rstrip()
+        if line and not line.startswith(" "):
+            name, ip = line.strip().rstrip(":"), None
+            continue
+        if not name:
+            continue
+        match = re.search(r"(IPv4 Address|Direcci[oó]n IPv4).+?:\s*([\d.]+)", line)
+        if match:
+            ip = match.group(2)
+            continue
+        match = re.search(r"(Subnet Mask|M[aá]scara de subred).+?:\s*([\d.]+)", line)
+        if match and ip and not ip.startswith("127."):
+            interfaces.append(NetInterface(name, ip, _mask_to_prefix(match.group(2))))
+            ip = None
+    return interfaces
+
+
+def _ifconfig_interfaces():
+    try:
+        output = subprocess.check_output(["ifconfig"], text=True, encoding="utf-8", errors="replace")
+    except Exception as exc:
+        gui_log(f"No se pudo detectar interfaces: {exc}", level="error")
+        return []
+
+    interfaces = []
+    name = None
+    for line in output.splitlines():
+        if line and not line[0].isspace():
+            name = line.split(":", 1)[0].split()[0]
+            continue
+        match = re.search(r"inet (?:addr:)?(\d+\.\d+\.\d+\.\d+).*?(?:netmask|Mask:)\s*(0x[0-9a-fA-F]+|[\d.]+)", line)
+        if name and match and not match.group(1).startswith("127."):
+            interfaces.append(NetInterface(name, match.group(1), _mask_to_prefix(match.group(2))))
+    return interfaces
+
+
+def _enumerate():
+    system = platform.system().lower()
+    if system == "windows":
+        return _windows_interfaces()
+    if system == "linux" and fcntl is not None:
+        return _linux_interfaces()
+    return _ifconfig_interfaces()
+
+
+def _signature():
+    try:
+        return tuple(socket.if_nameindex())
+    except (AttributeError, OSError):
+        return None
+
+
+# =========================
+# API
+# =========================
+def list_interfaces(force=False):
+    """
+    Interfaces IPv4 activas (sin loopback). Se cachean y solo se vuelven a
+    enumerar si cambia la lista de interfaces del sistema (if_nameindex, una
+    llamada al kernel), si la caché tiene más de CACHE_MAX_AGE o con `force`.
+    """
+    signature = _signature()
+    now = time.monotonic()
+    with _cache_lock:
+        if (not force and _cache["at"] and signature == _cache["signature"]
+                and now - _cache["at"] < CACHE_MAX_AGE):
+            return list(_cache["interfaces"])
+    interfaces = _enumerate()
+    with _cache_lock:
+        _cache.update(signature=signature, at=now, interfaces=interfaces)
+    return list(interfaces)
+
+
+def _default_route_interface():
+    """Nombre de la interfaz de la ruta por defecto (Linux, /proc/net/route)."""
+    try:
+        with open("/proc/net/route", "r") as f:
+            rows = [line.split() for line in f.read().splitlines()[1:]]
+    except OSError:
+        return None
+    defaults = [row for row in rows if len(row) >= 7 and row[1] == "00000000"]
+    if not defaults:
+        return None
+    return min(defaults, key=lambda row: int(row[6]))[0]
+
+
+def default_interface():
+    """
+    Interfaz de la red local: la de la ruta por defecto si se conoce, si no
+    la que el sistema usaría para salir (connect UDP, no envía paquetes) y,
+    sin red externa, la primera interfaz activa.
+    """
+    interfaces = list_interfaces()
+    if not interfaces:
+        return None
+    route_name = _default_route_interface()
+    for iface in interfaces:
+        if iface.name == route_name:
+            return iface
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            s.connect(("8.8.8.8", 80))
+            local_ip = s.getsockname()[0]
+        finally:
+            s.close()
+        for iface in interfaces:
+            if iface.ip == local_ip:
+                return iface
+    except OSError:
+        pass
+    return interfaces[0]
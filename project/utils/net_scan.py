@@ -0,0 +1,107 @@
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+
+from .gui_utils import gui_log
+from .net_interfaces import list_interfaces
+
+PROBE_RATE = 1000            # sondas/s en total, sumando todas las interfaces
+PROBE_PORT = 9               # discard: basta con que el kernel resuelva la MAC por ARP
+CHUNK_PREFIX = 24            # las redes mayores se barren en trozos de este tamaño
+MAX_SWEEP_PREFIX = 20        # redes mayores (p. ej. /16 de docker) se limitan al /20 propio
+SETTLE_TIME = 0.8            # s para que lleguen las respuestas ARP tras la última sonda
+MAX_PARALLEL_CHUNKS = 8
+
+
+class RateLimiter:
+    """Cubo de fichas compartido por todos los hilos del barrido."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate // 10))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def sweep_network_for(iface):
+    """Red a barrer para una interfaz: su CIDR real, acotado a MAX_SWEEP_PREFIX."""
+    network = iface.network
+    if network.prefixlen < MAX_SWEEP_PREFIX:
+        network = ipaddress.ip_network(f"{iface.ip}/{MAX_SWEEP_PREFIX}", strict=False)
+        gui_log(f"{iface.name}: red {iface.network} demasiado grande, se barre {network}", level="info")
+    return network
+
+
+def iter_chunks(network, chunk_prefix=CHUNK_PREFIX):
+    if network.prefixlen >= chunk_prefix:
+        return [network]
+    return list(network.subnets(new_prefix=chunk_prefix))
+
+
+def _probe_chunk(chunk, limiter, stop):
+    # Un datagrama UDP vacío a cada host obliga al sistema a resolver su MAC
+    # (la respuesta ARP llega a la tabla de vecinos aunque el puerto esté cerrado)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    try:
+        hosts = chunk.hosts() if chunk.prefixlen < 31 else iter(chunk)
+        for host in hosts:
+            if stop is not None and stop.is_set():
+                return
+            limiter.acquire()
+            try:
+                sock.sendto(b"", (str(host), PROBE_PORT))
+            except OSError:
+                pass  # host inalcanzable / buffer lleno: se sigue con el resto
+    finally:
+        sock.close()
+
+
+def sweep_networks(networks, rate=PROBE_RATE, stop=None, on_chunk=None, max_workers=MAX_PARALLEL_CHUNKS):
+    """
+    Barre varias redes a la vez. Cada red se parte en trozos de /CHUNK_PREFIX
+    que se reparten entre el pool intercalando las redes (una red grande no
+    retrasa a las pequeñas), y todas comparten un único límite de sondas/s.
+    on_chunk(trozo) se llama al terminar cada trozo; si `stop` se activa el
+    barrido termina en cuanto los hilos lo ven.
+    """
+    networks = list(dict.fromkeys(networks))
+    if not networks:
+        return
+    limiter = RateLimiter(rate)
+    chunks = [c for group in zip_longest(*(iter_chunks(n) for n in networks)) for c in group if c is not None]
+    started = time.monotonic()
+
+    def run(chunk):
+        _probe_chunk(chunk, limiter, stop)
+        if on_chunk and not (stop is not None and stop.is_set()):
+            on_chunk(chunk)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))), thread_name_prefix="sweep") as pool:
+        list(pool.map(run, chunks))
+    if stop is None or not stop.is_set():
+        (stop or threading.Event()).wait(SETTLE_TIME)
+    gui_log(f"Barrido de {', '.join(map(str, networks))} en {time.monotonic() - started:.1f}s", level="info")
+
+
+def sweep_interfaces(interfaces=None, **kwargs):
+    """Barre la red de cada interfaz indicada (por defecto, todas las activas)."""
+    if interfaces is None:
+        interfaces = list_interfaces()
+    sweep_networks([sweep_network_for(iface) for iface in interfaces], **kwargs)
@@ -1,88 +1,96 @@
-import os, re, socket, subprocess, threading, time
-from ..config.config import PROJECT_ROOT
+import ipaddress, re, subprocess, threading
 from ..utils.gui_utils import gui_log
+from .net_interfaces import default_interface
+from .net_scan import sweep_interfaces, sweep_networks
+
+ARP_POLL_INTERVAL = 0.15     # s entre lecturas de la tabla de vecinos durante un barrido
 
 def _get_local_ipv4_and_prefix():
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.settimeout(0.5)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip, 24
-    except Exception:
+    """IP y prefijo reales de la interfaz de la red local (sin depender de salida a Internet)."""
+    iface = default_interface()
+    if iface is None:
         return None, 24
-
-def _run_angryip_scan(range_start, range_end, export_file):
-    executables = ["ipscan", "ipscan.exe", "angryip", "angryip.exe"]
-    for exe in executables:
-        try:
-            cmd = [exe, "-f:range", range_start, range_end, "-o", export_file]
-            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=30, encoding="utf-8", errors="replace")
-            if proc.returncode == 0 or os.path.exists(export_file):
-                return True
-        except Exception:
-            continue
-    return False
+    return iface.ip, iface.prefix
 
 def _ping_sweep_cold(range_base):
-    threads = []
-    def p(ip):
-        try:
-            subprocess.run(["ping", "-n", "1", "-w", "200", ip],
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                           encoding="utf-8", errors="replace")
-        except Exception:
-            pass
+    """Puebla la tabla ARP barriendo el /24 de `range_base` ("a.b.c")."""
+    sweep_networks([ipaddress.ip_network(f"{range_base}.0/24")])
 
-    for i in range(1, 255):
-        ip = f"{range_base}.{i}"
-        t = threading.Thread(target=p, args=(ip,), daemon=True)
-        t.start()
-        threads.append(t)
-        if len(threads) % 50 == 0:
-            time.sleep(0.05)
-    for t in threads:
-        t.join(timeout=0.2)
+_IP_RE = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3})\b")
+_MAC_RE = re.compile(r"\b([0-9a-fA-F]{1,2}(?:[:-][0-9a-fA-F]{1,2}){5})\b")
 
-def find_ip_from_mac(mac):
+def normalize_mac(mac):
+    """MAC en formato aa-bb-cc-dd-ee-ff (acepta ':', '-', '.' y octetos sin cero inicial)."""
     if not mac:
-        return None
-
-    mac_norm = mac.lower().replace(":", "-").replace(".", "-").replace(" ", "-")
-    local_ip, _ = _get_local_ipv4_and_prefix()
-    if local_ip:
-        parts = local_ip.split(".")
-        if len(parts) >= 3:
-            base = ".".join(parts[0:3])
-            range_start = f"{base}.1"
-            range_end = f"{base}.254"
-            export_tmp = os.path.join(PROJECT_ROOT, "angry_scan_result.txt")
-            try:
-                ok = _run_angryip_scan(range_start, range_end, export_tmp)
-                if ok and os.path.exists(export_tmp):
-                    with open(export_tmp, "r", encoding="utf-8", errors="ignore") as f:
-                        data = f.read().lower()
-                        if mac_norm in data:
-                            for line in data.splitlines():
-                                if mac_norm in line:
-                                    parts = line.split()
-                                    if parts:
-                                        return parts[0]
-            except Exception:
-                pass
-            _ping_sweep_cold(base)
+        return ""
+    parts = re.split(r"[:\-. ]", mac.strip().lower())
+    if len(parts) == 6:
+        return "-".join(p.zfill(2) for p in parts)
+    return mac.strip().lower().replace(":", "-").replace(".", "-").replace(" ", "-")
 
+def read_arp_table():
+    """{mac_normalizada: ip} de la caché ARP (en Linux se lee /proc sin lanzar procesos)."""
+    table = {}
+    try:
+        with open("/proc/net/arp", "r") as f:
+            lines = f.read().splitlines()[1:]
+        for line in lines:
+            parts = line.split()
+            # flags 0x0 = entrada incompleta
+            if len(parts) >= 4 and parts[2] != "0x0" and parts[3] != "00:00:00:00:00:00":
+                table[normalize_mac(parts[3])] = parts[0]
+        return table
+    except OSError:
+        pass
     try:
         out = subprocess.getoutput("arp -a")
     except Exception as e:
         gui_log(f"No se pudo ejecutar arp -a: {e}", level="error")
-        return None
-
+        return table
     for line in out.splitlines():
-        low = line.lower()
-        if mac_norm in low or mac.lower().replace("-", ":") in low:
-            parts = line.split()
-            if parts and re.match(r"^\d{1,3}(\.\d{1,3}){3}$", parts[0]):
-                return parts[0]
-    return None
+        ip_match = _IP_RE.search(line)
+        mac_match = _MAC_RE.search(line)
+        if ip_match and mac_match:
+            table.setdefault(normalize_mac(mac_match.group(1)), ip_match.group(1))
+    return table
+
+def _sweep_until_found(wanted):
+    """
+    Barre las redes locales mientras un hilo relee la tabla de vecinos; el
+    barrido se corta en cuanto aparecen todas las MAC de `wanted`.
+    """
+    table = read_arp_table()
+    stop = threading.Event()
+
+    def watch():
+        while not stop.wait(ARP_POLL_INTERVAL):
+            table.update(read_arp_table())
+            if all(norm in table for norm in wanted):
+                stop.set()
+
+    watcher = threading.Thread(target=watch, daemon=True, name="arp-watch")
+    watcher.start()
+    try:
+        sweep_interfaces(stop=stop)
+    finally:
+        stop.set()
+        watcher.join()
+    table.update(read_arp_table())
+    return table
+
+def find_ips_from_macs(macs):
+    """
+    Resuelve varias MAC a la vez: primero la caché ARP y, solo si falta
+    alguna, un barrido de las redes de todas las interfaces que termina en
+    cuanto aparecen todas. Devuelve {mac_original: ip o None}.
+    """
+    wanted = {mac: normalize_mac(mac) for mac in macs if mac}
+    table = read_arp_table()
+    if any(norm not in table for norm in wanted.values()):
+        table = _sweep_until_found(set(wanted.values()))
+    return {mac: table.get(norm) for mac, norm in wanted.items()}
+
+def find_ip_from_mac(mac):
+    if not mac:
+        return None
+    return find_ips_from_macs([mac]).get(mac)
@@ -0,0 +1,136 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .adb_utils import _run_adb_command
+from .gui_utils import gui_log
+from .net_utils import find_ips_from_macs
+
+MAX_PARALLEL_CONNECTS = 16
+CONNECT_TIMEOUT = 8          # s por intento de `adb connect`
+CONNECT_RETRIES = 3          # intentos totales
+BACKOFF_BASE = 0.5           # s; se dobla en cada reintento y se le suma jitter
+
+_CONNECT_OK = ("connected to", "already connected")
+
+
+def profile_serial(perfil, ip):
+    return f"{ip}:{perfil.get('port', 5555)}"
+
+
+def resolve_profiles(profiles):
+    """
+    {nombre: perfil} -> {nombre: ip o None}. Las IP fijas se usan tal cual;
+    las MAC pendientes se resuelven juntas (una sola lectura ARP / un solo
+    barrido) en lugar de un escaneo por perfil.
+    """
+    ips = {name: perfil.get("ip") or None for name, perfil in profiles.items()}
+    pending = {name: perfil.get("mac") for name, perfil in profiles.items() if not ips[name] and perfil.get("mac")}
+    if pending:
+        found = find_ips_from_macs(pending.values())
+        for name, mac in pending.items():
+            ips[name] = found.get(mac)
+    return ips
+
+
+def adb_connect(serial, retries=CONNECT_RETRIES, backoff=BACKOFF_BASE):
+    """
+    `adb connect` con reintentos y espera exponencial con jitter.
+    Devuelve (ok, intentos, detalle).
+    """
+    detail = ""
+    for attempt in range(1, retries + 1):
+        proc = _run_adb_command(["connect", serial], timeout=CONNECT_TIMEOUT, log_command=False)
+        detail = ((proc.stdout + proc.stderr).strip() if proc else "sin respuesta") or "sin respuesta"
+        if proc is not None and any(token in detail.lower() for token in _CONNECT_OK):
+            return True, attempt, detail
+        if attempt < retries:
+            time.sleep(backoff * (2 ** (attempt - 1)) * (1 + random.random()))
+    return False, retries, detail
+
+
+def resolve_profile_serials(profiles, connect=False):
+    """
+    {nombre: perfil} -> {nombre: serial o None}. Con `connect` hace además
+    un `adb connect` (un intento, en paralelo) para que el serial esté listo.
+    """
+    ips = resolve_profiles(profiles)
+    serials = {name: profile_serial(profiles[name], ip) if ip else None for name, ip in ips.items()}
+    targets = [serial for serial in serials.values() if serial]
+    if connect and targets:
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL_CONNECTS, len(targets)))) as pool:
+            list(pool.map(lambda serial: adb_connect(serial, retries=1), targets))
+    return serials
+
+
+def run_shell_on_profiles(profiles, command, on_result=None, timeout=60, max_workers=MAX_PARALLEL_CONNECTS):
+    """
+    Ejecuta `adb shell <command>` en todos los perfiles a la vez. Llama
+    on_result(nombre, serial, ok, salida) por cada uno.
+    """
+    serials = resolve_profile_serials(profiles, connect=True)
+
+    def run(name, serial):
+        if not serial:
+            return name, None, False, f"No se encontró IP para {profiles[name].get('mac')}"
+        proc = _run_adb_command(["shell", command], timeout=timeout, log_command=False, serial=serial)
+        if proc is None:
+            return name, serial, False, "sin respuesta"
+        return name, serial, proc.returncode == 0, (proc.stdout + proc.stderr).strip()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(serials) or 1))) as pool:
+        futures = [pool.submit(run, name, serial) for name, serial in serials.items()]
+        for future in as_completed(futures):
+            if on_result:
+                on_result(*future.result())
+
+
+def adb_disconnect(serial):
+    proc = _run_adb_command(["disconnect", serial], timeout=CONNECT_TIMEOUT, log_command=False)
+    detail = ((proc.stdout + proc.stderr).strip() if proc else "sin respuesta") or "sin respuesta"
+    ok = proc is not None and proc.returncode == 0 and "error" not in detail.lower()
+    return ok, 1, detail
+
+
+def bulk_profiles_action(profiles, action="connect", on_result=None, max_workers=MAX_PARALLEL_CONNECTS):
+    """
+    Conecta o desconecta muchos perfiles en paralelo. Por cada perfil llama
+    on_result(nombre, ok, serial, segundos, intentos, detalle) y al final
+    devuelve {nombre: (ok, serial, segundos)}.
+    """
+    started = time.monotonic()
+    ips = resolve_profiles(profiles)
+    results = {}
+
+    def report(name, ok, serial, elapsed, attempts, detail):
+        results[name] = (ok, serial, elapsed)
+        if on_result:
+            on_result(name, ok, serial, elapsed, attempts, detail)
+
+    jobs = {}
+    for name, ip in ips.items():
+        if not ip:
+            report(name, False, None, 0.0, 0, f"No se encontró IP para {profiles[name].get('mac')}")
+            continue
+        jobs[name] = profile_serial(profiles[name], ip)
+
+    def run(name, serial):
+        start = time.monotonic()
+        if action == "connect":
+            ok, attempts, detail = adb_connect(serial)
+        else:
+            ok, attempts, detail = adb_disconnect(serial)
+        return name, serial, ok, time.monotonic() - start, attempts, detail
+
+    if jobs:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+            futures = [pool.submit(run, name, serial) for name, serial in jobs.items()]
+            for future in as_completed(futures):
+                name, serial, ok, elapsed, attempts, detail = future.result()
+                report(name, ok, serial, elapsed, attempts, detail)
+
+    ok_count = sum(1 for ok, _serial, _elapsed in results.values() if ok)
+    verb = "conectados" if action == "connect" else "desconectados"
+    gui_log(f"{ok_count}/{len(profiles)} perfiles {verb} en {time.monotonic() - started:.1f}s",
+            level="info" if ok_count == len(profiles) else "error")
+    return results
@@ -0,0 +1,196 @@
+import csv
+import ipaddress
+import json
+import os
+import re
+
+from .net_utils import normalize_mac
+
+DEFAULT_PORT = 5555
+IMPORT_BATCH = 500           # filas por transacción / por actualización de la lista
+MAX_REPORTED_ISSUES = 50     # incidencias que se detallan en el log
+
+# Nombres de columna aceptados (CSV o claves JSON) -> campo del perfil
+FIELD_ALIASES = {
+    "name": "name", "nombre": "name",
+    "mac": "mac", "mac_address": "mac",
+    "ip": "ip", "ip_address": "ip",
+    "port": "port", "puerto": "port",
+    "notes": "notes", "notas": "notes",
+    "color": "color",
+    "tags": "tags", "etiquetas": "tags", "group": "tags", "grupo": "tags",
+}
+
+_MAC_OK = re.compile(r"^[0-9a-f]{2}(-[0-9a-f]{2}){5}$")
+
+
+def iter_import_rows(path):
+    """
+    Recorre el inventario fila a fila sin cargarlo entero: CSV y JSON-lines
+    se leen en streaming. Un .json clásico ({nombre: perfil} o lista) se
+    carga completo. Produce (nº_línea, dict).
+    """
+    lower = str(path).lower()
+    if lower.endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+    elif lower.endswith((".jsonl", ".ndjson")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, {"__error__": f"JSON inválido: {e}"}
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            for i, (name, perfil) in enumerate(data.items(), start=1):
+                yield i, dict(perfil, name=name) if isinstance(perfil, dict) else {"__error__": "perfil no es un objeto"}
+        elif isinstance(data, list):
+            for i, row in enumerate(data, start=1):
+                yield i, row
+        else:
+            raise ValueError("El JSON debe ser un objeto {nombre: perfil} o una lista")
+
+
+def _split_tags(value):
+    if isinstance(value, list):
+        return [str(t).strip() for t in value if str(t).strip()]
+    return [t.strip() for t in re.split(r"[;|,]", str(value or "")) if t.strip()]
+
+
+def validate_row(raw):
+    """
+    dict de entrada -> (nombre, perfil). Lanza ValueError con el motivo.
+    La MAC se guarda tal como viene; se normaliza solo para comparar.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("la fila no es un objeto")
+    if "__error__" in raw:
+        raise ValueError(raw["__error__"])
+    row = {}
+    for key, value in raw.items():
+        field = FIELD_ALIASES.get(str(key).strip().lower())
+        if field:
+            row[field] = value.strip() if isinstance(value, str) else value
+        elif key not in (None, ""):
+            row[str(key)] = value
+    raw_mac = str(row.get("mac") or "")
+    mac = normalize_mac(raw_mac)
+    ip = str(row.get("ip") or "")
+    if mac and not _MAC_OK.match(mac):
+        raise ValueError(f"MAC inválida {row.get('mac')!r}")
+    if ip:
+        try:
+            ipaddress.IPv4Address(ip)
+        except ValueError:
+            raise ValueError(f"IP inválida {ip!r}")
+    if not mac and not ip:
+        raise ValueError("hace falta MAC o IP")
+    name = str(row.pop("name", "") or "").strip() or mac or ip
+    perfil = dict(row, mac=raw_mac, ip=ip)
+    # Puerto y etiquetas solo si la fila los trae: en una actualización no
+    # deben pisar los del perfil existente (el 5555 por defecto es para altas)
+    port = row.get("port")
+    if port in (None, ""):
+        perfil.pop("port", None)
+    else:
+        try:
+            port = int(port)
+        except (TypeError, ValueError):
+            raise ValueError(f"puerto inválido {port!r}")
+        if not 1 <= port <= 65535:
+            raise ValueError(f"puerto fuera de rango {port}")
+        perfil["port"] = port
+    tags = _split_tags(row["tags"]) if "tags" in row else []
+    if tags:
+        perfil["tags"] = tags
+    else:
+        perfil.pop("tags", None)
+    return name, perfil
+
+
+def import_profiles_stream(path, store, on_batch=None, update_existing=False, batch_size=IMPORT_BATCH):
+    """
+    Importa un inventario en lotes. Deduplica por MAC (dentro del archivo y
+    contra los perfiles existentes) y clasifica cada fila:
+      - nueva: se da de alta
+      - actualizada: mismo nombre y misma MAC, o misma MAC con update_existing
+        (se conservan los campos que la fila no trae)
+      - conflicto: MAC ya usada por otro perfil, o nombre ya usado con otra MAC
+      - inválida: no pasa la validación
+    on_batch(nombres_nuevos) se llama tras guardar cada lote. Devuelve
+    {"new", "updated", "conflicts", "invalid", "issues": [(línea, motivo)]}.
+    """
+    known_macs = store.macs_to_names()          # mac_norm -> nombre (una consulta)
+    known_names = set(store.names())
+    seen_macs = {}                              # mac_norm -> línea dentro del archivo
+    seen_names = {}                             # nombre -> línea dentro del archivo
+    result = {"new": 0, "updated": 0, "conflicts": 0, "invalid": 0, "issues": []}
+    batch, new_names = {}, []
+
+    def issue(line_no, kind, message):
+        result[kind] += 1
+        result["issues"].append((line_no, message))
+
+    def flush():
+        if batch:
+            store.upsert_many(batch.items())
+            if on_batch:
+                on_batch(list(new_names))
+            batch.clear()
+            new_names.clear()
+
+    for line_no, raw in iter_import_rows(path):
+        try:
+            name, perfil = validate_row(raw)
+        except ValueError as e:
+            issue(line_no, "invalid", f"fila inválida: {e}")
+            continue
+        mac = normalize_mac(perfil["mac"])
+        if mac:
+            if mac in seen_macs:
+                issue(line_no, "conflicts", f"MAC {mac} repetida (ya en la línea {seen_macs[mac]})")
+                continue
+            seen_macs[mac] = line_no
+            owner = known_macs.get(mac)
+            if owner and owner != name:
+                if not update_existing:
+                    issue(line_no, "conflicts", f"MAC {mac} ya pertenece al perfil '{owner}'")
+                    continue
+                name = owner
+        if name in seen_names:
+            issue(line_no, "conflicts", f"nombre '{name}' repetido (ya en la línea {seen_names[name]})")
+            continue
+        seen_names[name] = line_no
+        if name in known_names:
+            current = store.get(name) or {}
+            existing_mac = normalize_mac(current.get("mac") or "")
+            if existing_mac and mac and existing_mac != mac:
+                issue(line_no, "conflicts", f"el nombre '{name}' ya existe con otra MAC ({existing_mac})")
+                continue
+            # Solo se sobrescriben los campos que trae el archivo
+            perfil = dict(current, **{k: v for k, v in perfil.items() if v not in (None, "")})
+            result["updated"] += 1
+        else:
+            perfil.setdefault("port", DEFAULT_PORT)
+            result["new"] += 1
+            new_names.append(name)
+        batch[name] = perfil
+        if mac:
+            known_macs[mac] = name
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return result
+
+
+def format_import_summary(path, result):
+    return (f"Importación de {os.path.basename(str(path))}: {result['new']} nuevos, "
+            f"{result['updated']} actualizados, {result['conflicts']} conflictos, "
+            f"{result['invalid']} inválidos")
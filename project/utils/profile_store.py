@@ -0,0 +1,215 @@
+import json
+import os
+import sqlite3
+import threading
+
+from ..config.config import DEVICES, PROFILES_DB
+from .gui_utils import gui_log
+from .net_utils import normalize_mac
+
+# Campos con columna propia (indexables); el resto del perfil va en `extra` como JSON
+PROFILE_COLUMNS = ("mac", "ip", "port", "notes", "color")
+DEFAULT_PORT = 5555
+
+
+class ProfileStore:
+    """
+    Repositorio de perfiles en SQLite. Cada alta, edición o borrado es una
+    transacción propia (el journal WAL garantiza que un cierre a medias no
+    deja el archivo corrupto) y solo toca la fila afectada. Hay índices por
+    MAC, IP y etiqueta; la lista de nombres se lee sin cargar los perfiles.
+    """
+
+    def __init__(self, path=PROFILES_DB, legacy_json=DEVICES):
+        self.path = path
+        self._lock = threading.RLock()
+        is_new = not os.path.exists(path)
+        os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._create_schema()
+        if is_new and legacy_json and os.path.exists(legacy_json):
+            self._migrate_json(legacy_json)
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS profiles (
+                name TEXT PRIMARY KEY,
+                mac TEXT,
+                mac_norm TEXT,
+                ip TEXT,
+                port INTEGER,
+                notes TEXT,
+                color TEXT,
+                extra TEXT)""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS profile_tags (
+                name TEXT NOT NULL REFERENCES profiles(name) ON DELETE CASCADE ON UPDATE CASCADE,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (name, tag))""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS profiles_mac ON profiles (mac_norm)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS profiles_ip ON profiles (ip)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS profile_tags_tag ON profile_tags (tag)")
+
+    def _migrate_json(self, legacy_json):
+        try:
+            with open(legacy_json, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            gui_log(f"No se pudo migrar {legacy_json}: {e}", level="error")
+            return
+        if isinstance(data, dict):
+            self.upsert_many(data.items())
+            gui_log(f"{len(data)} perfil(es) migrados de devices.json a la base de datos", level="info")
+
+    # --- Conversión ---
+    @staticmethod
+    def _row_values(name, perfil):
+        extra = {k: v for k, v in perfil.items() if k not in PROFILE_COLUMNS and k not in ("name", "tags")}
+        port = perfil.get("port")
+        try:
+            port = int(port) if port not in (None, "") else DEFAULT_PORT
+        except (TypeError, ValueError):
+            port = DEFAULT_PORT
+        mac = perfil.get("mac") or ""
+        return (name, mac, normalize_mac(mac), perfil.get("ip") or "", port,
+                perfil.get("notes") or "", perfil.get("color") or "",
+                json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    def _row_to_profile(self, row):
+        name, mac, _mac_norm, ip, port, notes, color, extra = row
+        perfil = {"mac": mac, "port": port, "ip": ip, "notes": notes, "color": color}
+        if extra:
+            perfil.update(json.loads(extra))
+        perfil["tags"] = self.get_tags(name)
+        return perfil
+
+    _SELECT = "SELECT name, mac, mac_norm, ip, port, notes, color, extra FROM profiles"
+    _UPSERT = ("INSERT INTO profiles (name, mac, mac_norm, ip, port, notes, color, extra)"
+               " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+               " ON CONFLICT(name) DO UPDATE SET mac=excluded.mac, mac_norm=excluded.mac_norm,"
+               " ip=excluded.ip, port=excluded.port, notes=excluded.notes, color=excluded.color,"
+               " extra=excluded.extra")
+
+    # --- Lectura ---
+    def names(self, tag=None):
+        """Nombres en orden de alta (sin cargar el resto de campos)."""
+        with self._lock:
+            if tag:
+                rows = self._conn.execute(
+                    "SELECT p.name FROM profiles p JOIN profile_tags t ON t.name = p.name"
+                    " WHERE t.tag = ? ORDER BY p.rowid", (tag,)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT name FROM profiles ORDER BY rowid").fetchall()
+        return [r[0] for r in rows]
+
+    def get(self, name):
+        with self._lock:
+            row = self._conn.execute(self._SELECT + " WHERE name = ?", (name,)).fetchone()
+            return self._row_to_profile(row) if row else None
+
+    def __contains__(self, name):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM profiles WHERE name = ?", (name,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def all(self):
+        """{nombre: perfil} completo (para exportar)."""
+        with self._lock:
+            rows = self._conn.execute(self._SELECT + " ORDER BY rowid").fetchall()
+            return {row[0]: self._row_to_profile(row) for row in rows}
+
+    def find_by_mac(self, mac):
+        """Nombre del perfil con esa MAC (en cualquier formato) o None."""
+        norm = normalize_mac(mac)
+        if not norm:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT name FROM profiles WHERE mac_norm = ? LIMIT 1", (norm,)).fetchone()
+        return row[0] if row else None
+
+    def macs_to_names(self):
+        """{mac_normalizada: nombre} de todos los perfiles, para cruzar con un escaneo de red."""
+        with self._lock:
+            rows = self._conn.execute("SELECT mac_norm, name FROM profiles WHERE mac_norm != ''").fetchall()
+        return dict(rows)
+
+    def names_with_flag(self, key):
+        """Perfiles con `key` verdadero entre sus campos extra (p. ej. "watch")."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM profiles WHERE extra IS NOT NULL AND json_extract(extra, ?) ORDER BY rowid",
+                (f"$.{key}",)).fetchall()
+        return [r[0] for r in rows]
+
+    def get_tags(self, name):
+        with self._lock:
+            rows = self._conn.execute("SELECT tag FROM profile_tags WHERE name = ? ORDER BY tag", (name,)).fetchall()
+        return [r[0] for r in rows]
+
+    def all_tags(self):
+        """{etiqueta: nº de perfiles}."""
+        with self._lock:
+            rows = self._conn.execute("SELECT tag, COUNT(*) FROM profile_tags GROUP BY tag ORDER BY tag").fetchall()
+        return dict(rows)
+
+    # --- Escritura ---
+    def _write_tags(self, name, tags):
+        self._conn.execute("DELETE FROM profile_tags WHERE name = ?", (name,))
+        clean = sorted({t.strip() for t in tags or [] if t and t.strip()})
+        self._conn.executemany("INSERT INTO profile_tags (name, tag) VALUES (?, ?)", [(name, t) for t in clean])
+
+    def upsert(self, name, perfil):
+        with self._lock, self._conn:
+            self._conn.execute(self._UPSERT, self._row_values(name, perfil))
+            if "tags" in perfil:
+                self._write_tags(name, perfil["tags"])
+
+    def upsert_many(self, items):
+        """Alta masiva de (nombre, perfil) en una sola transacción."""
+        count = 0
+        with self._lock, self._conn:
+            for name, perfil in items:
+                self._conn.execute(self._UPSERT, self._row_values(name, perfil))
+                if "tags" in perfil:
+                    self._write_tags(name, perfil["tags"])
+                count += 1
+        return count
+
+    def update(self, name, **fields):
+        """Modifica solo los campos indicados. Devuelve False si el perfil no existe."""
+        with self._lock, self._conn:
+            row = self._conn.execute(self._SELECT + " WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return False
+            perfil = self._row_to_profile(row)
+            perfil.update(fields)
+            self._conn.execute(self._UPSERT, self._row_values(name, perfil))
+            if "tags" in fields:
+                self._write_tags(name, fields["tags"])
+        return True
+
+    def delete(self, name):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM profiles WHERE name = ?", (name,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """Instancia compartida por las pestañas de Perfiles y Red (se abre al primer uso)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore()
+        return _store
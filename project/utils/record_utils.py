@@ -0,0 +1,168 @@
+import threading
+import time
+from datetime import datetime
+
+from ..config.config import PROJECT_ROOT
+from .adb_utils import popen_adb
+from .gui_utils import gui_log
+
+RECORD_DIR = PROJECT_ROOT / "recordings"
+SEGMENT_LIMIT = 180          # límite de screenrecord por invocación (s)
+COPY_CHUNK = 64 * 1024
+MIN_SEGMENT_S = 1.0          # un segmento más corto que esto se considera fallo
+
+_recorders = {}              # serial (o "") -> ScreenRecorder
+_lock = threading.Lock()
+
+
+class ScreenRecorder:
+    """
+    Graba la pantalla de un dispositivo en archivos H.264 del host.
+    `screenrecord` escribe en stdout y adb lo trae por exec-out, así que no se
+    usa almacenamiento del dispositivo ni hay pull al final. Al llegar al
+    límite de tiempo se encadena otro segmento en su propio archivo
+    (<nombre>_partNN.h264) y se apunta en el índice <nombre>.txt cuándo
+    empezó y cuánto duró: el H.264 crudo no lleva marcas de tiempo, así que
+    ni la velocidad de reproducción (screenrecord solo emite frames cuando
+    cambia la pantalla) ni el hueco entre segmentos se pueden deducir del
+    propio vídeo.
+    """
+
+    def __init__(self, serial, path, bitrate=None, size=None):
+        self.serial = serial
+        self.path = path
+        self.bitrate = bitrate
+        self.size = size
+        self.segments = 0
+        self.files = []
+        self.bytes_written = 0
+        self.started_at = None
+        self._proc = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _command(self):
+        args = ["exec-out", "screenrecord", "--output-format=h264", "--time-limit", str(SEGMENT_LIMIT)]
+        if self.bitrate:
+            args += ["--bit-rate", str(self.bitrate)]
+        if self.size:
+            args += ["--size", self.size]
+        return args + ["-"]
+
+    @property
+    def index_path(self):
+        return self.path.with_suffix(".txt")
+
+    def segment_path(self, number):
+        return self.path.with_name(f"{self.path.stem}_part{number:02d}{self.path.suffix}")
+
+    def _write_index(self, number, wall_start, offset, duration, size):
+        with open(self.index_path, "a", encoding="utf-8") as index:
+            if number == 1:
+                index.write("# segmento\tinicio\tdesde_inicio_s\tduracion_s\tbytes\n")
+            index.write(f"{self.segment_path(number).name}\t{wall_start.isoformat(timespec='milliseconds')}"
+                        f"\t{offset:.3f}\t{duration:.3f}\t{size}\n")
+
+    def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        label = self.serial or "dispositivo"
+        while not self._stop.is_set():
+            seg_start = time.monotonic()
+            wall_start = datetime.now()
+            proc = popen_adb(self._command(), serial=self.serial, binary=True)
+            if proc is None:
+                break
+            self._proc = proc
+            self.segments += 1
+            seg_path = self.segment_path(self.segments)
+            seg_bytes = 0
+            with open(seg_path, "wb") as out:
+                while True:
+                    chunk = proc.stdout.read(COPY_CHUNK)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    seg_bytes += len(chunk)
+            proc.wait()
+            self._proc = None
+            self.bytes_written += seg_bytes
+            duration = time.monotonic() - seg_start
+            if seg_bytes:
+                self.files.append(seg_path)
+                self._write_index(self.segments, wall_start, seg_start - self.started_at, duration, seg_bytes)
+            else:
+                seg_path.unlink(missing_ok=True)
+            if self._stop.is_set():
+                break
+            if duration < MIN_SEGMENT_S:
+                gui_log(f"screenrecord terminó inesperadamente en {label} (código {proc.returncode})", level="error")
+                break
+            gui_log(f"Grabación {label}: segmento {self.segments} completado, encadenando", level="info")
+        with _lock:
+            if _recorders.get(self.serial or "") is self:
+                _recorders.pop(self.serial or "", None)
+        gui_log(f"Grabación {label} guardada: {len(self.files)} segmento(s), índice en {self.index_path} "
+                f"({self.bytes_written // 1024} KB)", level="info")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        proc = self._proc
+        if proc and proc.poll() is None:
+            try:
+                proc.terminate()
+                proc.wait(timeout=timeout)
+            except Exception:
+                try:
+                    proc.kill()
+                except Exception:
+                    pass
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+def recording_path(serial=None, directory=RECORD_DIR):
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_serial = (serial or "").replace(":", "_").replace("/", "_")
+    name = f"record_{safe_serial}_{stamp}.h264" if safe_serial else f"record_{stamp}.h264"
+    return directory / name
+
+
+def start_recording(serial=None, bitrate=None, size=None, path=None):
+    """Inicia una grabación para `serial` (None = dispositivo por defecto). Devuelve el grabador o None."""
+    key = serial or ""
+    with _lock:
+        current = _recorders.get(key)
+        if current and current.is_running():
+            gui_log(f"Ya hay una grabación en curso para {serial or 'el dispositivo'}", level="error")
+            return None
+        recorder = ScreenRecorder(serial, path or recording_path(serial), bitrate=bitrate, size=size)
+        _recorders[key] = recorder
+    recorder.start()
+    gui_log(f"Grabando {serial or 'dispositivo'} en {recorder.segment_path(1).name}... "
+            f"(índice {recorder.index_path})", level="info")
+    return recorder
+
+
+def stop_recording(serial=None):
+    """Detiene la grabación de `serial`; sin serial detiene todas. Devuelve los índices."""
+    with _lock:
+        if serial is None:
+            recorders = list(_recorders.values())
+        else:
+            recorders = [r for r in [_recorders.get(serial)] if r]
+    for recorder in recorders:
+        recorder.stop()
+    return [r.index_path for r in recorders]
+
+
+def active_recordings():
+    with _lock:
+        return {key: r for key, r in _recorders.items() if r.is_running()}
@@ -0,0 +1,405 @@
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from ..config.config import CONFIG_DIR
+from .adb_utils import list_device_serials, run_in_thread
+from .batch_runner import run_batch_parallel
+from .gui_utils import gui_log
+from .profile_connect import resolve_profile_serials
+from .profile_store import get_profile_store
+
+SCHEDULER_DB = CONFIG_DIR / "scheduler.db"
+MAX_OUTPUT_CHARS = 64 * 1024     # salida guardada por ejecución
+STATS_WINDOW = 200               # ejecuciones recientes usadas para p50/p95
+KEEP_RUNS_PER_PAIR = 1000        # historial máximo por (script, serial)
+KEEP_RUNS_DAYS = 30              # y antigüedad máxima
+PRUNE_EVERY = 100                # se poda tras este número de ejecuciones guardadas
+
+TARGET_DEFAULT = "default"       # dispositivo por defecto (sin ANDROID_SERIAL)
+TARGET_ALL = "all"               # todos los conectados en el momento de lanzar
+TARGET_TAG_PREFIX = "tag:"       # "tag:planta1" -> perfiles con esa etiqueta
+
+
+# =========================
+# Programaciones
+# =========================
+# Formatos aceptados:
+#   "every 30s" / "every 5m" / "every 2h"   -> intervalo fijo
+#   "*/5 * * * *"                           -> cron de 5 campos (min hora día mes díasemana)
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_CRON_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _parse_cron_field(text, low, high):
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError("el paso debe ser > 0")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"{part} fuera de rango {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_schedule(text):
+    """
+    Devuelve ("interval", segundos) o ("cron", [minutos, horas, días, meses,
+    díassemana, día_restringido, díasemana_restringido]). Lanza ValueError.
+    """
+    text = (text or "").strip().lower()
+    if text.startswith("every "):
+        value = text[6:].strip()
+        unit = value[-1] if value and value[-1] in _UNITS else "s"
+        number = value[:-1] if value and value[-1] in _UNITS else value
+        try:
+            seconds = float(number) * _UNITS[unit]
+        except ValueError:
+            raise ValueError(f"Intervalo inválido: {text!r}")
+        if seconds < 1:
+            raise ValueError("El intervalo mínimo es 1s")
+        return "interval", seconds
+    fields = text.split()
+    if len(fields) != 5:
+        raise ValueError(f"Programación inválida: {text!r} (usa 'every 5m' o cron de 5 campos)")
+    try:
+        parsed = [_parse_cron_field(f, lo, hi) for f, (lo, hi) in zip(fields, _CRON_RANGES)]
+    except ValueError as e:
+        raise ValueError(f"Cron inválido {text!r}: {e}")
+    if 7 in parsed[4]:
+        parsed[4].add(0)
+    # Solo el "*" literal deja el campo sin restringir; "*/2" sí restringe
+    dom_restricted = fields[2] != "*"
+    dow_restricted = fields[4] != "*"
+    return "cron", parsed + [dom_restricted, dow_restricted]
+
+
+def _cron_day_matches(spec, dt):
+    minutes, hours, days, months, weekdays, dom_set, dow_set = spec
+    dom = dt.day in days
+    dow = (dt.weekday() + 1) % 7 in weekdays
+    # Como en cron: si se restringen día del mes y de la semana vale cualquiera de los dos
+    if dom_set and dow_set:
+        return dom or dow
+    return dom and dow
+
+
+def next_run_time(schedule, after):
+    """Siguiente instante (timestamp) estrictamente posterior a `after`."""
+    kind, spec = schedule
+    if kind == "interval":
+        return after + spec
+    minutes, hours, months = spec[0], spec[1], spec[3]
+    dt = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = dt + timedelta(days=366 * 5)
+    while dt < limit:
+        if dt.month not in months or not _cron_day_matches(spec, dt):
+            dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+        elif dt.hour not in hours:
+            dt = (dt + timedelta(hours=1)).replace(minute=0)
+        elif dt.minute not in minutes:
+            dt += timedelta(minutes=1)
+        else:
+            return dt.timestamp()
+    raise ValueError("La programación cron no tiene ninguna fecha válida")
+
+
+# =========================
+# Historial (SQLite)
+# =========================
+_db_lock = threading.Lock()
+
+
+def _connect():
+    SCHEDULER_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(SCHEDULER_DB), timeout=10)
+    conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        script TEXT NOT NULL,
+        schedule TEXT NOT NULL,
+        target TEXT NOT NULL,
+        timeout REAL,
+        enabled INTEGER NOT NULL DEFAULT 1)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id INTEGER,
+        script TEXT NOT NULL,
+        serial TEXT,
+        started REAL NOT NULL,
+        duration REAL,
+        exit_code INTEGER,
+        reason TEXT,
+        output TEXT)""")
+    conn.execute("CREATE INDEX IF NOT EXISTS runs_script ON runs (script, started)")
+    conn.execute("CREATE INDEX IF NOT EXISTS runs_pair ON runs (script, serial, started)")
+    return conn
+
+
+def _db(fn):
+    with _db_lock:
+        conn = _connect()
+        try:
+            with conn:
+                return fn(conn)
+        finally:
+            conn.close()
+
+
+_recorded = [0]
+
+
+def record_run(job_id, script, serial, started, duration, exit_code, reason, output):
+    output = output[-MAX_OUTPUT_CHARS:]
+    _db(lambda c: c.execute(
+        "INSERT INTO runs (job_id, script, serial, started, duration, exit_code, reason, output)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (job_id, script, serial, started, duration, exit_code, reason, output)))
+    with _db_lock:
+        _recorded[0] += 1
+        due = _recorded[0] % PRUNE_EVERY == 0
+    if due:
+        prune_runs()
+
+
+def prune_runs(keep_per_pair=KEEP_RUNS_PER_PAIR, keep_days=KEEP_RUNS_DAYS):
+    """Borra ejecuciones más antiguas que `keep_days` o más allá de las últimas `keep_per_pair` de cada par."""
+    cutoff = time.time() - keep_days * 86400
+
+    def prune(conn):
+        deleted = conn.execute("DELETE FROM runs WHERE started < ?", (cutoff,)).rowcount
+        deleted += conn.execute(
+            "DELETE FROM runs WHERE id IN (SELECT id FROM ("
+            " SELECT id, ROW_NUMBER() OVER (PARTITION BY script, serial ORDER BY started DESC) AS rn"
+            " FROM runs) WHERE rn > ?)", (keep_per_pair,)).rowcount
+        return deleted
+    return _db(prune)
+
+
+def recent_runs(script=None, limit=100):
+    query = "SELECT script, serial, started, duration, exit_code, reason, output FROM runs"
+    args = ()
+    if script:
+        query += " WHERE script = ?"
+        args = (script,)
+    query += " ORDER BY started DESC LIMIT ?"
+    return _db(lambda c: c.execute(query, args + (limit,)).fetchall())
+
+
+def percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def duration_stats(window=STATS_WINDOW):
+    """
+    p50/p95 de duración por (script, serial) sobre las últimas `window`
+    ejecuciones terminadas de cada par. Devuelve una lista de dicts.
+    """
+    # Solo las `window` filas más recientes de cada par y sin la columna de salida
+    rows = _db(lambda c: c.execute(
+        "SELECT script, serial, duration, exit_code, reason, started FROM ("
+        " SELECT script, serial, duration, exit_code, reason, started,"
+        " ROW_NUMBER() OVER (PARTITION BY script, serial ORDER BY started DESC) AS rn"
+        " FROM runs WHERE duration IS NOT NULL) WHERE rn <= ? ORDER BY started DESC",
+        (window,)).fetchall())
+    groups = {}
+    for script, serial, duration, code, reason, started in rows:
+        group = groups.setdefault((script, serial or ""), {"durations": [], "ok": 0, "last": started})
+        group["durations"].append(duration)
+        if code == 0 and not reason:
+            group["ok"] += 1
+    stats = []
+    for (script, serial), group in sorted(groups.items()):
+        durations = sorted(group["durations"])
+        stats.append({
+            "script": script,
+            "serial": serial,
+            "runs": len(durations),
+            "ok": group["ok"],
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "last": group["last"],
+        })
+    return stats
+
+
+# =========================
+# Trabajos
+# =========================
+def list_jobs():
+    rows = _db(lambda c: c.execute(
+        "SELECT id, name, script, schedule, target, timeout, enabled FROM jobs ORDER BY id").fetchall())
+    return [{"id": r[0], "name": r[1], "script": r[2], "schedule": r[3], "target": r[4],
+             "timeout": r[5], "enabled": bool(r[6])} for r in rows]
+
+
+def add_job(name, script, schedule, target=TARGET_DEFAULT, timeout=None):
+    parse_schedule(schedule)
+    job_id = _db(lambda c: c.execute(
+        "INSERT INTO jobs (name, script, schedule, target, timeout) VALUES (?, ?, ?, ?, ?)",
+        (name, script, schedule, target, timeout)).lastrowid)
+    scheduler.reload()
+    return job_id
+
+
+def remove_job(job_id):
+    _db(lambda c: c.execute("DELETE FROM jobs WHERE id = ?", (job_id,)))
+    scheduler.reload()
+
+
+def set_job_enabled(job_id, enabled):
+    _db(lambda c: c.execute("UPDATE jobs SET enabled = ? WHERE id = ?", (1 if enabled else 0, job_id)))
+    scheduler.reload()
+
+
+def resolve_target(target):
+    """
+    Seriales sobre los que lanzar: todos, el por defecto, los perfiles de una
+    etiqueta ("tag:nombre") o una lista separada por comas.
+    """
+    if target == TARGET_ALL:
+        return list_device_serials()
+    if target and target.startswith(TARGET_TAG_PREFIX):
+        store = get_profile_store()
+        names = store.names(target[len(TARGET_TAG_PREFIX):])
+        serials = resolve_profile_serials({name: store.get(name) for name in names}, connect=True)
+        return [serial for serial in serials.values() if serial]
+    if target in (TARGET_DEFAULT, "", None):
+        return [None]
+    return [s.strip() for s in target.split(",") if s.strip()]
+
+
+class JobScheduler:
+    """
+    Un único hilo con un heap de (próxima_ejecución, job_id). Duerme hasta
+    el siguiente vencimiento (o hasta que cambien los trabajos) y delega
+    cada lanzamiento en otro hilo (resolver un "tag:" puede barrer la red),
+    así el hilo del heap solo lleva los tiempos. Un trabajo que sigue en
+    marcha no se solapa consigo mismo: esa vuelta se salta.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._heap = []
+        self._running = {}       # job_id -> BatchJob
+        self._starting = set()   # job_id resolviendo destino / lanzándose
+        self._next = {}          # job_id -> timestamp
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="scheduler")
+            self._thread.start()
+            run_in_thread(prune_runs)
+        self.reload()
+
+    def reload(self):
+        now = time.time()
+        with self._lock:
+            self._jobs = {job["id"]: job for job in list_jobs() if job["enabled"]}
+            self._heap = []
+            for job_id, job in self._jobs.items():
+                try:
+                    due = self._next.get(job_id) or next_run_time(parse_schedule(job["schedule"]), now)
+                except ValueError as e:
+                    gui_log(f"Trabajo '{job['name']}' ignorado: {e}", level="error")
+                    continue
+                self._next[job_id] = due
+                heapq.heappush(self._heap, (due, job_id))
+            self._next = {job_id: due for job_id, due in self._next.items() if job_id in self._jobs}
+        self._wake.set()
+
+    def next_run(self, job_id):
+        return self._next.get(job_id)
+
+    def is_running(self, job_id):
+        job = self._running.get(job_id)
+        return job is not None and job.is_running()
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                due, job_id = self._heap[0] if self._heap else (None, None)
+            timeout = None if due is None else max(0.0, due - time.time())
+            if self._wake.wait(timeout):
+                self._wake.clear()
+                continue
+            with self._lock:
+                if not self._heap or self._heap[0] != (due, job_id):
+                    continue
+                heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                upcoming = next_run_time(parse_schedule(job["schedule"]), max(due, time.time()))
+                self._next[job_id] = upcoming
+                heapq.heappush(self._heap, (upcoming, job_id))
+            run_in_thread(self.run_now, job)
+
+    def run_now(self, job):
+        with self._lock:
+            if job["id"] in self._starting or self.is_running(job["id"]):
+                gui_log(f"Trabajo '{job['name']}' todavía en ejecución; se salta esta vuelta", level="error")
+                return None
+            self._starting.add(job["id"])
+        try:
+            return self._launch(job)
+        finally:
+            with self._lock:
+                self._starting.discard(job["id"])
+
+    def _launch(self, job):
+        path = job["script"]
+        if not os.path.exists(path):
+            gui_log(f"Trabajo '{job['name']}': no existe {path}", level="error")
+            return None
+        serials = resolve_target(job["target"])
+        if not serials:
+            gui_log(f"Trabajo '{job['name']}': no hay dispositivos", level="error")
+            return None
+        script = os.path.basename(path)
+        outputs = {}
+        started = time.time()
+
+        def on_line(serial, stream, line):
+            outputs.setdefault(serial, []).append(line if stream == "stdout" else f"[stderr] {line}")
+
+        def on_done(serial, code, elapsed, reason):
+            record_run(job["id"], script, serial, started, elapsed, code, reason,
+                       "\n".join(outputs.pop(serial, [])))
+            ok = code == 0 and not reason
+            gui_log(f"⏱ {job['name']} ({serial or 'dispositivo'}): "
+                    f"{'OK' if ok else reason or f'código {code}'} en {elapsed:.1f}s",
+                    level="info" if ok else "error")
+
+        gui_log(f"⏱ Lanzando trabajo '{job['name']}' en {len(serials)} dispositivo(s)", level="cmd")
+        batch_job = run_batch_parallel(path, serials, timeout=job["timeout"], on_line=on_line, on_done=on_done)
+        self._running[job["id"]] = batch_job
+        return batch_job
+
+    def stop_all(self):
+        for batch_job in list(self._running.values()):
+            batch_job.cancel()
+
+
+scheduler = JobScheduler()
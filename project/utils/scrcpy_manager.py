@@ -0,0 +1,217 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+
+from ..config.config import TOOLS_DIR
+from .gui_utils import gui_log
+
+# psutil es opcional; sin él se lee /proc en Linux y en Windows no hay métricas
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SCRCPY_DEFAULTS = {"bitrate": "8M", "max_size": 1280, "max_fps": 60, "codec": "h264"}
+MAX_RESTARTS = 3             # reinicios permitidos dentro de RESTART_WINDOW
+RESTART_WINDOW = 60.0
+RESTART_BACKOFF = 2.0
+OUTPUT_LINES = 200
+
+_sessions = {}               # serial (o "") -> ScrcpySession
+_lock = threading.Lock()
+
+
+def scrcpy_executable():
+    found = shutil.which("scrcpy")
+    if found:
+        return found
+    name = "scrcpy.exe" if os.name == "nt" else "scrcpy"
+    return str(TOOLS_DIR / name)
+
+
+def build_scrcpy_args(serial=None, options=None):
+    """Línea de comandos de scrcpy (opciones de scrcpy 2.x/3.x) para un perfil."""
+    opts = dict(SCRCPY_DEFAULTS)
+    opts.update({k: v for k, v in (options or {}).items() if v not in (None, "")})
+    args = [scrcpy_executable()]
+    if serial:
+        args += ["-s", serial]
+    if opts.get("bitrate"):
+        args += ["--video-bit-rate", str(opts["bitrate"])]
+    if opts.get("max_size"):
+        args += ["--max-size", str(opts["max_size"])]
+    if opts.get("max_fps"):
+        args += ["--max-fps", str(opts["max_fps"])]
+    if opts.get("codec"):
+        args += ["--video-codec", str(opts["codec"])]
+    if serial:
+        args += ["--window-title", f"scrcpy - {serial}"]
+    return args
+
+
+def _proc_usage(pid):
+    """(cpu_segundos, rss_bytes) del proceso o (None, None)."""
+    if psutil is not None:
+        try:
+            p = psutil.Process(pid)
+            times = p.cpu_times()
+            return times.user + times.system, p.memory_info().rss
+        except Exception:
+            return None, None
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu, rss
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None, None
+
+
+class ScrcpySession:
+    """
+    Un scrcpy por serial. La salida se drena en un hilo (una tubería llena
+    bloquea al hijo) y se guarda en un buffer circular; si el proceso muere
+    sin que se haya pedido, se reinicia con espera creciente.
+    """
+
+    def __init__(self, serial=None, options=None):
+        self.serial = serial
+        self.options = dict(options or {})
+        self.restarts = []
+        self.output = deque(maxlen=OUTPUT_LINES)
+        self.started_at = None
+        self.proc = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def label(self):
+        return self.serial or "dispositivo"
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _spawn(self):
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        return subprocess.Popen(
+            build_scrcpy_args(self.serial, self.options),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            cwd=str(TOOLS_DIR),
+            **kwargs,
+        )
+
+    def _run(self):
+        backoff = RESTART_BACKOFF
+        while not self._stop.is_set():
+            try:
+                self.proc = self._spawn()
+            except Exception as e:
+                gui_log(f"No se pudo iniciar scrcpy ({self.label}): {e}", level="error")
+                break
+            gui_log(f"scrcpy iniciado ({self.label}, pid {self.proc.pid})", level="info")
+            for line in self.proc.stdout:
+                line = line.rstrip()
+                if line:
+                    self.output.append(line)
+                    if "ERROR" in line:
+                        gui_log(f"[scrcpy {self.label}] {line}", level="error")
+            code = self.proc.wait()
+            if self._stop.is_set():
+                break
+            # Cerrar la ventana de scrcpy sale con 0: no es un fallo
+            if code == 0:
+                gui_log(f"scrcpy cerrado ({self.label})", level="info")
+                break
+            now = time.monotonic()
+            self.restarts = [t for t in self.restarts if now - t < RESTART_WINDOW] + [now]
+            if len(self.restarts) > MAX_RESTARTS:
+                gui_log(f"scrcpy ({self.label}) falló demasiadas veces; no se reinicia", level="error")
+                break
+            gui_log(f"scrcpy ({self.label}) terminó con código {code}; reiniciando en {backoff:.0f}s", level="error")
+            if self._stop.wait(backoff):
+                break
+            backoff *= 2
+        with _lock:
+            if _sessions.get(self.serial or "") is self:
+                _sessions.pop(self.serial or "", None)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        proc = self.proc
+        if proc and proc.poll() is None:
+            try:
+                proc.terminate()
+                proc.wait(timeout=timeout)
+            except Exception:
+                try:
+                    proc.kill()
+                except Exception:
+                    pass
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        """Uptime, reinicios, pid, CPU media y memoria residente."""
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        pid = self.proc.pid if self.proc and self.proc.poll() is None else None
+        cpu, rss = _proc_usage(pid) if pid else (None, None)
+        return {
+            "serial": self.label,
+            "pid": pid,
+            "uptime": uptime,
+            "restarts": len(self.restarts),
+            "cpu_percent": (cpu / uptime * 100) if cpu is not None and uptime > 0 else None,
+            "rss_mb": rss / (1024 * 1024) if rss is not None else None,
+        }
+
+
+def start_session(serial=None, options=None):
+    key = serial or ""
+    with _lock:
+        current = _sessions.get(key)
+        if current and current.is_running():
+            gui_log(f"scrcpy ya está en ejecución para {current.label}", level="error")
+            return None
+        session = ScrcpySession(serial, options)
+        _sessions[key] = session
+    session.start()
+    return session
+
+
+def stop_session(serial=None):
+    """Detiene la sesión de `serial`; sin serial detiene todas."""
+    with _lock:
+        if serial is None:
+            sessions = list(_sessions.values())
+        else:
+            sessions = [s for s in [_sessions.get(serial)] if s]
+    for session in sessions:
+        session.stop()
+    return len(sessions)
+
+
+def list_sessions():
+    with _lock:
+        return [s for s in _sessions.values() if s.is_running()]
+
+
+def format_session_stats(stats):
+    cpu = f"{stats['cpu_percent']:.1f}%" if stats["cpu_percent"] is not None else "n/d"
+    rss = f"{stats['rss_mb']:.0f} MB" if stats["rss_mb"] is not None else "n/d"
+    return (f"{stats['serial']}: pid {stats['pid'] or '-'}, {int(stats['uptime'])}s, "
+            f"CPU {cpu}, RAM {rss}, reinicios {stats['restarts']}")
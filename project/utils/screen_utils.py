@@ -0,0 +1,196 @@
+import io
+import struct
+import time
+import zlib
+from datetime import datetime
+
+from ..config.config import PROJECT_ROOT
+from .adb_utils import run_adb_binary
+
+# Pillow es opcional: solo hace falta para reducir PNG
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SCREENSHOT_DIR = PROJECT_ROOT / "screenshots"
+CAPTURE_TIMEOUT = 10
+PNG_COMPRESS_LEVEL = 1
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Formatos de android.graphics.PixelFormat con 4 bytes por píxel
+PIXEL_FORMAT_RGBA_8888 = 1
+PIXEL_FORMAT_RGBX_8888 = 2
+PIXEL_FORMAT_BGRA_8888 = 5
+RAW_FORMATS_4BPP = (PIXEL_FORMAT_RGBA_8888, PIXEL_FORMAT_RGBX_8888, PIXEL_FORMAT_BGRA_8888)
+
+
+# =========================
+# Captura (exec-out, sin archivo en el dispositivo)
+# =========================
+def capture_png(serial=None):
+    """PNG de la pantalla directamente por exec-out (sin pasar por /sdcard)."""
+    data = run_adb_binary(["exec-out", "screencap", "-p"], serial=serial, timeout=CAPTURE_TIMEOUT)
+    if not data or not data.startswith(PNG_SIGNATURE):
+        return None
+    return data
+
+
+def parse_raw_screencap(data):
+    """
+    Salida de `screencap` sin -p: cabecera little-endian (ancho, alto, formato
+    y, desde Android 8, espacio de color) seguida de los píxeles. Solo se
+    aceptan formatos de 4 bytes por píxel (RGBA/RGBX, y BGRA que se reordena).
+    Devuelve (ancho, alto, rgba) o None si el formato no es ninguno de ellos.
+    """
+    if not data or len(data) < 12:
+        return None
+    width, height, fmt = struct.unpack("<III", data[:12])
+    if fmt not in RAW_FORMATS_4BPP:
+        return None
+    expected = width * height * 4
+    for header in (16, 12):
+        if len(data) - header == expected:
+            pixels = data[header:]
+            if fmt == PIXEL_FORMAT_BGRA_8888:
+                swapped = bytearray(pixels)
+                swapped[0::4] = pixels[2::4]
+                swapped[2::4] = pixels[0::4]
+                pixels = bytes(swapped)
+            return width, height, pixels
+    return None
+
+
+def capture_raw(serial=None):
+    """Frame RGBA sin comprimir: el dispositivo no pierde tiempo codificando PNG."""
+    data = run_adb_binary(["exec-out", "screencap"], serial=serial, timeout=CAPTURE_TIMEOUT)
+    return parse_raw_screencap(data)
+
+
+def encode_png(width, height, rgba, level=PNG_COMPRESS_LEVEL):
+    """Codifica RGBA a PNG en local (filtro 0 por fila, zlib rápido)."""
+    stride = width * 4
+    rows = bytearray()
+    for y in range(height):
+        rows.append(0)
+        rows += rgba[y * stride:(y + 1) * stride]
+
+    def chunk(tag, body):
+        return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body) & 0xFFFFFFFF)
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (PNG_SIGNATURE + chunk(b"IHDR", ihdr)
+            + chunk(b"IDAT", zlib.compress(bytes(rows), level)) + chunk(b"IEND", b""))
+
+
+def capture_screen(serial=None, raw=False):
+    """PNG en memoria; con raw=True se pide el frame crudo y se codifica aquí."""
+    if not raw:
+        return capture_png(serial)
+    frame = capture_raw(serial)
+    if frame is None:
+        # Formato de píxel no soportado: se pide el PNG al dispositivo
+        return capture_png(serial)
+    return encode_png(*frame)
+
+
+# =========================
+# Guardado
+# =========================
+def screenshot_path(serial=None, directory=SCREENSHOT_DIR, prefix="screenshot"):
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    safe_serial = (serial or "").replace(":", "_").replace("/", "_")
+    name = f"{prefix}_{safe_serial}_{stamp}.png" if safe_serial else f"{prefix}_{stamp}.png"
+    return directory / name
+
+
+def take_screenshot(serial=None, raw=False, directory=SCREENSHOT_DIR):
+    """Captura y guarda con marca de tiempo. Devuelve la ruta o None."""
+    data = capture_screen(serial, raw=raw)
+    if data is None:
+        return None
+    directory.mkdir(parents=True, exist_ok=True)
+    path = screenshot_path(serial, directory)
+    path.write_bytes(data)
+    return path
+
+
+def burst_screenshots(count, interval=0.0, serial=None, raw=True, directory=SCREENSHOT_DIR, should_stop=None):
+    """
+    Ráfaga de `count` capturas separadas `interval` segundos (medido desde el
+    inicio de cada captura, no desde el final). Devuelve las rutas guardadas.
+    """
+    paths = []
+    start = time.monotonic()
+    for i in range(count):
+        if should_stop and should_stop():
+            break
+        delay = start + i * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        path = take_screenshot(serial, raw=raw, directory=directory)
+        if path is not None:
+            paths.append(path)
+    return paths
+
+
+# =========================
+# Reducción para vistas previas (fuera del hilo de Tk)
+# =========================
+def downscale_rgba_to_ppm(width, height, rgba, max_width):
+    """
+    Muestrea 1 de cada k píxeles y devuelve un PPM (P6) que tk.PhotoImage
+    lee sin Pillow. Todo se hace con slices, sin bucles por píxel.
+    """
+    k = max(1, -(-width // max_width))
+    out_w = len(range(0, width, k))
+    stride = width * 4
+    body = bytearray()
+    for y in range(0, height, k):
+        row = rgba[y * stride:(y + 1) * stride]
+        rgb = bytearray(out_w * 3)
+        rgb[0::3] = row[0::4 * k]
+        rgb[1::3] = row[1::4 * k]
+        rgb[2::3] = row[2::4 * k]
+        body += rgb
+    out_h = len(range(0, height, k))
+    return f"P6 {out_w} {out_h} 255\n".encode("ascii") + bytes(body)
+
+
+def downscale_png(png, max_width):
+    """PNG reducido con Pillow, o None si no está disponible."""
+    if Image is None or not png:
+        return None
+    try:
+        img = Image.open(io.BytesIO(png))
+        ratio = max_width / float(img.width)
+        if ratio < 1:
+            img = img.resize((max_width, max(1, int(img.height * ratio))))
+        out = io.BytesIO()
+        img.convert("RGB").save(out, format="PNG", compress_level=1)
+        return out.getvalue()
+    except Exception:
+        return None
+
+
+def _is_network_serial(serial):
+    """ip:puerto o servicio mDNS de depuración inalámbrica."""
+    return bool(serial) and (":" in serial or "._adb-tls-connect." in serial)
+
+
+def capture_preview(serial, max_width):
+    """
+    Captura reducida lista para tk.PhotoImage. Por USB se usa el frame crudo
+    (el dispositivo no codifica PNG, que es lo que más tarda) y se muestrea
+    en Python. Por red, con Pillow, se pide PNG: ~10 MB de frame crudo por
+    Wi-Fi tardan más que la codificación. Si el formato de píxel no es de
+    4 bytes también se recurre al PNG.
+    """
+    if not (Image is not None and _is_network_serial(serial)):
+        frame = capture_raw(serial)
+        if frame is not None:
+            return downscale_rgba_to_ppm(*frame, max_width)
+        if Image is None:
+            return None
+    return downscale_png(capture_png(serial), max_width)
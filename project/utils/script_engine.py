@@ -0,0 +1,312 @@
+import json
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from string import Template
+
+from .adb_utils import popen_adb
+from .input_utils import build_input_script
+
+SCRIPT_EXT = ".adb.json"
+TRANSFER_TIMEOUT = 600       # s máximos por push/pull
+
+# =========================
+# Formato de script
+# =========================
+# Un script es un JSON con una lista de pasos; cada paso es un objeto con
+# una sola acción:
+#   {"shell": "am start -a android.intent.action.VIEW -d ${URL}"}
+#   {"keyevent": 26}            o  {"keyevent": [24, 24, 24]}
+#   {"tap": [540, 1200]}        {"swipe": [100, 1500, 100, 400, 250]}
+#   {"text": "hola"}            {"echo": "mensaje"}
+#   {"wait": 5}                 (segundos, en el host)
+#   {"push": ["local", "/sdcard/destino"]}   {"pull": ["/sdcard/origen", "local"]}
+#   {"loop": {"times": 3, "steps": [...]}}   (sin "times" se repite hasta detenerlo)
+# En el nivel superior, "vars" define sustituciones ${NOMBRE} para los
+# textos y "stop_on_error" corta el script en el primer paso que falle.
+#
+#   {"vars": {"URL": "https://www.google.com"},
+#    "steps": [{"keyevent": 26}, {"wait": 1}, {"shell": "am start -d ${URL}"}]}
+
+ACTIONS = ("shell", "keyevent", "tap", "swipe", "text", "echo", "wait", "push", "pull", "loop")
+
+
+def is_script_file(name):
+    return str(name).lower().endswith(SCRIPT_EXT)
+
+
+def _check(condition, where, message):
+    if not condition:
+        raise ValueError(f"{where}: {message}")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_steps(steps, where="steps"):
+    """Comprueba la estructura completa antes de ejecutar nada; lanza ValueError con la ruta del paso."""
+    _check(isinstance(steps, list), where, "debe ser una lista de pasos")
+    for i, step in enumerate(steps):
+        here = f"{where}[{i}]"
+        _check(isinstance(step, dict) and len(step) == 1, here, "cada paso es un objeto con una sola acción")
+        action, arg = next(iter(step.items()))
+        _check(action in ACTIONS, here, f"acción desconocida {action!r}")
+        if action in ("shell", "text", "echo"):
+            _check(isinstance(arg, str), here, f"{action} espera un texto")
+        elif action == "keyevent":
+            codes = arg if isinstance(arg, list) else [arg]
+            _check(codes and all(isinstance(c, (int, str)) for c in codes), here, "keyevent espera un código o una lista")
+        elif action in ("tap", "swipe"):
+            sizes = (2,) if action == "tap" else (4, 5)
+            _check(isinstance(arg, list) and len(arg) in sizes and all(_is_number(v) for v in arg),
+                   here, f"{action} espera {' o '.join(map(str, sizes))} números")
+        elif action == "wait":
+            _check(_is_number(arg) and arg >= 0, here, "wait espera segundos >= 0")
+        elif action in ("push", "pull"):
+            _check(isinstance(arg, list) and len(arg) == 2 and all(isinstance(v, str) for v in arg),
+                   here, f"{action} espera [origen, destino]")
+        elif action == "loop":
+            _check(isinstance(arg, dict), here, "loop espera {\"times\": n, \"steps\": [...]}")
+            times = arg.get("times")
+            _check(times is None or (isinstance(times, int) and times >= 0), here, "times debe ser un entero >= 0")
+            _check(arg.get("steps"), here, "loop necesita al menos un paso")
+            validate_steps(arg.get("steps"), f"{here}.loop.steps")
+
+
+def parse_script(text):
+    data = json.loads(text)
+    if isinstance(data, list):
+        data = {"steps": data}
+    if not isinstance(data, dict):
+        raise ValueError("El script debe ser un objeto JSON o una lista de pasos")
+    variables = data.get("vars") or {}
+    _check(isinstance(variables, dict), "vars", "debe ser un objeto")
+    validate_steps(data.get("steps"))
+    return {
+        "steps": data["steps"],
+        "vars": {str(k): str(v) for k, v in variables.items()},
+        "stop_on_error": bool(data.get("stop_on_error", False)),
+    }
+
+
+def load_script(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_script(f.read())
+
+
+# =========================
+# Sesión de shell reutilizable
+# =========================
+class ShellSession:
+    """
+    Un único `adb shell` para todo el script. Cada comando se ejecuta en un
+    subshell seguido de un marcador con su código de salida, así se sabe
+    dónde acaba su salida sin abrir otro proceso adb. El marcador va precedido
+    de un salto de línea para que quede en su propia línea aunque la salida
+    del comando no termine en "\n".
+    """
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self._proc = None
+        self._marker = f"__ADB_SCRIPT_{uuid.uuid4().hex}__"
+
+    def _ensure_open(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        self._proc = popen_adb(["shell"], serial=self.serial, stdin=subprocess.PIPE, stderr=subprocess.STDOUT)
+        return self._proc is not None
+
+    def run(self, command, on_output=None):
+        """Ejecuta `command` y devuelve su código de salida (None si la sesión se cayó)."""
+        if not self._ensure_open():
+            return None
+        proc = self._proc
+        try:
+            proc.stdin.write(f"( {command}\n) </dev/null 2>&1; printf '\\n%s %d\\n' {self._marker} $?\n")
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            self._proc = None
+            return None
+        # Una línea vacía se retiene: si la sigue el marcador es el "\n" añadido
+        blank_pending = False
+        for line in proc.stdout:
+            line = line.rstrip("\r\n")
+            if line.startswith(self._marker):
+                try:
+                    return int(line[len(self._marker):].strip())
+                except ValueError:
+                    return None
+            if blank_pending and on_output:
+                on_output("")
+            blank_pending = line == ""
+            if on_output and not blank_pending:
+                on_output(line)
+        self._proc = None
+        return None
+
+    def close(self):
+        proc, self._proc = self._proc, None
+        if proc and proc.poll() is None:
+            try:
+                proc.stdin.write("exit\n")
+                proc.stdin.close()
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+
+    def kill(self):
+        proc = self._proc
+        if proc and proc.poll() is None:
+            proc.kill()
+
+
+# =========================
+# Motor
+# =========================
+class ScriptCancelled(Exception):
+    pass
+
+
+class ScriptRun:
+    """
+    Ejecuta un script contra un serial con la misma interfaz que
+    batch_runner.BatchRun: on_line(serial, stream, line) por cada línea y
+    on_done(serial, código, segundos, motivo) al terminar. El código es 0 si
+    todos los pasos fueron bien y 1 si alguno falló.
+    """
+
+    def __init__(self, path, serial=None, timeout=None, on_line=None, on_done=None, script=None):
+        self.path = path
+        self.serial = serial
+        self.timeout = timeout
+        self.on_line = on_line or (lambda serial, stream, line: None)
+        self.on_done = on_done or (lambda serial, code, elapsed, reason: None)
+        self.script = script
+        self.reason = None
+        self.failures = 0
+        self._cancel = threading.Event()
+        self._session = ShellSession(serial)
+        self._transfer_proc = None
+
+    def _out(self, line, stream="stdout"):
+        self.on_line(self.serial, stream, line)
+
+    def run(self):
+        start = time.monotonic()
+        timer = None
+        code = None
+        try:
+            if self.script is None:
+                self.script = load_script(self.path)
+            if self.timeout:
+                timer = threading.Timer(self.timeout, self._expire)
+                timer.daemon = True
+                timer.start()
+            self._run_steps(self.script["steps"])
+            code = 1 if self.failures else 0
+        except ScriptCancelled:
+            code = 1
+        except (OSError, ValueError) as e:
+            self._out(f"Script inválido: {e}", "stderr")
+        finally:
+            if timer:
+                timer.cancel()
+            self._session.close()
+        self.on_done(self.serial, code, time.monotonic() - start, self.reason)
+        return code
+
+    def _expire(self):
+        self.reason = "timeout"
+        self._stop()
+
+    def cancel(self):
+        if self.reason is None:
+            self.reason = "cancelado"
+        self._stop()
+
+    def _stop(self):
+        self._cancel.set()
+        # Desbloquea la lectura del comando en curso
+        self._session.kill()
+        proc = self._transfer_proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    def _transfer(self, action, src, dest):
+        """push/pull acotado a TRANSFER_TIMEOUT y cancelable como el resto de pasos."""
+        proc = popen_adb([action, src, dest], serial=self.serial, stderr=subprocess.STDOUT)
+        if proc is None:
+            return False
+        self._transfer_proc = proc
+        try:
+            output, _ = proc.communicate(timeout=TRANSFER_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            output, _ = proc.communicate()
+            self._out(f"{action} superó {TRANSFER_TIMEOUT}s", "stderr")
+            return False
+        finally:
+            self._transfer_proc = None
+        for line in (output or "").splitlines():
+            self._out(line, "stdout" if proc.returncode == 0 else "stderr")
+        return proc.returncode == 0
+
+    def _sub(self, value):
+        return Template(str(value)).safe_substitute(self.script["vars"])
+
+    def _check_cancel(self):
+        if self._cancel.is_set():
+            raise ScriptCancelled()
+
+    def _run_steps(self, steps):
+        for step in steps:
+            self._check_cancel()
+            action, arg = next(iter(step.items()))
+            if action == "loop":
+                times = arg.get("times")
+                count = 0
+                while times is None or count < times:
+                    self._run_steps(arg["steps"])
+                    count += 1
+                continue
+            ok = self._run_step(action, arg)
+            if not ok:
+                self._check_cancel()
+                self.failures += 1
+                self._out(f"Paso fallido: {json.dumps(step, ensure_ascii=False)}", "stderr")
+                if self.script["stop_on_error"]:
+                    raise ScriptCancelled()
+
+    def _run_step(self, action, arg):
+        if action == "wait":
+            if self._cancel.wait(float(arg)):
+                raise ScriptCancelled()
+            return True
+        if action == "echo":
+            self._out(self._sub(arg))
+            return True
+        if action in ("push", "pull"):
+            src, dest = (self._sub(v) for v in arg)
+            return self._transfer(action, src, dest)
+        if action == "shell":
+            command = self._sub(arg)
+        elif action == "keyevent":
+            codes = arg if isinstance(arg, list) else [arg]
+            command = build_input_script([("key", shlex.quote(self._sub(c))) for c in codes])
+        elif action == "tap":
+            command = build_input_script([("tap", *arg)])
+        elif action == "swipe":
+            command = build_input_script([("swipe", *arg)])
+        else:
+            command = build_input_script([("text", self._sub(arg))])
+        code = self._session.run(command, on_output=self._out)
+        return code == 0
+
+
+def run_script(path, serial=None, on_line=None):
+    """Ejecuta un script de forma síncrona y devuelve su código (0 = todo bien)."""
+    return ScriptRun(path, serial, on_line=on_line).run()
@@ -0,0 +1,328 @@
+import hashlib
+import io
+import os
+import shlex
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config.config import CONFIG_DIR
+from .adb_utils import _run_adb_command, popen_adb
+from .gui_utils import gui_log
+
+# Pillow es opcional: sin él solo se previsualizan PNG/GIF pequeños (Tk los lee solo)
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# =========================
+# Configuración
+# =========================
+THUMB_SIZE = (160, 160)
+HEAD_BYTES = 64 * 1024              # la miniatura EXIF va en los primeros KB del JPEG
+SMALL_FILE_LIMIT = 512 * 1024       # PNG/GIF por debajo de esto se traen enteros
+MEMORY_CACHE_MAX_BYTES = 16 * 1024 * 1024   # sin Pillow se guardan PNG/GIF de hasta SMALL_FILE_LIMIT
+DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+THUMB_CACHE_DIR = CONFIG_DIR / "cache" / "thumbs"
+THUMB_WORKERS = 2
+
+JPEG_EXTS = {".jpg", ".jpeg"}
+TK_NATIVE_EXTS = {".png", ".gif"}
+IMAGE_EXTS = JPEG_EXTS | TK_NATIVE_EXTS | {".webp", ".bmp"}
+
+# Un b"" en caché es un resultado negativo (p. ej. JPEG sin miniatura EXIF):
+# así no se vuelve a leer el archivo por adb en cada selección
+_memory_cache = OrderedDict()   # clave -> bytes (PNG/GIF listos para tk.PhotoImage, o b"")
+_pending = {}                   # clave -> [callbacks]
+_lock = threading.Lock()
+_memory_state = {"bytes": 0}
+_disk_state = {"bytes": None}
+_pool = ThreadPoolExecutor(max_workers=THUMB_WORKERS, thread_name_prefix="thumbs")
+_warned_no_pil = False
+
+
+def is_image_name(name):
+    return os.path.splitext(str(name))[1].lower() in IMAGE_EXTS
+
+
+def thumbnail_key(serial, path, size="", mtime=""):
+    return f"{serial}|{path}|{size}|{mtime}"
+
+
+# =========================
+# EXIF
+# =========================
+def extract_exif_thumbnail(data):
+    """
+    Devuelve el JPEG embebido en el IFD1 del bloque EXIF (APP1) o None.
+    Solo necesita los primeros bytes del archivo.
+    """
+    if len(data) < 4 or data[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker in (0xD9, 0xDA):  # fin de imagen / inicio de datos
+            return None
+        seg_len = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b"Exif\x00\x00":
+            return _thumbnail_from_tiff(data[pos + 10:pos + 2 + seg_len])
+        pos += 2 + seg_len
+    return None
+
+
+def _thumbnail_from_tiff(tiff):
+    if len(tiff) < 8:
+        return None
+    endian = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if endian is None:
+        return None
+    try:
+        ifd0 = struct.unpack(endian + "I", tiff[4:8])[0]
+        count = struct.unpack(endian + "H", tiff[ifd0:ifd0 + 2])[0]
+        next_off = ifd0 + 2 + count * 12
+        ifd1 = struct.unpack(endian + "I", tiff[next_off:next_off + 4])[0]
+        if not ifd1:
+            return None
+        count = struct.unpack(endian + "H", tiff[ifd1:ifd1 + 2])[0]
+        offset = length = None
+        for i in range(count):
+            entry = tiff[ifd1 + 2 + i * 12:ifd1 + 14 + i * 12]
+            tag, _typ, _cnt, value = struct.unpack(endian + "HHII", entry)
+            if tag == 0x0201:
+                offset = value
+            elif tag == 0x0202:
+                length = value
+    except struct.error:
+        return None
+    if offset is None or not length:
+        return None
+    thumb = tiff[offset:offset + length]
+    if len(thumb) != length or thumb[:2] != b"\xff\xd8":
+        return None
+    return thumb
+
+
+# =========================
+# Decodificación (fuera del hilo de Tk)
+# =========================
+def decode_thumbnail(data):
+    """Bytes de imagen -> PNG/GIF reducido para tk.PhotoImage, o None si no se puede."""
+    global _warned_no_pil
+    if not data:
+        return None
+    if Image is not None:
+        try:
+            img = Image.open(io.BytesIO(data))
+            img.thumbnail(THUMB_SIZE)
+            if img.mode not in ("RGB", "RGBA", "L", "P"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format="PNG")
+            return out.getvalue()
+        except Exception:
+            return None
+    if data[:8] == b"\x89PNG\r\n\x1a\n" or data[:4] == b"GIF8":
+        # Tk reduce con subsample al crear el PhotoImage
+        return data
+    if not _warned_no_pil:
+        _warned_no_pil = True
+        gui_log("Instala Pillow para ver miniaturas JPEG/WebP.", level="info")
+    return None
+
+
+# =========================
+# Caché en memoria y en disco
+# =========================
+def _memory_get(key):
+    with _lock:
+        data = _memory_cache.get(key)
+        if data is not None:
+            _memory_cache.move_to_end(key)
+        return data
+
+
+def _memory_put(key, data):
+    with _lock:
+        old = _memory_cache.pop(key, None)
+        if old is not None:
+            _memory_state["bytes"] -= len(old)
+        _memory_cache[key] = data
+        _memory_state["bytes"] += len(data)
+        while _memory_state["bytes"] > MEMORY_CACHE_MAX_BYTES and len(_memory_cache) > 1:
+            _memory_state["bytes"] -= len(_memory_cache.popitem(last=False)[1])
+
+
+def _disk_path(key):
+    return THUMB_CACHE_DIR / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".img")
+
+
+def _disk_get(key):
+    path = _disk_path(key)
+    try:
+        data = path.read_bytes()
+        os.utime(path)  # marca de uso para el LRU de disco
+        return data
+    except OSError:
+        return None
+
+
+def _disk_put(key, data):
+    try:
+        THUMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _disk_path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError:
+        return
+    with _lock:
+        if _disk_state["bytes"] is None:
+            _disk_state["bytes"] = sum(_file_sizes())
+        else:
+            _disk_state["bytes"] += len(data)
+        over = _disk_state["bytes"] > DISK_CACHE_MAX_BYTES
+    if over:
+        _trim_disk_cache()
+
+
+def _file_sizes():
+    try:
+        with os.scandir(THUMB_CACHE_DIR) as it:
+            return [e.stat().st_size for e in it if e.is_file()]
+    except OSError:
+        return []
+
+
+def _trim_disk_cache():
+    """Borra las miniaturas usadas hace más tiempo hasta quedar al 80% del límite."""
+    try:
+        with os.scandir(THUMB_CACHE_DIR) as it:
+            files = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in it if e.is_file()]
+    except OSError:
+        return
+    files.sort()
+    total = sum(f[1] for f in files)
+    target = int(DISK_CACHE_MAX_BYTES * 0.8)
+    for _mtime, size, path in files:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    with _lock:
+        _disk_state["bytes"] = total
+
+
+# =========================
+# Obtención desde el dispositivo
+# =========================
+def _read_remote(serial, path, limit):
+    """Lee como mucho `limit` bytes del archivo remoto por exec-out (sin tocar el dispositivo)."""
+    proc = popen_adb(["exec-out", "head", "-c", str(limit), shlex.quote(path)], serial=serial, binary=True)
+    if proc is None:
+        return b""
+    try:
+        data = proc.stdout.read(limit)
+    finally:
+        try:
+            proc.stdout.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+    return data
+
+
+def _remote_stat(serial, path):
+    """(tamaño, mtime) del archivo en el dispositivo, o None si no se pudo leer."""
+    proc = _run_adb_command(["shell", "stat", "-c", shlex.quote("%s %Y"), shlex.quote(path)],
+                            timeout=5, log_command=False, serial=serial)
+    parts = (proc.stdout if proc else "").split()
+    if len(parts) != 2 or not all(p.isdigit() for p in parts):
+        return None
+    return int(parts[0]), int(parts[1])
+
+
+def _fetch_thumbnail(serial, path, size):
+    """
+    Miniatura en bytes, b"" si el archivo no tiene miniatura posible (se
+    cachea) o None si la lectura falló (se reintentará).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in JPEG_EXTS:
+        head = _read_remote(serial, path, HEAD_BYTES)
+        if not head:
+            return None
+        return decode_thumbnail(extract_exif_thumbnail(head)) or b""
+    # Resto de formatos: solo si son pequeños; nunca se baja una foto a resolución completa
+    if isinstance(size, int) and size > SMALL_FILE_LIMIT:
+        return b""
+    if Image is None and ext not in TK_NATIVE_EXTS:
+        return b""
+    data = _read_remote(serial, path, SMALL_FILE_LIMIT + 1)
+    if not data:
+        return None
+    if len(data) > SMALL_FILE_LIMIT:
+        return b""
+    return decode_thumbnail(data) or b""
+
+
+def load_thumbnail_async(serial, path, callback, size="", mtime="", is_wanted=None):
+    """
+    Pide la miniatura de `path`. callback(path, data) recibe bytes PNG/GIF o
+    None; se llama en el hilo actual si está en memoria y desde un hilo del
+    pool en otro caso. `is_wanted()` permite descartar peticiones que ya no
+    interesan (p. ej. la selección cambió mientras se hacía scroll).
+    Sin tamaño y fecha (el listado de Android no los trae) se piden con un
+    `stat` antes de consultar la caché, para que un archivo reemplazado no
+    muestre la miniatura antigua.
+    """
+    known = size not in ("", None) and mtime not in ("", None)
+    key = thumbnail_key(serial, path, size, mtime)
+    if known:
+        data = _memory_get(key)
+        if data is not None:
+            callback(path, data or None)
+            return
+
+    with _lock:
+        if key in _pending:
+            _pending[key].append(callback)
+            return
+        _pending[key] = [callback]
+
+    def job():
+        data = None
+        try:
+            cache_key, file_size = key, size
+            if not known:
+                stat = _remote_stat(serial, path)
+                cache_key = thumbnail_key(serial, path, *stat) if stat else None
+                file_size = stat[0] if stat else size
+            if cache_key is not None:
+                data = _memory_get(cache_key)
+                if data is None:
+                    data = _disk_get(cache_key)
+            if data is None and (is_wanted is None or is_wanted()):
+                data = _fetch_thumbnail(serial, path, file_size)
+                if data is not None and cache_key is not None:
+                    _disk_put(cache_key, data)
+            if data is not None and cache_key is not None:
+                _memory_put(cache_key, data)
+        except Exception as e:
+            gui_log(f"Error generando miniatura de {path}: {e}", level="error")
+        with _lock:
+            callbacks = _pending.pop(key, [])
+        for cb in callbacks:
+            try:
+                cb(path, data or None)
+            except Exception:
+                pass
+
+    _pool.submit(job)
@@ -0,0 +1,251 @@
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .adb_utils import _run_adb_command, popen_adb
+from .gui_utils import gui_log
+from .net_utils import find_ips_from_macs
+from .profile_connect import adb_connect, profile_serial
+
+RECONNECT_BASE = 2.0         # s de la primera espera tras una caída
+RECONNECT_MAX = 300.0        # tope de la espera exponencial
+RERESOLVE_AFTER = 2          # fallos seguidos antes de volver a buscar la IP por MAC
+POLL_INTERVAL = 5.0          # s entre `adb devices` si track-devices no está disponible
+TRACK_RESTART = 3.0          # s antes de relanzar track-devices si se cae
+MAX_PARALLEL_RECONNECTS = 4
+
+
+def parse_device_list(payload):
+    """{serial: estado} de un bloque 'serial\\testado' (formato de track-devices / adb devices)."""
+    devices = {}
+    for line in payload.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and not line.startswith("List of devices"):
+            devices[parts[0]] = parts[1]
+    return devices
+
+
+class _Watched:
+    def __init__(self, name, perfil):
+        self.name = name
+        self.perfil = dict(perfil)
+        self.ip = perfil.get("ip")
+        self.connected = False
+        self.since = time.monotonic()      # inicio del estado actual
+        self.watched_since = self.since
+        self.up_total = 0.0
+        self.drops = 0
+        self.failures = 0
+        self.backoff = RECONNECT_BASE
+        self.pending = False               # hay un reintento en cola o en curso
+
+    @property
+    def serial(self):
+        return profile_serial(self.perfil, self.ip) if self.ip else None
+
+    def uptime(self, now=None):
+        now = now or time.monotonic()
+        up = self.up_total + (now - self.since if self.connected else 0.0)
+        total = now - self.watched_since
+        return up / total * 100 if total > 0 else 100.0
+
+
+class ConnectionWatchdog:
+    """
+    Vigila perfiles Wi-Fi y los reconecta cuando se caen. Hay un único
+    `adb track-devices` (el servidor adb avisa de cada cambio, sin sondear
+    uno a uno), un hilo con un heap de reintentos y un pool pequeño para los
+    `adb connect`, así que el coste no crece con hilos por dispositivo.
+    Si track-devices no funciona se sondea `adb devices` cada POLL_INTERVAL.
+    """
+
+    def __init__(self, on_ip_change=None):
+        self.on_ip_change = on_ip_change
+        self._watched = {}
+        self._devices = {}
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL_RECONNECTS, thread_name_prefix="watchdog")
+        self._track_proc = None
+        self._track_warned = False
+        self._threads = []
+
+    # --- API ---
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for target, name in ((self._track_loop, "watchdog-track"), (self._schedule_loop, "watchdog-retry")):
+            thread = threading.Thread(target=target, daemon=True, name=name)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        proc = self._track_proc
+        if proc and proc.poll() is None:
+            proc.kill()
+        self._threads = []
+
+    def watch(self, name, perfil):
+        with self._lock:
+            entry = _Watched(name, perfil)
+            self._watched[name] = entry
+            self._apply_state(entry, time.monotonic())
+        self.start()
+
+    def unwatch(self, name):
+        with self._lock:
+            self._watched.pop(name, None)
+
+    def is_watched(self, name):
+        return name in self._watched
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "name": w.name,
+                "serial": w.serial,
+                "connected": w.connected,
+                "uptime": w.uptime(now),
+                "drops": w.drops,
+                "failures": w.failures,
+                "state_for": now - w.since,
+            } for w in self._watched.values()]
+
+    # --- Estado de dispositivos ---
+    def _update_devices(self, devices):
+        now = time.monotonic()
+        with self._lock:
+            self._devices = devices
+            for entry in self._watched.values():
+                self._apply_state(entry, now)
+
+    def _apply_state(self, entry, now):
+        online = entry.serial is not None and self._devices.get(entry.serial) == "device"
+        if online == entry.connected:
+            if not online and not entry.pending:
+                self._schedule(entry, now + random.uniform(0, RECONNECT_BASE))
+            return
+        if online:
+            downtime = now - entry.since
+            entry.connected, entry.since = True, now
+            entry.failures, entry.backoff = 0, RECONNECT_BASE
+            if entry.drops:
+                gui_log(f"🔁 {entry.name} reconectado tras {downtime:.0f}s (uptime {entry.uptime(now):.1f}%)",
+                        level="info")
+        else:
+            entry.up_total += now - entry.since
+            entry.connected, entry.since = False, now
+            entry.drops += 1
+            gui_log(f"⚠ {entry.name} ({entry.serial}) desconectado; reintentando", level="error")
+            if not entry.pending:
+                self._schedule(entry, now + random.uniform(0, RECONNECT_BASE))
+
+    def _schedule(self, entry, due):
+        entry.pending = True
+        heapq.heappush(self._heap, (due, entry.name))
+        self._wake.set()
+
+    # --- track-devices ---
+    def _track_loop(self):
+        while not self._stop.is_set():
+            proc = popen_adb(["track-devices"], binary=True)
+            self._track_proc = proc
+            got_frame = False
+            if proc is not None:
+                try:
+                    while not self._stop.is_set():
+                        header = proc.stdout.read(4)
+                        if len(header) < 4:
+                            break
+                        length = int(header, 16)
+                        payload = proc.stdout.read(length).decode("utf-8", errors="replace")
+                        got_frame = True
+                        self._update_devices(parse_device_list(payload))
+                except ValueError:
+                    if not self._track_warned:
+                        gui_log("track-devices no disponible; se sondea adb devices", level="error")
+                        self._track_warned = True
+                finally:
+                    if proc.poll() is None:
+                        proc.kill()
+            if self._stop.is_set():
+                break
+            if got_frame:
+                self._stop.wait(TRACK_RESTART)
+                continue
+            # Sin track-devices: sondeo periódico con un solo `adb devices`
+            self._poll_devices()
+            self._stop.wait(POLL_INTERVAL)
+
+    def _poll_devices(self):
+        proc = _run_adb_command(["devices"], timeout=10, log_command=False)
+        if proc is not None:
+            self._update_devices(parse_device_list(proc.stdout))
+
+    # --- Reintentos ---
+    def _schedule_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                due = self._heap[0][0] if self._heap else None
+            timeout = None if due is None else max(0.0, due - time.monotonic())
+            if self._wake.wait(timeout):
+                self._wake.clear()
+                continue
+            now = time.monotonic()
+            ready = []
+            with self._lock:
+                while self._heap and self._heap[0][0] <= now:
+                    _due, name = heapq.heappop(self._heap)
+                    entry = self._watched.get(name)
+                    if entry is None or entry.connected:
+                        if entry:
+                            entry.pending = False
+                        continue
+                    ready.append(entry)
+            if ready:
+                self._pool.submit(self._reconnect_batch, ready)
+
+    def _reconnect_batch(self, entries):
+        # Las MAC que llevan varios fallos se resuelven juntas (la IP pudo cambiar por DHCP)
+        stale = [e for e in entries if e.perfil.get("mac") and (e.failures >= RERESOLVE_AFTER or not e.ip)]
+        if stale:
+            found = find_ips_from_macs([e.perfil["mac"] for e in stale])
+            for entry in stale:
+                ip = found.get(entry.perfil["mac"])
+                if ip and ip != entry.ip:
+                    gui_log(f"{entry.name}: nueva IP {ip} (antes {entry.ip})", level="info")
+                    entry.ip = ip
+                    if self.on_ip_change:
+                        self.on_ip_change(entry.name, ip)
+        for entry in entries:
+            self._pool.submit(self._reconnect_one, entry)
+
+    def _reconnect_one(self, entry):
+        ok = False
+        if entry.serial:
+            ok, _attempts, _detail = adb_connect(entry.serial, retries=1)
+        now = time.monotonic()
+        with self._lock:
+            entry.pending = False
+            if entry.name not in self._watched:
+                return
+            # Si conectó, el cambio a "device" llegará por track-devices y
+            # cancela el reintento; si no llega, se vuelve a probar más tarde
+            if not ok:
+                entry.failures += 1
+            entry.backoff = min(RECONNECT_MAX, entry.backoff * 2)
+            self._schedule(entry, now + entry.backoff * random.uniform(0.5, 1.5))
+
+
+def format_watchdog_stats(stats):
+    state = "conectado" if stats["connected"] else f"caído ({stats['failures']} fallos)"
+    return (f"{stats['name']} ({stats['serial'] or 'sin IP'}): {state} desde hace {int(stats['state_for'])}s, "
+            f"uptime {stats['uptime']:.1f}%, caídas {stats['drops']}")